@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+FAQ 답변 은행 인덱스 생성 (오프라인 작업)
+
+chat_message의 과거 사용자 질문을 임베딩한 뒤 NumPy k-means로 군집화하고,
+충분히 자주 나온 질문 군집마다 자동 평가(ai_feedback.total_score)가 가장 높은 답변을 골라
+data/FAQ/faq_index.json 으로 저장합니다. 서버(utils/faq_bank.py)는 파일이 바뀌면 자동으로 다시 읽습니다.
+
+생성된 파일의 각 항목은 "enabled" 값으로 수동 검수(사용 중지)할 수 있습니다.
+
+사용법:
+    python build_faq_index.py --clusters 200 --min-cluster-size 5 --min-score 80
+    python build_faq_index.py --dry-run   # 저장하지 않고 군집 결과만 출력
+"""
+
+import argparse
+import json
+import os
+import re
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import models
+from database import SessionLocal
+from utils.llm_client import create_embeddings, get_openai_client
+from utils.faq_bank import FAQ_INDEX_PATH, FAQ_EMBEDDING_MODEL, FAQ_SIMILARITY_THRESHOLD, NICKNAME_PLACEHOLDER
+
+EMBED_BATCH_SIZE = 100
+
+
+def load_qa_pairs(limit: int) -> List[dict]:
+    """
+    (사용자 질문, 바로 다음 AI 답변, 사용자 닉네임, 답변 평가 점수) 목록 조회
+
+    서버는 대화의 첫 질문에만 FAQ 답변을 사용하므로 세션의 첫 질문-답변 쌍만 모읍니다.
+    (후속 질문의 답변은 앞 대화 맥락에 따라 달라지므로 다른 사용자에게 재사용할 수 없음)
+    """
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(models.ChatMessage, models.User.nickname)
+            .join(models.ChatHistory, models.ChatMessage.history_id == models.ChatHistory.id)
+            .join(models.User, models.ChatHistory.user_id == models.User.id)
+            .order_by(models.ChatMessage.history_id.desc(), models.ChatMessage.id.asc())
+            .yield_per(1000)
+        )
+
+        pairs = []
+        prev = None
+        for msg, nickname in rows:
+            first_in_history = prev is None or prev[0].history_id != msg.history_id
+            if (
+                prev is not None and prev[2] and prev[0].history_id == msg.history_id
+                and prev[0].role == "user" and msg.role == "ai"
+            ):
+                pairs.append({"question": prev[0].text.strip(), "answer_id": msg.id, "answer_text": msg.text, "nickname": nickname})
+                if len(pairs) >= limit:
+                    break
+            prev = (msg, nickname, first_in_history)
+
+        scores = dict(
+            db.query(models.AIFeedback.message_id, models.AIFeedback.total_score)
+            .filter(models.AIFeedback.message_id.in_([p["answer_id"] for p in pairs]))
+            .all()
+        ) if pairs else {}
+        for p in pairs:
+            p["score"] = scores.get(p["answer_id"])
+        return pairs
+    finally:
+        db.close()
+
+
+def embed_questions(questions: List[str]) -> np.ndarray:
+    client = get_openai_client()
+    vectors = []
+    for i in range(0, len(questions), EMBED_BATCH_SIZE):
+        batch = questions[i:i + EMBED_BATCH_SIZE]
+        response = create_embeddings(client, "faq.build", budget="background", model=FAQ_EMBEDDING_MODEL, input=batch)
+        vectors.extend(item.embedding for item in response.data)
+        print(f"   임베딩 {min(i + EMBED_BATCH_SIZE, len(questions))}/{len(questions)}")
+    matrix = np.array(vectors, dtype=np.float32)
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-8)
+
+
+def kmeans(x: np.ndarray, k: int, iterations: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    정규화된 벡터에 대한 구면(spherical) k-means (코사인 유사도 기준, k-means++ 초기화)
+
+    Returns:
+        (labels, centroids)
+    """
+    rng = np.random.default_rng(seed)
+    n = x.shape[0]
+    k = min(k, n)
+
+    # k-means++ 초기화: 기존 중심과 먼 점일수록 높은 확률로 선택
+    centroids = [x[rng.integers(n)]]
+    closest = 1 - x @ centroids[0]
+    for _ in range(1, k):
+        weights = np.maximum(closest, 0).astype(np.float64) ** 2
+        total = weights.sum()
+        idx = rng.choice(n, p=weights / total) if total > 0 else rng.integers(n)
+        centroids.append(x[idx])
+        closest = np.minimum(closest, 1 - x @ x[idx])
+    centroids = np.stack(centroids)
+
+    labels = np.zeros(n, dtype=np.int64)
+    for it in range(iterations):
+        new_labels = np.argmax(x @ centroids.T, axis=1)
+        if it > 0 and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for c in range(k):
+            members = x[labels == c]
+            if len(members):
+                center = members.sum(axis=0)
+                centroids[c] = center / (np.linalg.norm(center) or 1.0)
+    return labels, centroids
+
+
+def personalize_template(answer: dict, nickname: str) -> Optional[dict]:
+    """
+    원래 사용자의 닉네임을 자리표시자로 바꿔 다른 사용자에게도 재사용할 수 있게 함
+
+    상담 프롬프트가 고객을 '닉네임님'으로 부르도록 하므로 단어 시작에서 '님'이 이어지는 호칭만 바꿉니다.
+    (닉네임이 일반 단어인 경우 '하늘색'처럼 다른 단어에 포함된 경우는 그대로 둠) 바꾼 뒤에도 닉네임이
+    독립된 단어로 남아 있으면 원래 사용자를 가리키는 다른 표현일 수 있으므로 None을 반환해 다른 답변을 고르게 합니다.
+    """
+    if not nickname:
+        return answer
+    address = re.compile(rf"(?<!\w){re.escape(nickname)}(?=님)")
+    standalone = re.compile(rf"(?<!\w){re.escape(nickname)}(?!\w)")
+
+    def replace(value):
+        if isinstance(value, str):
+            return address.sub(NICKNAME_PLACEHOLDER, value)
+        if isinstance(value, list):
+            return [replace(v) for v in value]
+        return value
+
+    template = {key: replace(value) for key, value in answer.items()}
+    if standalone.search(json.dumps(template, ensure_ascii=False)):
+        return None
+    return template
+
+
+def _answer_template(pair: dict) -> Optional[dict]:
+    """저장된 AI 답변 JSON에서 FAQ 답변 필드만 골라 닉네임을 자리표시자로 바꾼 답변 (사용할 수 없으면 None)"""
+    try:
+        answer = json.loads(pair["answer_text"])
+    except json.JSONDecodeError:
+        return None
+    if not answer.get("description"):
+        return None
+    answer = {
+        "primary_tone": answer.get("primary_tone", ""),
+        "sub_tone": answer.get("sub_tone", ""),
+        "description": answer.get("description", ""),
+        "recommendations": answer.get("recommendations", []),
+        "emotion": answer.get("emotion", "wink"),
+    }
+    return personalize_template(answer, pair["nickname"])
+
+
+def build_entries(pairs: List[dict], x: np.ndarray, labels: np.ndarray, centroids: np.ndarray, args) -> List[dict]:
+    entries = []
+    for c in range(centroids.shape[0]):
+        member_idx = np.where(labels == c)[0]
+        if len(member_idx) == 0:
+            continue
+        # 중심과 충분히 가까운(서비스 임계값 이상) 질문만 같은 FAQ로 취급
+        sims = x[member_idx] @ centroids[c]
+        tight = member_idx[sims >= args.threshold]
+        if len(tight) < args.min_cluster_size:
+            continue
+
+        center = x[tight].sum(axis=0)
+        center /= np.linalg.norm(center) or 1.0
+        order = tight[np.argsort(-(x[tight] @ center))]
+
+        # 검수 기준: 자동 평가 점수가 가장 높은 답변 (점수 없는 답변은 --allow-unscored일 때만)
+        candidates = [i for i in order if pairs[i]["score"] is not None and pairs[i]["score"] >= args.min_score]
+        if not candidates and args.allow_unscored:
+            candidates = list(order)
+        if not candidates:
+            continue
+        # 점수가 높은 답변부터 닉네임을 자리표시자로 바꿀 수 있는 첫 답변 사용
+        best, template = None, None
+        for i in sorted(candidates, key=lambda i: pairs[i]["score"] or 0, reverse=True):
+            template = _answer_template(pairs[i])
+            if template is not None:
+                best = i
+                break
+        if best is None:
+            continue
+
+        entries.append({
+            "id": len(entries) + 1,
+            "question": pairs[order[0]]["question"],
+            "examples": [pairs[i]["question"] for i in order[:5]],
+            "cluster_size": int(len(tight)),
+            "source_message_id": pairs[best]["answer_id"],
+            "score": pairs[best]["score"],
+            "enabled": True,
+            "answer": template,
+            "embedding": [round(float(v), 6) for v in center],
+        })
+    entries.sort(key=lambda e: e["cluster_size"], reverse=True)
+    for i, e in enumerate(entries, start=1):
+        e["id"] = i
+    return entries
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="과거 채팅 질문으로 FAQ 답변 은행 인덱스 생성")
+    parser.add_argument("--clusters", type=int, default=200, help="k-means 군집 수")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--limit", type=int, default=20000, help="사용할 최대 질문 수 (최근 대화 우선)")
+    parser.add_argument("--min-cluster-size", type=int, default=5, help="FAQ로 만들 최소 유사 질문 수")
+    parser.add_argument("--min-score", type=float, default=80, help="답변 채택 최소 자동 평가 점수")
+    parser.add_argument("--allow-unscored", action="store_true", help="평가 점수가 없는 답변도 채택")
+    parser.add_argument("--threshold", type=float, default=FAQ_SIMILARITY_THRESHOLD, help="군집 중심과의 최소 유사도")
+    parser.add_argument("--output", default=FAQ_INDEX_PATH)
+    parser.add_argument("--dry-run", action="store_true")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    print("📚 FAQ 인덱스 생성")
+    pairs = load_qa_pairs(args.limit)
+    print(f"   - 질문/답변 쌍: {len(pairs)}개")
+    if not pairs:
+        print("❌ 사용할 대화가 없습니다.")
+        raise SystemExit(1)
+
+    x = embed_questions([p["question"] for p in pairs])
+    labels, centroids = kmeans(x, args.clusters, args.iterations, args.seed)
+    entries = build_entries(pairs, x, labels, centroids, args)
+    covered = sum(e["cluster_size"] for e in entries)
+    print(f"   - FAQ 항목: {len(entries)}개 (과거 질문의 {covered / len(pairs):.1%} 포함)")
+    for e in entries[:20]:
+        print(f"     #{e['id']:>3} [{e['cluster_size']:>4}회, {e['score']}점] {e['question'][:50]}")
+
+    if args.dry_run:
+        print("💡 --dry-run: 파일을 저장하지 않았습니다.")
+    else:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        # 서버가 수정 시각을 보고 다시 로드하므로 임시 파일에 모두 쓴 뒤 한 번에 교체 (쓰는 중인 파일을 읽지 않도록)
+        tmp_path = f"{args.output}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "built_at": datetime.now(timezone.utc).isoformat(),
+                "embedding_model": FAQ_EMBEDDING_MODEL,
+                "threshold": args.threshold,
+                "entries": entries,
+            }, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, args.output)
+        print(f"✅ 저장 완료: {args.output}")
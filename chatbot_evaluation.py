@@ -4,11 +4,11 @@ Fine-tuned 모델 성능 평가 스크립트
 """
 
 import os
-import openai
 import json
 from typing import List, Dict
 from datetime import datetime
 from dotenv import load_dotenv
+from utils.llm_client import chat_completion, get_openai_client
 
 # 환경변수 로드
 load_dotenv()
@@ -17,7 +17,7 @@ class ChatbotEvaluator:
     def __init__(self):
         """평가기 초기화"""
         # 환경변수에서 API 키와 모델 정보 가져오기
-        self.client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self.client = get_openai_client()
         
         # .env 파일에서 모델 정보 가져오기
         self.base_model = os.getenv('DEFAULT_MODEL', 'gpt-4.1-nano-2025-04-14')
@@ -124,7 +124,10 @@ class ChatbotEvaluator:
             
             messages.append({"role": "user", "content": prompt})
             
-            response = self.client.chat.completions.create(
+            response = chat_completion(
+                self.client,
+                "evaluation.response",
+                budget="background",
                 model=model,
                 messages=messages,
                 temperature=0.8,
@@ -201,7 +204,10 @@ JSON 형식으로 답변해주세요:
 }}"""
         
         try:
-            response_eval = self.client.chat.completions.create(
+            response_eval = chat_completion(
+                self.client,
+                "evaluation.auto_eval",
+                budget="background",
                 model=self.base_model,  # GPT-4.1-nano 사용
                 messages=[{"role": "user", "content": evaluation_prompt}],
                 temperature=0.3,
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+주요 조회 쿼리 실행 계획 점검 (MySQL EXPLAIN)
+
+라우터에서 자주 실행되는 쿼리를 같은 조건으로 EXPLAIN 하여
+인덱스를 사용하는지(type=ALL 전체 스캔, Using filesort 여부) 확인합니다.
+인덱스는 migrations/versions 의 마이그레이션으로 추가합니다. (alembic upgrade head)
+
+사용법:
+    python check_query_plans.py            # 결과 출력
+    python check_query_plans.py --strict   # 전체 스캔/파일 정렬이 있으면 종료 코드 1 (배포 전 점검용)
+"""
+
+import argparse
+from typing import List, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import select, func, text
+
+load_dotenv()
+
+import models
+from database import engine
+
+
+def sample_ids(conn) -> dict:
+    """실제 데이터 분포에 가까운 계획을 보기 위해 존재하는 id를 하나씩 사용 (없으면 1)"""
+    def latest(column):
+        return conn.execute(select(func.max(column))).scalar() or 1
+
+    return {
+        "user_id": latest(models.ChatHistory.user_id),
+        "history_id": latest(models.ChatMessage.history_id),
+        "message_id": latest(models.AIFeedback.message_id),
+    }
+
+
+def hot_queries(ids: dict) -> List[Tuple[str, object]]:
+    """(이름, SELECT 문) - 라우터의 조회 조건/정렬과 동일하게 유지"""
+    return [
+        (
+            "chat_message: 대화별 메시지 (id 순)",
+            select(models.ChatMessage)
+            .where(models.ChatMessage.history_id == ids["history_id"])
+            .order_by(models.ChatMessage.id.asc()),
+        ),
+        (
+            "chat_message: 대화별 최근 메시지 (created_at 순)",
+            select(models.ChatMessage)
+            .where(models.ChatMessage.history_id == ids["history_id"])
+            .order_by(models.ChatMessage.created_at.desc())
+            .limit(20),
+        ),
+        (
+            "survey_result: 사용자 활성 결과 (출처별 최신순)",
+            select(models.SurveyResult)
+            .where(
+                models.SurveyResult.user_id == ids["user_id"],
+                models.SurveyResult.is_active == True,
+                models.SurveyResult.source_type == "chatbot",
+            )
+            .order_by(models.SurveyResult.created_at.desc())
+            .limit(1),
+        ),
+        (
+            "chat_history: 사용자의 진행 중 세션",
+            select(models.ChatHistory)
+            .where(models.ChatHistory.user_id == ids["user_id"], models.ChatHistory.ended_at == None)
+            .order_by(models.ChatHistory.created_at.desc())
+            .limit(1),
+        ),
+        (
+            "ai_feedback: 메시지별 평가",
+            select(models.AIFeedback).where(models.AIFeedback.message_id == ids["message_id"]),
+        ),
+        (
+            "user_feedback: 대화별 피드백",
+            select(models.UserFeedback).where(models.UserFeedback.history_id == ids["history_id"]),
+        ),
+    ]
+
+
+def explain(conn, statement) -> List[dict]:
+    sql = str(statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    return [dict(row._mapping) for row in conn.execute(text("EXPLAIN " + sql))]
+
+
+def find_problems(plan: List[dict]) -> List[str]:
+    problems = []
+    for row in plan:
+        extra = row.get("Extra") or ""
+        if row.get("type") == "ALL":
+            problems.append(f"{row.get('table')}: 전체 스캔 (type=ALL)")
+        if "Using filesort" in extra:
+            problems.append(f"{row.get('table')}: 파일 정렬 (Using filesort)")
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="주요 조회 쿼리의 EXPLAIN 결과 점검")
+    parser.add_argument("--strict", action="store_true", help="문제가 있으면 종료 코드 1")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "mysql":
+        print(f"❌ MySQL 전용 점검입니다. (현재: {engine.dialect.name})")
+        raise SystemExit(1)
+
+    print("🔍 주요 쿼리 실행 계획 점검")
+    failed = 0
+    with engine.connect() as conn:
+        ids = sample_ids(conn)
+        print(f"   - 샘플 값: {ids}")
+        for name, statement in hot_queries(ids):
+            plan = explain(conn, statement)
+            problems = find_problems(plan)
+            status = "⚠️" if problems else "✅"
+            print(f"\n{status} {name}")
+            for row in plan:
+                print(
+                    f"     table={row.get('table')} type={row.get('type')} key={row.get('key')} "
+                    f"rows={row.get('rows')} extra={row.get('Extra')}"
+                )
+            for problem in problems:
+                print(f"     → {problem}")
+            failed += bool(problems)
+
+    if failed:
+        print(f"\n⚠️ 인덱스를 사용하지 못하는 쿼리 {failed}개 - 'alembic upgrade head' 적용 여부를 확인하세요.")
+        if args.strict:
+            raise SystemExit(1)
+    else:
+        print("\n✅ 모든 주요 쿼리가 인덱스를 사용합니다.")
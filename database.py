@@ -1,9 +1,17 @@
 import os
-from sqlalchemy import create_engine
+import time
+import threading
+from collections import deque
+from contextvars import ContextVar
+from typing import Dict, Optional
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 import logging
+from utils.deadline import install_db_deadline
 
 load_dotenv()
 
@@ -23,17 +31,250 @@ engine = create_engine(
     echo=False             # SQL 로깅 (개발 시 True로 변경 가능)
 )
 
+# 요청 마감 시간이 있으면 SELECT도 남은 시간 안에서만 실행
+install_db_deadline(engine)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# async 엔드포인트용 비동기 엔진 (aiomysql) - DB 대기 중에도 이벤트 루프가 다른 요청을 처리
+# ASYNC_DB_URL이 없으면 DB_URL의 드라이버만 aiomysql로 바꿔 사용
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DB_URL") or SQLALCHEMY_DATABASE_URL.replace("+pymysql", "+aiomysql", 1)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    pool_recycle=3600,
+    pool_size=10,
+    max_overflow=20,
+    echo=False
+)
+install_db_deadline(async_engine.sync_engine)
+
+# commit 후에도 응답 직렬화 시 속성을 다시 조회하지 않도록 만료하지 않음 (async에서는 지연 로딩 불가)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# 읽기 전용 복제본 (선택) - 관리자 대시보드/이력 조회 같은 큰 조회를 채팅 쓰기가 몰리는 primary와 분리
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DB_URL")
+# 복제 지연이 이 값(초)을 넘거나 확인할 수 없으면 primary에서 조회
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv("REPLICA_LAG_CHECK_SECONDS", "10"))
+
+replica_engine = None
+ReplicaSessionLocal = None
+if REPLICA_DATABASE_URL:
+    replica_engine = create_engine(
+        REPLICA_DATABASE_URL,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+        pool_size=5,
+        max_overflow=10,
+        echo=False
+    )
+    install_db_deadline(replica_engine)
+    ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+
+_replica_lock = threading.Lock()
+_replica_state = {
+    "checked_at": 0.0,
+    "healthy": False,
+    "lag_seconds": None,
+    "error": None,
+    "replica_sessions": 0,
+    "primary_fallbacks": 0,
+}
 Base = declarative_base()
 
+# 요청별 DB 커넥션 사용량 - 한 요청이 동시에 점유한 커넥션 수(최대)를 집계 (DBUsageMiddleware)
+_request_db_usage: ContextVar[Optional[Dict[str, int]]] = ContextVar("request_db_usage", default=None)
+_usage_lock = threading.Lock()
+_usage_stats = {"requests": 0, "by_peak_connections": {}}
+# 커넥션을 2개 이상 동시에 점유한 최근 요청 경로 (원인 엔드포인트 확인용)
+_multi_connection_paths = deque(maxlen=20)
+
+
+def _track_request_connections(target_engine) -> None:
+    """풀에서 커넥션을 꺼내고 돌려줄 때 현재 요청의 사용량 갱신 (요청 밖의 작업은 집계하지 않음)"""
+    @event.listens_for(target_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        usage = _request_db_usage.get()
+        if usage is not None:
+            usage["open"] += 1
+            usage["peak"] = max(usage["peak"], usage["open"])
+
+    @event.listens_for(target_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        usage = _request_db_usage.get()
+        if usage is not None and usage["open"] > 0:
+            usage["open"] -= 1
+
+
+_track_request_connections(engine)
+_track_request_connections(async_engine.sync_engine)
+if replica_engine is not None:
+    _track_request_connections(replica_engine)
+
+
+class DBUsageMiddleware:
+    """요청마다 동시에 점유한 DB 커넥션 수(최대)를 집계하는 ASGI 미들웨어 (get_db_pool_metrics의 per_request)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        usage = {"open": 0, "peak": 0}
+        token = _request_db_usage.set(usage)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_db_usage.reset(token)
+            with _usage_lock:
+                _usage_stats["requests"] += 1
+                by_peak = _usage_stats["by_peak_connections"]
+                by_peak[usage["peak"]] = by_peak.get(usage["peak"], 0) + 1
+                if usage["peak"] > 1:
+                    _multi_connection_paths.append(f"{scope.get('method')} {scope.get('path')} ({usage['peak']})")
+
 # 로깅 설정
 logger = logging.getLogger(__name__)
 
 # 데이터베이스 세션 의존성 함수
 def get_db():
-    """데이터베이스 세션 생성 및 관리"""
+    """
+    요청 단위 데이터베이스 세션 생성 및 관리
+
+    FastAPI는 같은 의존성 함수를 요청마다 한 번만 실행하므로, 모든 라우터와 get_current_user가
+    이 함수를 사용해야 한 요청이 하나의 세션(커넥션)을 공유합니다. 라우터별로 따로 정의하지 마세요.
+    """
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def _measure_replica_lag():
+    """
+    복제본의 복제 지연(초) 조회, 복제가 멈춘 경우 None
+
+    SHOW REPLICA STATUS(MySQL 8.0.22+) → SHOW SLAVE STATUS 순으로 시도합니다.
+    복제 설정이 없는 DB(로컬에서 두 번째 DB를 복제본으로 지정한 경우 등)는 지연 0으로 간주합니다.
+    """
+    with replica_engine.connect() as conn:
+        for statement, column in (
+            ("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+            ("SHOW SLAVE STATUS", "Seconds_Behind_Master"),
+        ):
+            try:
+                row = conn.execute(text(statement)).mappings().first()
+            except DBAPIError:
+                conn.rollback()
+                continue
+            if row is None:
+                return 0.0
+            lag = row.get(column)
+            return float(lag) if lag is not None else None
+    raise RuntimeError("복제 상태를 확인할 수 없습니다 (REPLICATION CLIENT 권한 확인)")
+
+
+def _replica_is_healthy() -> bool:
+    """REPLICA_LAG_CHECK_SECONDS마다 복제 지연을 확인하고, 그 사이에는 마지막 결과 사용"""
+    now = time.monotonic()
+    with _replica_lock:
+        if now - _replica_state["checked_at"] < REPLICA_LAG_CHECK_SECONDS:
+            return _replica_state["healthy"]
+        # 확인하는 동안 들어온 다른 요청은 이전 결과 사용
+        _replica_state["checked_at"] = now
+        was_healthy = _replica_state["healthy"]
+
+    error = None
+    try:
+        lag = _measure_replica_lag()
+    except Exception as e:
+        lag, error = None, str(e)
+    healthy = lag is not None and lag <= REPLICA_MAX_LAG_SECONDS
+
+    with _replica_lock:
+        _replica_state.update({"healthy": healthy, "lag_seconds": lag, "error": error})
+    if healthy != was_healthy:
+        if healthy:
+            print(f"📖 읽기 복제본 사용 (복제 지연 {lag:.0f}s)")
+        else:
+            print(f"⚠️ 읽기 복제본 사용 중지 → primary에서 조회 (복제 지연 {lag}, 오류: {error})")
+    return healthy
+
+
+def read_session():
+    """
+    읽기 전용 조회용 세션 생성 (복제본이 설정되어 있고 지연이 허용 범위면 복제본, 아니면 primary)
+
+    복제본은 방금 쓴 데이터가 늦게 보일 수 있으므로 관리자 대시보드/이력 조회처럼
+    약간 늦어도 되는 조회에만 사용하고, 이 세션으로 쓰기 작업을 하지 마세요.
+    """
+    if ReplicaSessionLocal is not None:
+        if _replica_is_healthy():
+            with _replica_lock:
+                _replica_state["replica_sessions"] += 1
+            db = ReplicaSessionLocal()
+            db.info["role"] = "replica"
+            return db
+        with _replica_lock:
+            _replica_state["primary_fallbacks"] += 1
+    db = SessionLocal()
+    db.info["role"] = "primary"
+    return db
+
+
+def get_read_db():
+    """읽기 전용 엔드포인트용 세션 의존성 (Depends(get_read_db)로 표시한 엔드포인트는 복제본으로 라우팅)"""
+    db = read_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    """
+    async 엔드포인트용 요청 단위 비동기 세션 (get_db와 마찬가지로 요청당 하나만 생성)
+
+    지연 로딩(lazy load)을 사용할 수 없으므로 관계 데이터는 selectinload 등으로 함께 조회해야 합니다.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_db_pool_metrics():
+    """DB 커넥션 풀 사용 현황 (요청당 커넥션 1개만 사용하는지 확인용)"""
+    def snapshot(pool):
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+        }
+
+    with _replica_lock:
+        routing = {key: value for key, value in _replica_state.items() if key != "checked_at"}
+    with _usage_lock:
+        by_peak = dict(sorted(_usage_stats["by_peak_connections"].items()))
+        per_request = {
+            "requests": _usage_stats["requests"],
+            # 동시에 점유한 최대 커넥션 수 → 요청 수 (2 이상이 없어야 요청당 커넥션 1개)
+            "by_peak_connections": {str(peak): count for peak, count in by_peak.items()},
+            "multi_connection_requests": sum(count for peak, count in by_peak.items() if peak > 1),
+            "recent_multi_connection_paths": list(_multi_connection_paths),
+        }
+    return {
+        "per_request": per_request,
+        "sync": snapshot(engine.pool),
+        "async": snapshot(async_engine.pool),
+        "replica": {
+            "configured": replica_engine is not None,
+            "max_lag_seconds": REPLICA_MAX_LAG_SECONDS,
+            "pool": snapshot(replica_engine.pool) if replica_engine is not None else None,
+            **routing,
+        },
+    }
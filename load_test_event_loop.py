@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+이벤트 루프 지연 부하 테스트
+
+DB를 조회하는 async 엔드포인트에 동시 요청을 보내는 동안, DB를 쓰지 않는 가벼운 경로(probe)의
+응답 시간을 주기적으로 측정합니다. 동기 세션이 이벤트 루프를 막으면 부하 구간에서 probe 지연이 크게 늘고,
+비동기 세션(get_async_db)이면 부하 전과 비슷하게 유지됩니다.
+
+사용법 (서버 실행 후):
+    python load_test_event_loop.py --nickname admin --password ****
+    python load_test_event_loop.py --token <JWT> --endpoint /api/survey/list --concurrency 100 --duration 30
+    # 비교용: 동기 세션을 쓰는 async 엔드포인트
+    python load_test_event_loop.py --token <JWT> --endpoint /api/users/list
+"""
+
+import argparse
+import asyncio
+import time
+from typing import List
+
+import httpx
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def describe(name: str, latencies: List[float]) -> str:
+    ms = [v * 1000 for v in latencies]
+    return (
+        f"{name:<12} n={len(ms):>6}  p50={percentile(ms, 0.50):7.1f}ms  p95={percentile(ms, 0.95):7.1f}ms  "
+        f"p99={percentile(ms, 0.99):7.1f}ms  max={max(ms, default=0):7.1f}ms"
+    )
+
+
+async def login(client: httpx.AsyncClient, nickname: str, password: str) -> str:
+    response = await client.post("/api/users/login", data={"username": nickname, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def probe(client: httpx.AsyncClient, path: str, interval: float, stop: asyncio.Event, out: List[float]):
+    """DB를 사용하지 않는 경로의 응답 시간 = 서버 이벤트 루프가 얼마나 빨리 요청을 처리하는지"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get(path)
+        out.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+
+
+async def hammer(client: httpx.AsyncClient, path: str, headers: dict, stop: asyncio.Event, out: List[float], errors: List[int]):
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            response = await client.get(path, headers=headers)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError:
+            errors.append(0)
+        out.append(time.perf_counter() - started)
+
+
+async def run_phase(client, args, headers, with_load: bool):
+    stop = asyncio.Event()
+    probe_latencies: List[float] = []
+    load_latencies: List[float] = []
+    errors: List[int] = []
+    tasks = [asyncio.create_task(probe(client, args.probe_path, args.probe_interval, stop, probe_latencies))]
+    if with_load:
+        tasks += [
+            asyncio.create_task(hammer(client, args.endpoint, headers, stop, load_latencies, errors))
+            for _ in range(args.concurrency)
+        ]
+    await asyncio.sleep(args.baseline if not with_load else args.duration)
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return probe_latencies, load_latencies, errors
+
+
+async def main(args):
+    limits = httpx.Limits(max_connections=args.concurrency + 10, max_keepalive_connections=args.concurrency + 10)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        token = args.token or await login(client, args.nickname, args.password)
+        headers = {"Authorization": f"Bearer {token}"}
+        await client.get(args.probe_path)  # 첫 요청(스키마 생성 등) 제외
+
+        print(f"⏱️ 기준 측정 ({args.baseline:.0f}초, 부하 없음) - probe: {args.probe_path}")
+        baseline, _, _ = await run_phase(client, args, headers, with_load=False)
+        print(f"🔥 부하 측정 ({args.duration:.0f}초, 동시 {args.concurrency}개) - {args.endpoint}")
+        loaded, load_latencies, errors = await run_phase(client, args, headers, with_load=True)
+
+    print()
+    print(describe("probe 기준", baseline))
+    print(describe("probe 부하", loaded))
+    print(describe("DB 엔드포인트", load_latencies))
+    print(f"처리량: {len(load_latencies) / args.duration:.1f} req/s, 오류: {len(errors)}건")
+
+    ratio = percentile(loaded, 0.95) / max(percentile(baseline, 0.95), 1e-6)
+    if ratio > args.max_ratio:
+        print(f"⚠️ 부하 중 probe p95가 기준의 {ratio:.1f}배 - 이벤트 루프가 막히고 있습니다.")
+        raise SystemExit(1)
+    print(f"✅ 부하 중 probe p95가 기준의 {ratio:.1f}배 - 이벤트 루프 지연이 일정하게 유지됩니다.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DB 부하 중 이벤트 루프 지연 측정")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--token", help="Bearer 토큰 (없으면 --nickname/--password로 로그인)")
+    parser.add_argument("--nickname")
+    parser.add_argument("--password")
+    parser.add_argument("--endpoint", default="/api/users/me/stats", help="부하를 줄 DB 조회 엔드포인트 (GET)")
+    parser.add_argument("--probe-path", default="/openapi.json", help="DB를 사용하지 않는 측정용 경로")
+    parser.add_argument("--probe-interval", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--baseline", type=float, default=5.0, help="기준 측정 시간(초)")
+    parser.add_argument("--duration", type=float, default=20.0, help="부하 측정 시간(초)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--max-ratio", type=float, default=3.0, help="허용하는 부하 중/기준 probe p95 비율")
+    args = parser.parse_args()
+    if not args.token and not (args.nickname and args.password):
+        parser.error("--token 또는 --nickname/--password가 필요합니다.")
+    asyncio.run(main(args))
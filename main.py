@@ -11,6 +11,9 @@ from routers import chatbot_router
 from routers import survey_router
 from routers import feedback_router
 from routers import admin_router
+from utils.llm_limiter import LLMRateLimitedError
+from utils.deadline import DeadlineMiddleware, DeadlineExceededError
+from database import DBUsageMiddleware
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
@@ -34,6 +37,12 @@ origins = [
     "http://localhost:5173", # React 개발 서버 주소
 ]
 
+# 요청별 마감 시간 설정 및 클라이언트 연결 종료 시 처리 취소
+app.add_middleware(DeadlineMiddleware)
+
+# 요청별 DB 커넥션 동시 점유 수 집계 (/api/admin/llm/metrics의 db_pool.per_request)
+app.add_middleware(DBUsageMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -58,6 +67,25 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         },
     )
 
+# LLM 호출 한도 초과 시 429 + Retry-After 응답
+@app.exception_handler(LLMRateLimitedError)
+async def llm_rate_limited_handler(request: Request, exc: LLMRateLimitedError):
+    print(f"⏳ LLM 호출 한도 초과 from {request.url}: {exc} (retry after {exc.retry_after}s)")
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "요청이 많아 잠시 후 다시 시도해주세요."},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+# 요청 마감 시간 초과(또는 클라이언트 연결 종료) 시 504 응답
+@app.exception_handler(DeadlineExceededError)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceededError):
+    print(f"⌛ 요청 마감 시간 초과 from {request.url}: {exc}")
+    return JSONResponse(
+        status_code=504,
+        content={"detail": "요청 처리 시간이 초과되었습니다. 잠시 후 다시 시도해주세요."},
+    )
+
 # user_router.py에 있는 API들을 앱에 포함
 app.include_router(user_router.router)
 app.include_router(chatbot_router.router)
@@ -0,0 +1,47 @@
+"""add diagnosis_cache table for reusing chatbot diagnoses
+
+Revision ID: a4c6e2f81d93
+Revises: 
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c6e2f81d93'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # create_tables.py로 이미 만든 DB도 있으므로 테이블이 없을 때만 생성
+    if "diagnosis_cache" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "diagnosis_cache",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("cache_key", sa.String(length=64), nullable=False),
+        sa.Column("season", sa.String(length=10), nullable=False),
+        sa.Column("model", sa.String(length=100), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("hit_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("last_accessed_at", sa.DateTime(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_diagnosis_cache_id", "diagnosis_cache", ["id"])
+    op.create_index("ix_diagnosis_cache_cache_key", "diagnosis_cache", ["cache_key"], unique=True)
+    op.create_index("ix_diagnosis_cache_last_accessed_at", "diagnosis_cache", ["last_accessed_at"])
+    op.create_index("ix_diagnosis_cache_expires_at", "diagnosis_cache", ["expires_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("diagnosis_cache")
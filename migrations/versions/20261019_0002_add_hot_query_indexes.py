@@ -0,0 +1,50 @@
+"""add composite indexes for hot queries
+
+Revision ID: 3c9a7f1e2b40
+Revises: a4c6e2f81d93
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9a7f1e2b40'
+down_revision: Union[str, Sequence[str], None] = 'a4c6e2f81d93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (테이블, 인덱스 이름, 컬럼) - models.py의 __table_args__와 동일하게 유지
+INDEXES = (
+    ("chat_message", "ix_chat_message_history_id_id", ["history_id", "id"]),
+    ("chat_message", "ix_chat_message_history_created", ["history_id", "created_at"]),
+    ("survey_result", "ix_survey_result_user_active_source_created", ["user_id", "is_active", "source_type", "created_at"]),
+    ("chat_history", "ix_chat_history_user_ended_created", ["user_id", "ended_at", "created_at"]),
+    ("ai_feedback", "ix_ai_feedback_message_id", ["message_id"]),
+    ("user_feedback", "ix_user_feedback_history_id", ["history_id"]),
+)
+
+
+def _existing_indexes(table: str) -> set:
+    inspector = sa.inspect(op.get_bind())
+    return {index["name"] for index in inspector.get_indexes(table)}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # create_tables.py(create_all)로 만든 새 DB에는 이미 있으므로 없는 인덱스만 생성
+    for table, name, columns in INDEXES:
+        if name not in _existing_indexes(table):
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # 주의: create_all로 만든 DB에서는 외래 키가 이 인덱스를 사용하므로 MySQL이 삭제를 거부할 수 있음
+    for table, name, columns in reversed(INDEXES):
+        if name in _existing_indexes(table):
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,38 @@
+"""add auth_version table for the authenticated-user cache
+
+Revision ID: 8e52d4a1c7f3
+Revises: 3c9a7f1e2b40
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e52d4a1c7f3'
+down_revision: Union[str, Sequence[str], None] = '3c9a7f1e2b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # create_tables.py로 이미 만든 DB도 있으므로 테이블이 없을 때만 생성
+    if "auth_version" not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            "auth_version",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("version", sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+        )
+    # 워커가 동시에 첫 행을 만들며 충돌하지 않도록 미리 생성
+    if not op.get_bind().execute(sa.text("SELECT 1 FROM auth_version WHERE id = 1")).first():
+        op.execute("INSERT INTO auth_version (id, version) VALUES (1, 0)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("auth_version")
@@ -0,0 +1,60 @@
+"""add user_stats table with per-user My Page counters
+
+Revision ID: 5b1d9e6f0a27
+Revises: 8e52d4a1c7f3
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1d9e6f0a27'
+down_revision: Union[str, Sequence[str], None] = '8e52d4a1c7f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # create_tables.py로 이미 만든 DB도 있으므로 테이블이 없을 때만 생성
+    if "user_stats" not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            "user_stats",
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("total_surveys", sa.Integer(), nullable=False),
+            sa.Column("saved_results", sa.Integer(), nullable=False),
+            sa.Column("chat_sessions", sa.Integer(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+            sa.PrimaryKeyConstraint("user_id"),
+        )
+    # 기존 사용자의 카운터를 실제 값으로 채움 (이후에는 쓰기 트랜잭션에서 증감)
+    op.execute(
+        """
+        INSERT INTO user_stats (user_id, total_surveys, saved_results, chat_sessions, updated_at)
+        SELECT u.id, COALESCE(s.total_surveys, 0), COALESCE(s.saved_results, 0), COALESCE(c.chat_sessions, 0), UTC_TIMESTAMP()
+        FROM `user` u
+        LEFT JOIN (
+            SELECT user_id, COUNT(*) AS total_surveys, SUM(is_active = 1) AS saved_results
+            FROM survey_result GROUP BY user_id
+        ) s ON s.user_id = u.id
+        LEFT JOIN (
+            SELECT user_id, COUNT(*) AS chat_sessions
+            FROM chat_history WHERE ended_at IS NOT NULL GROUP BY user_id
+        ) c ON c.user_id = u.id
+        ON DUPLICATE KEY UPDATE
+            total_surveys = VALUES(total_surveys),
+            saved_results = VALUES(saved_results),
+            chat_sessions = VALUES(chat_sessions),
+            updated_at = VALUES(updated_at)
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("user_stats")
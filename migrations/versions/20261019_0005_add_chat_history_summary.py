@@ -0,0 +1,37 @@
+"""add rolling summary columns to chat_history
+
+Revision ID: c7e13b5a9f04
+Revises: 5b1d9e6f0a27
+Create Date: 2026-10-19 16:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e13b5a9f04'
+down_revision: Union[str, Sequence[str], None] = '5b1d9e6f0a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # create_tables.py로 새로 만든 DB에는 이미 있으므로 없는 컬럼만 추가
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("chat_history")}
+    if "summary" not in columns:
+        op.add_column("chat_history", sa.Column("summary", sa.Text(), nullable=True))
+    if "summary_message_count" not in columns:
+        op.add_column(
+            "chat_history",
+            sa.Column("summary_message_count", sa.Integer(), nullable=False, server_default="0"),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("chat_history", "summary_message_count")
+    op.drop_column("chat_history", "summary")
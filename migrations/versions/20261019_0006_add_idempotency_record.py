@@ -0,0 +1,52 @@
+"""add idempotency_record table for Idempotency-Key retries
+
+Revision ID: e2f84c0b6a51
+Revises: c7e13b5a9f04
+Create Date: 2026-10-19 16:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2f84c0b6a51'
+down_revision: Union[str, Sequence[str], None] = 'c7e13b5a9f04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # create_tables.py로 이미 만든 DB도 있으므로 테이블이 없을 때만 생성
+    if "idempotency_record" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "idempotency_record",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("record_key", sa.String(length=64), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("endpoint", sa.String(length=50), nullable=False),
+        sa.Column("request_hash", sa.String(length=64), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("in_progress", "completed", name="idempotency_status_enum"),
+            nullable=False,
+        ),
+        sa.Column("response_body", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_idempotency_record_id", "idempotency_record", ["id"])
+    op.create_index("ix_idempotency_record_record_key", "idempotency_record", ["record_key"], unique=True)
+    op.create_index("ix_idempotency_record_user_id", "idempotency_record", ["user_id"])
+    op.create_index("ix_idempotency_record_expires_at", "idempotency_record", ["expires_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("idempotency_record")
@@ -0,0 +1,31 @@
+"""add routing column to chat_message
+
+Revision ID: f1a9d3c6b2e8
+Revises: e2f84c0b6a51
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a9d3c6b2e8'
+down_revision: Union[str, Sequence[str], None] = 'e2f84c0b6a51'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # create_tables.py로 새로 만든 DB에는 이미 있으므로 없을 때만 추가
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("chat_message")}
+    if "routing" not in columns:
+        op.add_column("chat_message", sa.Column("routing", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("chat_message", "routing")
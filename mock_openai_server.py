@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+부하 테스트용 OpenAI 모의(mock) 서버
+
+이 코드베이스가 사용하는 /v1/chat/completions, /v1/embeddings 만 구현합니다.
+- record 모드: 실제 OpenAI API로 요청을 전달하고 응답을 파일로 저장
+- replay 모드: 저장된 응답을 재생 (없으면 합성 응답 생성), 네트워크/과금 없음
+- 지연 시간 분포(fixed/uniform/lognormal)와 오류 주입(429/500 등) 지원
+
+사용법:
+    # 1) 실제 응답 녹화
+    python mock_openai_server.py --mode record --port 8010
+    # 2) 오프라인 재생 (평균 800ms 지연, 2% 확률로 500 오류)
+    python mock_openai_server.py --mode replay --latency lognormal --latency-ms 800 --error-rate 0.02
+
+    # 백엔드가 모의 서버를 사용하도록 설정 (.env)
+    OPENAI_BASE_URL=http://127.0.0.1:8010/v1
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import time
+from typing import Any, Dict
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from utils.prompts import (
+    CHAT_SYSTEM_PROMPT, DIAGNOSIS_SYSTEM_PROMPT, FEEDBACK_SYSTEM_PROMPT, SURVEY_SYSTEM_PROMPT,
+)
+
+EMBEDDING_DIMENSIONS = 1536
+
+app = FastAPI(title="Mock OpenAI")
+config: Dict[str, Any] = {}
+stats = {"requests": 0, "replayed": 0, "recorded": 0, "synthetic": 0, "injected_errors": 0}
+
+
+def request_key(endpoint: str, body: dict) -> str:
+    """요청 본문(모델, 메시지, 입력 등)을 정규화해 녹화 파일 키 생성"""
+    canonical = {k: v for k, v in body.items() if k not in ("stream", "user", "timeout")}
+    raw = json.dumps(canonical, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(f"{endpoint}\n{raw}".encode("utf-8")).hexdigest()
+
+
+def record_path(endpoint: str, key: str) -> str:
+    return os.path.join(config["record_dir"], endpoint.replace("/", "_"), f"{key}.json")
+
+
+def sample_latency_seconds() -> float:
+    """설정된 분포에서 응답 지연 시간 샘플링"""
+    mean_ms = config["latency_ms"]
+    dist = config["latency"]
+    if dist == "uniform":
+        jitter = config["latency_jitter_ms"]
+        ms = random.uniform(max(0.0, mean_ms - jitter), mean_ms + jitter)
+    elif dist == "lognormal":
+        # 평균이 mean_ms가 되도록 mu 보정 (sigma로 꼬리 길이 조정)
+        sigma = config["latency_sigma"]
+        mu = math.log(max(mean_ms, 1.0)) - sigma ** 2 / 2
+        ms = random.lognormvariate(mu, sigma)
+    else:
+        ms = mean_ms
+    return ms / 1000
+
+
+def injected_error():
+    """error_rate 확률로 OpenAI 형식의 오류 응답 반환"""
+    if config["error_rate"] > 0 and random.random() < config["error_rate"]:
+        stats["injected_errors"] += 1
+        status = config["error_status"]
+        return JSONResponse(
+            status_code=status,
+            content={"error": {"message": f"mock injected error ({status})", "type": "mock_error", "code": None}},
+            headers={"retry-after": "1"} if status == 429 else None,
+        )
+    return None
+
+
+# 호출 종류별 고정 지시문(system 프롬프트) - 사용자 데이터에 섞인 키워드로 잘못 판별하지 않도록 먼저 확인
+# (평가 프롬프트는 평가 대상 답변 JSON을 포함하므로 primary_tone 등의 키워드가 함께 들어 있음)
+_SYSTEM_PROMPT_KINDS = (
+    (FEEDBACK_SYSTEM_PROMPT, "feedback"),
+    (CHAT_SYSTEM_PROMPT, "chat"),
+    (DIAGNOSIS_SYSTEM_PROMPT, "diagnosis"),
+    (SURVEY_SYSTEM_PROMPT, "survey"),
+)
+
+
+def prompt_kind(messages: list) -> str:
+    """요청 메시지가 어느 호출(chat/diagnosis/survey/feedback/emotion/other)의 프롬프트인지 판별"""
+    system_text = "\n".join(str(m.get("content", "")) for m in messages if m.get("role") == "system")
+    for system_prompt, kind in _SYSTEM_PROMPT_KINDS:
+        if system_prompt in system_text:
+            return kind
+    if "감정" in system_text:
+        return "emotion"
+    # 지시문을 알 수 없는 프롬프트는 키워드로 추정 (평가 항목 키워드를 가장 먼저 확인)
+    prompt_text = "\n".join(str(m.get("content", "")) for m in messages)
+    for marker, kind in (
+        ("accuracy", "feedback"),
+        ("emotional_description", "diagnosis"),
+        ("result_tone", "survey"),
+        ("primary_tone", "chat"),
+    ):
+        if marker in prompt_text:
+            return kind
+    return "other"
+
+
+def synthetic_chat_completion(body: dict) -> dict:
+    """녹화된 응답이 없을 때 사용할 합성 chat completion (JSON 응답을 기대하는 프롬프트에 맞춰 생성)"""
+    messages = body.get("messages", [])
+    prompt_text = "\n".join(str(m.get("content", "")) for m in messages)
+    kind = prompt_kind(messages)
+    if kind == "chat":
+        content = json.dumps({
+            "primary_tone": "웜",
+            "sub_tone": "봄",
+            "description": "모의 응답입니다. 밝고 따뜻한 컬러가 잘 어울리실 것 같아요.",
+            "recommendations": ["코랄 립", "피치 블러셔", "아이보리 니트"],
+        }, ensure_ascii=False)
+    elif kind == "diagnosis":
+        content = json.dumps({
+            "emotional_description": "모의 진단 결과입니다.",
+            "color_palette": ["#FFB6C1", "#FFA07A", "#FFFF99", "#98FB98", "#87CEEB"],
+            "style_keywords": ["밝은", "화사한", "생동감 있는", "따뜻한", "자연스러운"],
+            "makeup_tips": ["코랄 립", "피치 블러셔", "골드 섀도", "브라운 마스카라"],
+            "detailed_analysis": "모의 서버가 생성한 상세 분석입니다. " * 4,
+        }, ensure_ascii=False)
+    elif kind == "feedback":
+        content = json.dumps({
+            "accuracy": 80, "detail_accuracy": "모의 평가입니다.",
+            "consistency": 80, "detail_consistency": "모의 평가입니다.",
+            "reliability": 80, "detail_reliability": "모의 평가입니다.",
+            "personalization": 80, "detail_personalization": "모의 평가입니다.",
+            "practicality": 80, "detail_practicality": "모의 평가입니다.",
+            "total_score": 80, "vector_db_quality": 80,
+        }, ensure_ascii=False)
+    elif kind == "survey":
+        content = json.dumps({
+            "result_tone": "spring", "confidence": 80, "total_score": 80,
+            "detailed_analysis": "모의 서버가 생성한 설문 분석입니다.",
+        }, ensure_ascii=False)
+    elif kind == "emotion":
+        content = "neutral"
+    else:
+        content = "모의 응답입니다."
+
+    prompt_tokens = max(1, len(prompt_text) // 2)
+    completion_tokens = max(1, len(content) // 2)
+    return {
+        "id": f"chatcmpl-mock-{random.getrandbits(48):012x}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def synthetic_embeddings(body: dict) -> dict:
+    """입력 텍스트 해시 기반의 결정적(재현 가능한) 단위 벡터 생성"""
+    inputs = body.get("input", [])
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    data = []
+    total_tokens = 0
+    for i, text in enumerate(inputs):
+        rng = random.Random(hashlib.sha256(str(text).encode("utf-8")).digest())
+        vec = [rng.gauss(0, 1) for _ in range(EMBEDDING_DIMENSIONS)]
+        norm = math.sqrt(sum(x * x for x in vec)) or 1.0
+        data.append({"object": "embedding", "index": i, "embedding": [x / norm for x in vec]})
+        total_tokens += max(1, len(str(text)) // 2)
+    return {
+        "object": "list",
+        "data": data,
+        "model": body.get("model", "text-embedding-3-small"),
+        "usage": {"prompt_tokens": total_tokens, "total_tokens": total_tokens},
+    }
+
+
+async def handle(endpoint: str, request: Request, synthesize):
+    stats["requests"] += 1
+    body = await request.json()
+    key = request_key(endpoint, body)
+    path = record_path(endpoint, key)
+
+    if config["mode"] == "record":
+        # 실제 API로 전달하고 응답 저장 (지연/오류 주입 없음)
+        headers = {"Authorization": request.headers.get("authorization", "")}
+        async with httpx.AsyncClient(timeout=120.0) as upstream:
+            resp = await upstream.post(f"{config['upstream']}/{endpoint}", json=body, headers=headers)
+        if resp.status_code == 200:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"request": body, "response": resp.json()}, f, ensure_ascii=False, indent=2)
+            stats["recorded"] += 1
+        return JSONResponse(status_code=resp.status_code, content=resp.json())
+
+    # replay 모드
+    await asyncio.sleep(sample_latency_seconds())
+    error = injected_error()
+    if error is not None:
+        return error
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            stats["replayed"] += 1
+            return JSONResponse(content=json.load(f)["response"])
+    stats["synthetic"] += 1
+    return JSONResponse(content=synthesize(body))
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    return await handle("chat/completions", request, synthetic_chat_completion)
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    return await handle("embeddings", request, synthetic_embeddings)
+
+
+@app.get("/mock/stats")
+async def get_stats():
+    return {"mode": config["mode"], **stats}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="부하 테스트용 OpenAI 모의 서버")
+    parser.add_argument("--mode", choices=["record", "replay"], default=os.getenv("MOCK_OPENAI_MODE", "replay"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("MOCK_OPENAI_PORT", "8010")))
+    parser.add_argument("--record-dir", default=os.getenv("MOCK_OPENAI_RECORD_DIR", "data/mock_openai"))
+    parser.add_argument("--upstream", default="https://api.openai.com/v1")
+    parser.add_argument("--latency", choices=["fixed", "uniform", "lognormal"], default="fixed")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="평균 지연 시간(ms)")
+    parser.add_argument("--latency-jitter-ms", type=float, default=100.0, help="uniform 분포의 ± 범위(ms)")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="lognormal 분포의 sigma")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="오류 주입 확률 (0~1)")
+    parser.add_argument("--error-status", type=int, default=500, help="주입할 HTTP 상태 코드 (예: 429, 500, 503)")
+    parser.add_argument("--seed", type=int, default=None, help="지연/오류 난수 시드 (재현 가능한 벤치마크용)")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    config.update(vars(args))
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    print("🧪 Mock OpenAI 서버")
+    print(f"   - 모드: {args.mode}")
+    print(f"   - 녹화 경로: {args.record_dir}")
+    if args.mode == "replay":
+        print(f"   - 지연: {args.latency} {args.latency_ms}ms, 오류 주입: {args.error_rate:.1%} ({args.error_status})")
+    print(f"   💡 백엔드 .env에 OPENAI_BASE_URL=http://{args.host}:{args.port}/v1 설정")
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum, Boolean, Float, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, Enum, Boolean, Float, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from database import Base
@@ -37,6 +37,11 @@ class SurveyResult(Base):
     
     answers = relationship("SurveyAnswer", back_populates="result", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # 사용자별 활성 결과를 출처별 최신순으로 조회
+        Index("ix_survey_result_user_active_source_created", "user_id", "is_active", "source_type", "created_at"),
+    )
+
 class SurveyAnswer(Base):
     __tablename__ = "survey_answer"
     id = Column(Integer, primary_key=True, index=True)
@@ -52,10 +57,17 @@ class ChatHistory(Base):
     user_id = Column(Integer, ForeignKey("user.id"), nullable=False)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     ended_at = Column(DateTime, nullable=True)
+    summary = Column(Text, nullable=True)  # 오래된 대화의 누적 요약 (프롬프트 크기 고정용)
+    summary_message_count = Column(Integer, default=0, nullable=False)  # 요약에 반영된 앞쪽 메시지 수
     user = relationship("User", backref="chat_histories")
     messages = relationship("ChatMessage", back_populates="history", cascade="all, delete-orphan")
     user_feedback = relationship("UserFeedback", back_populates="history", uselist=False)
 
+    __table_args__ = (
+        # 사용자의 진행 중(ended_at IS NULL)/종료된 세션을 최신순으로 조회
+        Index("ix_chat_history_user_ended_created", "user_id", "ended_at", "created_at"),
+    )
+
 class ChatMessage(Base):
     __tablename__ = "chat_message"
     id = Column(Integer, primary_key=True, index=True)
@@ -63,10 +75,18 @@ class ChatMessage(Base):
     role = Column(String(10))  # "user" / "ai"
     text = Column(Text, nullable=False)
     emotion = Column(String(20), nullable=True)  # 감정 정보
+    # AI 답변을 만든 경로 JSON (route, model, features, faq_id) - 답변 본문(text)과 분리해 ai_feedback 점수와 오프라인 비교
+    routing = Column(Text, nullable=True)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     history = relationship("ChatHistory", back_populates="messages")
     ai_feedback = relationship("AIFeedback", back_populates="message", uselist=False)
 
+    __table_args__ = (
+        # 대화별 메시지를 id 순 / 시간 순으로 조회
+        Index("ix_chat_message_history_id_id", "history_id", "id"),
+        Index("ix_chat_message_history_created", "history_id", "created_at"),
+    )
+
 class UserFeedback(Base):
     __tablename__ = "user_feedback"
     id = Column(Integer, primary_key=True, index=True)
@@ -76,6 +96,10 @@ class UserFeedback(Base):
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     history = relationship("ChatHistory", back_populates="user_feedback")
 
+    __table_args__ = (
+        Index("ix_user_feedback_history_id", "history_id"),
+    )
+
 class AIFeedback(Base):
     __tablename__ = "ai_feedback"
     id = Column(Integer, primary_key=True, index=True)
@@ -94,3 +118,52 @@ class AIFeedback(Base):
     detail_practicality = Column(Text)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     message = relationship("ChatMessage", back_populates="ai_feedback")
+
+    __table_args__ = (
+        Index("ix_ai_feedback_message_id", "message_id"),
+    )
+
+
+class DiagnosisCache(Base):
+    """generate_complete_diagnosis_data 결과 캐시 (대화 fingerprint 기준)"""
+    __tablename__ = "diagnosis_cache"
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), unique=True, index=True, nullable=False)  # sha256(대화 + 계절 + 모델)
+    season = Column(String(10), nullable=False)
+    model = Column(String(100), nullable=False)
+    payload = Column(Text, nullable=False)  # 진단 데이터 JSON 문자열
+    hit_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    last_accessed_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class IdempotencyRecord(Base):
+    """Idempotency-Key 헤더로 재시도된 요청의 처리 상태/저장된 응답"""
+    __tablename__ = "idempotency_record"
+    id = Column(Integer, primary_key=True, index=True)
+    record_key = Column(String(64), unique=True, index=True, nullable=False)  # sha256(엔드포인트 + 사용자 + 헤더 값)
+    user_id = Column(Integer, ForeignKey("user.id"), nullable=False, index=True)
+    endpoint = Column(String(50), nullable=False)
+    request_hash = Column(String(64), nullable=False)  # 같은 키로 다른 본문을 보내는 경우 감지
+    status = Column(Enum("in_progress", "completed", name="idempotency_status_enum"), default="in_progress", nullable=False)
+    response_body = Column(Text, nullable=True)  # 완료된 응답 JSON 문자열
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class AuthVersion(Base):
+    """인증 사용자 캐시 무효화 버전 (워커 간 공유, 탈퇴/권한 변경 시 증가 - utils/auth_cache.py)"""
+    __tablename__ = "auth_version"
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+
+
+class UserStats(Base):
+    """마이페이지 통계 카운터 (설문 저장/삭제, 대화 종료와 같은 트랜잭션에서 갱신 - utils/user_stats.py)"""
+    __tablename__ = "user_stats"
+    user_id = Column(Integer, ForeignKey("user.id"), primary_key=True)
+    total_surveys = Column(Integer, default=0, nullable=False)  # 모든 진단 기록 수 (삭제된 것 포함)
+    saved_results = Column(Integer, default=0, nullable=False)  # 활성 진단 기록 수
+    chat_sessions = Column(Integer, default=0, nullable=False)  # 종료된 채팅 세션 수
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
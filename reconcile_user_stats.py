@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+마이페이지 통계(user_stats) 정합성 보정
+
+survey_result / chat_history에서 사용자별 값을 직접 세어 user_stats 카운터와 비교하고,
+어긋난 행(또는 없는 행)을 실제 값으로 덮어씁니다. 주기적으로(cron 등) 실행하는 것을 권장합니다.
+user_stats 마이그레이션 후 카운터를 갱신하는 코드를 배포하면 바로 한 번 실행해, 그 사이 생긴 변경을 반영하세요.
+
+배치마다 user_stats 행을 잠근(FOR UPDATE) 뒤 세므로, 실행 중 들어온 설문 저장/삭제, 대화 종료의
+카운터 증감은 잠금이 풀린 뒤 보정된 값 위에 반영됩니다.
+
+사용법:
+    python reconcile_user_stats.py              # 보정
+    python reconcile_user_stats.py --dry-run    # 어긋난 사용자만 출력
+    python reconcile_user_stats.py --batch-size 200
+"""
+
+import argparse
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+
+load_dotenv()
+
+import models
+from database import SessionLocal
+from utils.user_stats import STAT_COLUMNS, actual_stats_select, stats_overwrite
+
+
+def reconcile_batch(db, user_ids, dry_run: bool):
+    """한 배치의 사용자 카운터를 실제 값과 비교해 어긋난 행 목록 반환 (dry_run이 아니면 덮어씀)"""
+    stored = {
+        stats.user_id: stats
+        for stats in db.scalars(
+            select(models.UserStats).where(models.UserStats.user_id.in_(user_ids)).with_for_update()
+        )
+    }
+    drifted = []
+    for row in db.execute(actual_stats_select(user_ids)):
+        current = stored.get(row.id)
+        if current is None or any(getattr(current, name) != getattr(row, name) for name in STAT_COLUMNS):
+            drifted.append((row, current))
+
+    if drifted and not dry_run:
+        db.execute(stats_overwrite([row for row, _ in drifted]))
+    return drifted
+
+
+def describe(row, current) -> str:
+    actual = ", ".join(f"{name}={getattr(row, name)}" for name in STAT_COLUMNS)
+    if current is None:
+        return f"user_id={row.id}: 행 없음 → {actual}"
+    before = ", ".join(f"{name}={getattr(current, name)}" for name in STAT_COLUMNS)
+    return f"user_id={row.id}: {before} → {actual}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="user_stats 카운터를 실제 값으로 보정")
+    parser.add_argument("--dry-run", action="store_true", help="수정하지 않고 어긋난 사용자만 출력")
+    parser.add_argument("--batch-size", type=int, default=500, help="한 트랜잭션에서 처리할 사용자 수")
+    args = parser.parse_args()
+
+    print(f"🔄 user_stats 정합성 점검 시작{' (dry-run)' if args.dry_run else ''}")
+    checked = fixed = 0
+    last_id = 0
+    with SessionLocal() as db:
+        while True:
+            user_ids = list(db.scalars(
+                select(models.User.id).where(models.User.id > last_id).order_by(models.User.id).limit(args.batch_size)
+            ))
+            if not user_ids:
+                break
+            last_id = user_ids[-1]
+
+            drifted = reconcile_batch(db, user_ids, args.dry_run)
+            for row, current in drifted:
+                print(f"   - {describe(row, current)}")
+            if args.dry_run:
+                db.rollback()
+            else:
+                db.commit()
+            checked += len(user_ids)
+            fixed += len(drifted)
+
+    if not fixed:
+        print(f"✅ 사용자 {checked}명 모두 일치합니다.")
+    elif args.dry_run:
+        print(f"⚠️ 사용자 {checked}명 중 {fixed}명 불일치 (수정하지 않음)")
+    else:
+        print(f"✅ 사용자 {checked}명 중 {fixed}명 보정 완료")
@@ -1,10 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from typing import Optional
 import models
 import json
 from routers.user_router import get_current_user
-from utils.shared import get_db
+from database import get_db, get_read_db, get_db_pool_metrics
+from utils.llm_client import get_breaker_metrics, get_connection_metrics
+from utils.llm_metrics import summarize_llm_calls
+from utils.llm_limiter import get_limiter_metrics
+from utils.faq_bank import get_faq_metrics
+from utils.model_router import get_routing_metrics
+from utils.structured_output import get_parse_metrics
+from utils.auth_cache import get_auth_cache_metrics
+from utils.diagnosis_cache import get_diagnosis_cache_metrics
+from utils.single_flight import single_flight
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 
@@ -39,7 +48,7 @@ def get_admin_chat_histories(
     user_id: Optional[int] = None,
     include_ai_feedback: bool = True,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     # admin 권한 체크
     if current_user.role != "admin":
@@ -50,12 +59,34 @@ def get_admin_chat_histories(
         query = query.filter(models.ChatHistory.user_id == user_id)
 
     total = query.count()
-    histories = query.order_by(models.ChatHistory.id.desc()).offset((page - 1) * page_size).limit(page_size).all()
+
+    # 페이지 크기와 무관하게 쿼리 수가 일정하도록 일괄 로딩
+    # (count 1 + histories 1 + messages 1 + ai_feedback 1 + user_feedback 1)
+    load_messages = selectinload(models.ChatHistory.messages)
+    if include_ai_feedback:
+        load_messages = load_messages.selectinload(models.ChatMessage.ai_feedback)
+    histories = (
+        query.options(load_messages)
+        .order_by(models.ChatHistory.id.desc())
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+        .all()
+    )
+
+    history_ids = [h.id for h in histories]
+    user_feedbacks = {}
+    if history_ids:
+        rows = db.query(models.UserFeedback).filter(
+            models.UserFeedback.history_id.in_(history_ids)
+        ).order_by(models.UserFeedback.id.asc()).all()
+        for row in rows:
+            # 세션당 여러 건이면 가장 먼저 저장된 피드백 사용
+            user_feedbacks.setdefault(row.history_id, row)
 
     items = []
     for h in histories:
         # user feedback (if any)
-        uf = db.query(models.UserFeedback).filter_by(history_id=h.id).first()
+        uf = user_feedbacks.get(h.id)
         user_feedback = None
         if uf:
             user_feedback = {
@@ -71,7 +102,7 @@ def get_admin_chat_histories(
             ai_msg = p["ai_msg"]
             ai_feedback_obj = None
             if include_ai_feedback:
-                fb = db.query(models.AIFeedback).filter_by(message_id=ai_msg.id).first()
+                fb = ai_msg.ai_feedback
                 if fb:
                     ai_feedback_obj = {
                         "id": fb.id,
@@ -109,3 +140,27 @@ def get_admin_chat_histories(
         })
 
     return {"page": page, "page_size": page_size, "total": total, "items": items}
+
+
+@router.get("/llm/metrics")
+def get_llm_metrics(
+    window_seconds: Optional[int] = Query(None, ge=1),
+    current_user: models.User = Depends(get_current_user),
+):
+    # admin 권한 체크
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="관리자만 접근 가능합니다.")
+
+    return {
+        "circuit_breakers": get_breaker_metrics(),
+        "connection_pool": get_connection_metrics(),
+        "db_pool": get_db_pool_metrics(),
+        "auth_cache": get_auth_cache_metrics(),
+        "diagnosis_cache": get_diagnosis_cache_metrics(),
+        "single_flight": single_flight.snapshot(),
+        "rate_limiter": get_limiter_metrics(),
+        "calls": summarize_llm_calls(window_seconds),
+        "faq_bank": get_faq_metrics(),
+        "model_routing": get_routing_metrics(),
+        "structured_output": get_parse_metrics(),
+    }
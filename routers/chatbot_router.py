@@ -1,16 +1,22 @@
 
-from fastapi import APIRouter, HTTPException, Depends, status
-from openai import OpenAI
+from fastapi import APIRouter, HTTPException, Depends, status, BackgroundTasks, Header
+from fastapi.concurrency import run_in_threadpool
 from dotenv import load_dotenv
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime, timezone
 import models
-from routers.user_router import get_current_user
-from database import SessionLocal
+from routers.user_router import get_current_user, get_current_user_async
+from database import SessionLocal, AsyncSessionLocal, get_db, get_async_db
 import os
 import json
+import threading
+from typing import List, Optional
 
 from schemas import (
+    ChatTurnOutput,
+    DiagnosisOutput,
     ChatbotRequest,
     ChatbotHistoryResponse,
     ChatItemModel,
@@ -19,18 +25,39 @@ from schemas import (
     ReportResponse,
 )
 from routers.feedback_router import generate_ai_feedbacks
-from utils.shared import top_k_chunks, build_rag_index, analyze_conversation_for_color_tone
+from utils.shared import top_k_chunks, build_rag_index, embed_texts, analyze_conversation_for_color_tone
+from utils.llm_client import chat_completion, get_openai_client, LLMUnavailableError
+from utils.llm_limiter import LLMRateLimitedError
+from utils.diagnosis_cache import make_diagnosis_cache_key, get_cached_diagnosis, set_cached_diagnosis
+from utils.single_flight import single_flight, make_flight_key
+from utils.faq_bank import faq_available, embed_faq_question, match_faq
+from utils.model_router import route_chat_model
+from utils.structured_output import structured_completion
+from utils.prompts import build_chat_messages, build_diagnosis_messages
+from utils.deadline import remaining as deadline_remaining, has_time_for, DeadlineExceededError, no_deadline
+from utils.idempotency import begin_idempotent_request, complete_idempotent_request, abandon_idempotent_request
+from utils.user_stats import stats_delta
+from utils.conversation_summary import (
+    build_conversation_context,
+    update_conversation_summary,
+    SUMMARY_RECENT_MESSAGES,
+    SUMMARY_UPDATE_EVERY_MESSAGES,
+)
 
 load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise RuntimeError("환경변수 OPENAI_API_KEY가 설정되지 않았습니다.")
 
 # 모델 설정
 EMOTION_MODEL_ID = os.getenv("EMOTION_MODEL_ID")
 DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "gpt-4.1-nano-2025-04-14")
-
-client = OpenAI(api_key=OPENAI_API_KEY)
+# 요청 마감까지 남은 시간이 이보다 적으면 RAG 검색을 생략하고 답변 생성에 시간 배정
+RAG_MIN_REMAINING_SECONDS = float(os.getenv("RAG_MIN_REMAINING_SECONDS", "10"))
+# /analyze 응답에 포함할 최근 질문/답변 쌍 수 (전체 대화 내역은 /api/feedback/ai_feedbacks/{history_id})
+CHAT_RESPONSE_RECENT_ITEMS = int(os.getenv("CHAT_RESPONSE_RECENT_ITEMS", "20"))
+# 프롬프트에 원문으로 넣는 요약 이후 메시지 최대 수
+# (요약은 응답 후 갱신되므로 직전 턴 2개와 현재 질문까지 포함해도 요약과의 사이에 빠지는 메시지가 없도록 여유를 둠)
+CONTEXT_MAX_MESSAGES = SUMMARY_RECENT_MESSAGES + SUMMARY_UPDATE_EVERY_MESSAGES + 2
+
+client = get_openai_client()
 router = APIRouter(prefix="/api/chatbot", tags=["Chatbot"])
 
 
@@ -47,63 +74,45 @@ if EMOTION_MODEL_ID:
 else:
     print(f"   ⚠️ Fine-tuned 모델 미설정, 기본 모델 사용")
 
-def generate_complete_diagnosis_data(conversation_text: str, season: str) -> dict:
+def generate_complete_diagnosis_data(conversation_text: str, season: str, user_id: int | None = None) -> dict:
     """
     OpenAI API를 통해 완전한 진단 데이터 생성
     """
     try:
-        # 대화 텍스트가 너무 길면 요약
+        # 대화 텍스트가 너무 길면 최근 대화 위주로 자르기 (앞부분은 누적 요약으로 전달됨)
         if len(conversation_text) > 1000:
-            conversation_text = conversation_text[:1000] + "...(생략)"
-        prompt = f"""
-사용자와 퍼스널 컬러 전문가의 대화:
-{conversation_text}
-
-위 대화를 바탕으로 {season} 타입 퍼스널 컬러 진단 결과를 생성해주세요.
-
-다음 JSON 형식으로만 응답해주세요 (다른 설명 없이):
-{{
-    "emotional_description": "감성적이고 긍정적인 한 문장 (예: 당신은 따뜻하고 생기 넘치는 {season} 타입입니다!)",
-    "color_palette": ["{season} 타입에 어울리는 5개의 HEX 색상 코드"],
-    "style_keywords": ["{season} 타입의 특성을 나타내는 5개 키워드"],
-    "makeup_tips": ["실용적인 메이크업 팁 4개"],
-    "detailed_analysis": "대화 내용을 반영한 개인화된 분석 (2-3문단, 구체적이고 실용적인 조언 포함)"
-}}
-
-주의사항:
-- detailed_analysis는 반복적인 내용 없이 개인화된 분석으로 작성
-- 대화에서 언급된 개인적 특성을 반영
-- 실용적이고 구체적인 조언 포함
-- 한국어로 작성
-"""
-        # 모델 선택 함수 사용
-        response = client.chat.completions.create(
-            model=get_model_to_use(),
-            messages=[{
-                "role": "system",
-                "content": "당신은 퍼스널 컬러 전문가입니다. 사용자의 대화를 분석하여 정확하고 개인화된 진단 결과를 제공합니다."
-            }, {
-                "role": "user", 
-                "content": prompt
-            }],
+            conversation_text = "(생략)..." + conversation_text[-1000:]
+
+        # 동일한 대화/계절/모델 조합이면 캐시된 진단 결과 재사용 (API 호출 생략)
+        model_to_use = get_model_to_use()
+        cache_key = make_diagnosis_cache_key(conversation_text, season, model_to_use)
+        cached = get_cached_diagnosis(cache_key)
+        if cached:
+            print(f"⚡ 진단 캐시 적중: {cache_key[:12]}...")
+            return cached
+
+        # 모델 선택 함수 사용 (JSON 모드 + 스키마 검증, 잘린 JSON은 복구)
+        parsed, ai_response = structured_completion(
+            client,
+            "chatbot.diagnosis",
+            DiagnosisOutput,
+            timeout=30.0,
+            user_id=user_id,
+            model=model_to_use,
+            messages=build_diagnosis_messages(conversation_text, season),
             max_tokens=1000,
             temperature=0.3
         )
-        ai_response = response.choices[0].message.content.strip()
-        try:
-            import re
-            json_match = re.search(r'\{.*\}', ai_response, re.DOTALL)
-            if json_match:
-                json_str = json_match.group()
-                result = json.loads(json_str)
-                if not result.get("detailed_analysis") or len(result.get("detailed_analysis", "")) < 50:
-                    print("⚠️ AI 분석 결과가 너무 짧음, 기본값 사용")
-                    return get_default_diagnosis_data(season)
-                return result
-        except Exception as parse_error:
-            print(f"❌ AI 응답 JSON 파싱 실패: {parse_error}")
-            print(f"AI 응답: {ai_response[:200]}...")
-        return get_default_diagnosis_data(season)
+        if parsed is None:
+            print(f"❌ AI 응답 JSON 파싱 실패: {ai_response[:200]}...")
+            return get_default_diagnosis_data(season)
+        result = parsed.model_dump()
+        if len(result["detailed_analysis"]) < 50:
+            print("⚠️ AI 분석 결과가 너무 짧음, 기본값 사용")
+            return get_default_diagnosis_data(season)
+        # 기본값이 아닌 AI 생성 결과만 캐시
+        set_cached_diagnosis(cache_key, season, model_to_use, result)
+        return result
     except Exception as e:
         print(f"❌ OpenAI API 호출 실패: {e}")
         return get_default_diagnosis_data(season)
@@ -145,13 +154,6 @@ def get_default_diagnosis_data(season: str) -> dict:
     
     return default_data.get(season, default_data["봄"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # RAG 인덱스 구축 (서버 시작 시 한 번만 실행)
 fixed_index = build_rag_index(client, "data/RAG/personal_color_RAG.txt")
 trend_index = build_rag_index(client, "data/RAG/beauty_trend_2025_autumn_RAG.txt")
@@ -186,7 +188,7 @@ def clean_analysis_text(text: str) -> str:
 async def save_chatbot_analysis_result(
     user_id: int,
     chat_history_id: int,
-    db: Session,
+    db: AsyncSession,
     force: bool = False,
 ):
     """
@@ -203,11 +205,13 @@ async def save_chatbot_analysis_result(
     try:
         # 🔍 중복 방지: force=True이면 중복 체크를 무시하고 항상 새 레코드 생성
         if not force:
-            existing_result = db.query(models.SurveyResult).filter(
-                models.SurveyResult.user_id == user_id,
-                models.SurveyResult.source_type == "chatbot",
-                models.SurveyResult.is_active == True
-            ).order_by(models.SurveyResult.created_at.desc()).first()
+            existing_result = await db.scalar(
+                select(models.SurveyResult).where(
+                    models.SurveyResult.user_id == user_id,
+                    models.SurveyResult.source_type == "chatbot",
+                    models.SurveyResult.is_active == True
+                ).order_by(models.SurveyResult.created_at.desc()).limit(1)
+            )
 
             # 최근 생성된 진단 결과가 5분 이내라면 중복으로 간주
             if existing_result:
@@ -229,28 +233,29 @@ async def save_chatbot_analysis_result(
                     return existing_result
         print(f"🔍 새로운 진단 기록 생성 시작: user_id={user_id}, chat_history_id={chat_history_id}")
         
-        # 대화 히스토리에서 메시지들 가져오기
-        messages = db.query(models.ChatMessage).filter_by(
-            history_id=chat_history_id
-        ).order_by(models.ChatMessage.created_at.asc()).all()
+        # 대화 히스토리에서 요약에 아직 반영되지 않은 메시지들 가져오기
+        chat_history = await db.get(models.ChatHistory, chat_history_id)
+        summarized = (chat_history.summary_message_count or 0) if chat_history else 0
+        messages = (await db.scalars(
+            select(models.ChatMessage).filter_by(
+                history_id=chat_history_id
+            ).order_by(models.ChatMessage.id.asc()).offset(summarized)
+        )).all()
         
         if not messages:
             print("❌ 대화 메시지가 없어서 진단 불가")
             return None
             
-        print(f"📝 대화 메시지 {len(messages)}개 발견, 분석 시작...")
+        print(f"📝 대화 메시지 {summarized + len(messages)}개 발견 (요약 {summarized}개), 분석 시작...")
         
-        # 대화 내용을 분석하여 퍼스널 컬러 결정
-        conversation_text = ""
-        for msg in messages:
-            if msg.role == "user":
-                conversation_text += f"User: {msg.text}\n"
-            elif msg.role == "ai":
-                try:
-                    ai_data = json.loads(msg.text)
-                    conversation_text += f"AI: {ai_data.get('description', msg.text)}\n"
-                except:
-                    conversation_text += f"AI: {msg.text}\n"
+        # 누적 요약 + 최근 대화로 분석 텍스트 구성 (길이 상한 내에서 최근 대화 우선)
+        conversation_text = build_conversation_context(
+            chat_history.summary if chat_history else None,
+            messages,
+            user_label="User",
+            ai_label="AI",
+            max_chars=1000,
+        )
         
         # 대화 분석을 통한 퍼스널 컬러 진단
         primary_tone, sub_tone = analyze_conversation_for_color_tone(
@@ -261,7 +266,10 @@ async def save_chatbot_analysis_result(
         
         # 🆕 OpenAI를 통한 완전한 진단 데이터 생성
         print("🤖 OpenAI API를 통한 맞춤형 진단 데이터 생성 중...")
-        ai_diagnosis_data = generate_complete_diagnosis_data(conversation_text, sub_tone)
+        # 블로킹 API 호출은 스레드풀에서 실행 (대기 중 이벤트 루프가 다른 요청을 처리하도록)
+        ai_diagnosis_data = await run_in_threadpool(
+            generate_complete_diagnosis_data, conversation_text, sub_tone, user_id=user_id
+        )
         
         # 텍스트 정리
         cleaned_analysis = clean_analysis_text(ai_diagnosis_data["detailed_analysis"])
@@ -320,8 +328,9 @@ async def save_chatbot_analysis_result(
         )
         
         db.add(survey_result)
-        db.commit()
-        db.refresh(survey_result)
+        # 마이페이지 통계 카운터도 같은 트랜잭션에서 증가
+        await db.execute(stats_delta(user_id, total_surveys=1, saved_results=1))
+        await db.commit()
         
         print(f"✅ 새로운 진단 기록 생성 완료: survey_result_id={survey_result.id}")
         print(f"   - 진단 타입: {survey_result.result_tone}")
@@ -332,15 +341,15 @@ async def save_chatbot_analysis_result(
         
     except Exception as e:
         print(f"❌ 챗봇 분석 결과 저장 중 오류: {e}")
-        db.rollback()
+        await db.rollback()
         return None
 
 
 @router.post("/report/save", response_model=ReportResponse)
 async def save_report_now(
     request: ReportCreate,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     프론트엔드에서 3턴마다 호출하는 엔드포인트입니다.
@@ -387,9 +396,11 @@ async def save_report_now(
             # 대화 히스토리 조회
             chat_history = []
             try:
-                messages = db.query(models.ChatMessage).filter_by(
-                    history_id=request.history_id
-                ).order_by(models.ChatMessage.created_at.asc()).all()
+                messages = (await db.scalars(
+                    select(models.ChatMessage).filter_by(
+                        history_id=request.history_id
+                    ).order_by(models.ChatMessage.created_at.asc())
+                )).all()
                 chat_history = [
                     {"role": msg.role, "text": msg.text, "created_at": msg.created_at.isoformat()}
                     for msg in messages
@@ -419,7 +430,7 @@ async def save_report_now(
     else:
         raise HTTPException(status_code=500, detail="진단 기록 생성 실패")
 
-def detect_emotion(text: str) -> str:
+def detect_emotion(text: str, user_id: int | None = None) -> str:
     """
     OpenAI 기반 감정 분석 (Lottie emotion string 반환)
     """
@@ -437,7 +448,12 @@ def detect_emotion(text: str) -> str:
 감정 (목록 중 하나, 한 단어만):
 """
     try:
-        response = client.chat.completions.create(
+        response = chat_completion(
+            client,
+            "chatbot.emotion",
+            timeout=10.0,
+            hedge=True,
+            user_id=user_id,
             model=get_model_to_use(),
             messages=[{"role": "system", "content": "너는 감정 분석 전문가야. 반드시 목록 중 하나의 감정만 한 단어로 답해줘."},
                       {"role": "user", "content": prompt}],
@@ -459,132 +475,81 @@ def detect_emotion(text: str) -> str:
         print(f"[detect_emotion] OpenAI 감정 분석 오류: {e}")
         return "wink"
 
-@router.post("/analyze", response_model=ChatbotHistoryResponse)
-def analyze(
+
+def _generate_chat_answer(
     request: ChatbotRequest,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    # 신규 세션 생성 또는 기존 세션 이어받기
-    if not request.history_id:
-        chat_history = models.ChatHistory(user_id=current_user.id)
-        db.add(chat_history)
-        db.commit()
-        db.refresh(chat_history)
-    else:
-        chat_history = db.query(models.ChatHistory).filter_by(id=request.history_id, user_id=current_user.id).first()
-        if not chat_history:
-            raise HTTPException(status_code=404, detail="해당 history_id 세션 없음")
-        if chat_history.ended_at:
-            raise HTTPException(status_code=400, detail="이미 종료된 세션입니다.")
-    user_msg = models.ChatMessage(history_id=chat_history.id, role="user", text=request.question)
-    db.add(user_msg)
-    db.commit()
-    db.refresh(user_msg)
-    # 이전 대화 히스토리에서 사용자 정보 수집
-    prev_messages = db.query(models.ChatMessage).filter_by(history_id=chat_history.id).order_by(models.ChatMessage.id.asc()).all()
-    # 닉네임 사용: current_user.nickname이 있으면, 없으면 '사용자'
-    user_display_name = getattr(current_user, "nickname", None)
-    if not user_display_name:
-        user_display_name = "사용자"
-    conversation_history = ""
-    user_characteristics = []
-    if prev_messages:
-        # 이전 대화에서 사용자 특성 파악
-        for msg in prev_messages[-6:]:  # 최근 6개 메시지만 사용 (3턴 대화)
-            if msg.role == "user":
-                conversation_history += f"{user_display_name}: {msg.text}\n"
-            else:
-                try:
-                    ai_data = json.loads(msg.text)
-                    conversation_history += f"전문가: {ai_data.get('description', '')}\n"
-                    if ai_data.get('primary_tone'):
-                        user_characteristics.append(f"추정 톤: {ai_data.get('primary_tone')} {ai_data.get('sub_tone')}")
-                except:
-                    conversation_history += f"전문가: {msg.text}\n"
-    
+    current_user: models.User,
+    user_display_name: str,
+    conversation_history: str,
+    routing: dict,
+    query_embedding: Optional[List[float]] = None
+) -> dict:
+    """
+    RAG + 상담 모델 호출로 이번 턴의 답변 데이터(JSON) 생성 (모델은 route_chat_model 결과 사용)
+
+    query_embedding이 있으면(첫 턴의 FAQ 조회용 질문 임베딩) RAG 검색에 그대로 사용합니다.
+    """
     # 사용자 질문 + 대화 히스토리 결합
     combined_query = f"현재 질문: {request.question}\n\n이전 대화 맥락:\n{conversation_history}"
     
-    # RAG 검색
-    fixed_chunks = top_k_chunks(combined_query, fixed_index, client, k=3)
-    trend_chunks = top_k_chunks(combined_query, trend_index, client, k=3)
-    # Fine-tuned 감정 모델용 시스템 프롬프트 (퍼스널컬러 전문가 버전)
-        # 사용자 닉네임을 description에 반영하도록 프롬프트 수정
-    prompt_system = f"""당신은 경험이 풍부한 퍼스널컬러 전문가입니다. 다음 가이드라인을 따라 상담해주세요:
-
-🎨 전문성과 친근함의 조화:
-- 퍼스널컬러 전문 지식을 바탕으로 정확한 분석 제공
-- 어려운 전문 용어는 쉽게 풀어서 설명
-- 고객({user_display_name})이 편안하게 질문할 수 있도록 친근하고 따뜻한 톤 유지
-
-� 감정 공감 기반 상담:
-- 고객({user_display_name})의 고민과 니즈를 세심하게 파악 ("색깔 때문에 고민이 많으셨겠어요")
-- 자신감 부족이나 스타일 고민에 공감하며 위로
-- 긍정적인 변화를 위한 격려와 응원 메시지
-
-🌟 실용적이고 개인화된 조언:
-- 고객({user_display_name})의 라이프스타일, 직업, 선호도를 종합적으로 고려
-- 구체적이고 실행 가능한 컬러 추천
-- 예산과 상황에 맞는 현실적인 조언
-
-💬 자연스러운 대화 스타일:
-- 상담실에서 직접 대화하는 듯한 자연스러움
-- "어떠세요?", "~해보시는 건 어떨까요?" 같은 상담 톤
-- 고객({user_display_name})이 궁금해할 점을 먼저 예상해서 설명
-
-당신의 뛰어난 감정 이해 능력을 활용하여, 고객({user_display_name})이 컬러에 대한 자신감을 갖고 아름다워질 수 있도록 도와주세요."""
-    prompt_user = f"""대화 맥락:\n{combined_query}\n\n퍼스널컬러 전문 지식:\n{chr(10).join(fixed_chunks)}\n\n최신 트렌드 정보:\n{chr(10).join(trend_chunks)}\n\n다음 가이드라인으로 상담해주세요:
-1. 고객({user_display_name})의 질문에 대해 전문적이면서도 친근하게 응답
-2. 필요시 퍼스널컬러 진단을 위한 추가 질문 (피부톤, 선호 스타일, 라이프스타일 등)
-3. 대화 흐름에 맞는 자연스러운 컬러 추천
-4. 실용적이고 구체적인 조언 제공
-
-JSON 형식으로 응답해주세요:
-{{
-    "primary_tone": "웜" 또는 "쿨",
-    "sub_tone": "봄" 또는 "여름" 또는 "가을" 또는 "겨울",
-    "description": "상세한 설명 텍스트 (자연스러운 대화체, 고객({user_display_name})을 직접 호명하며 안내)",
-    "recommendations": ["구체적인 추천사항1", "구체적인 추천사항2", "구체적인 추천사항3"]
-}}
-
-주의: recommendations는 반드시 문자열 배열이어야 합니다.
-"""
-    messages = [{"role": "system", "content": prompt_system}, {"role": "user", "content": prompt_user}]
+    # RAG 검색 (임베딩 API 차단 시 참고 정보 없이 진행)
+    # 맞장구/인사 등 단순한 턴이거나 요청 마감이 가까우면 임베딩 호출 생략
+    if routing["features"]["is_ack"] or not has_time_for(RAG_MIN_REMAINING_SECONDS):
+        fixed_chunks, trend_chunks = [], []
+    else:
+        try:
+            # 두 인덱스 검색에 같은 쿼리 임베딩 사용 (임베딩 호출 1회)
+            if query_embedding is None:
+                query_embedding = embed_texts(client, [combined_query])[0]
+            fixed_chunks = top_k_chunks(combined_query, fixed_index, client, k=3, query_embedding=query_embedding)
+            trend_chunks = top_k_chunks(combined_query, trend_index, client, k=3, query_embedding=query_embedding)
+        except (LLMUnavailableError, DeadlineExceededError) as e:
+            print(f"⚠️ RAG 검색 생략: {e}")
+            fixed_chunks, trend_chunks = [], []
+    # 고정 지시문을 앞에, 닉네임/대화 맥락/검색 결과를 뒤에 배치 (프롬프트 접두사 캐시 적중용, utils/prompts.py)
+    messages = build_chat_messages(user_display_name, combined_query, fixed_chunks, trend_chunks)
     
-    # 모델 선택 함수 사용
-    print(f"🤖 Using model: {get_model_to_use()[:30]}***")  # 디버깅용 로그
+    # 턴 복잡도/남은 시간 기준으로 선택된 모델 사용
+    print(f"🤖 Using model: {routing['model'][:30]}*** ({routing['route']})")  # 디버깅용 로그
     try:
-        resp = client.chat.completions.create(
-            model=get_model_to_use(),
+        # JSON 모드 + 스키마 검증 (잘린 JSON은 복구, 복구 불가능할 때만 1회 재요청)
+        parsed, content = structured_completion(
+            client,
+            "chatbot.analyze",
+            ChatTurnOutput,
+            timeout=25.0,
+            hedge=True,
+            user_id=current_user.id,
+            model=routing["model"],
             messages=messages,
             temperature=0.8,  # 감정 모델에서는 좀 더 자연스러운 응답을 위해 temperature 상향
             max_tokens=600
         )
+    except (LLMRateLimitedError, DeadlineExceededError):
+        # main.py 핸들러에서 429 + Retry-After / 504로 변환
+        raise
+    except LLMUnavailableError as e:
+        print(f"❌ OpenAI API 호출 차단: {e}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="AI 서비스가 일시적으로 불안정합니다. 잠시 후 다시 시도해주세요.")
     except Exception as e:
         print(f"❌ OpenAI API 호출 실패: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"AI 서비스 일시적 오류: {str(e)}")
-    content = resp.choices[0].message.content
-    start, end = content.find("{"), content.rfind("}")
-    
     # 대화를 통한 퍼스널컬러 진단 (유틸리티 함수 사용)
     primary_tone, sub_tone = analyze_conversation_for_color_tone(conversation_history, request.question)
     
-    # JSON 파싱 시도
-    if start != -1 and end != -1:
-        try:
-            data = json.loads(content[start:end+1])
-            # 대화 분석 결과로 톤 정보 설정
-            data["primary_tone"] = primary_tone
-            data["sub_tone"] = sub_tone
-        except json.JSONDecodeError:
-            # JSON 파싱 실패 시 fallback
-            data = {
-                "primary_tone": primary_tone,
-                "sub_tone": sub_tone,
-                "description": content.strip(),
-                "recommendations": ["더 자세한 정보를 위해 피부톤이나 선호하는 색깔에 대해 말씀해주세요.", "평소 어떤 스타일을 좋아하시는지 알려주시면 더 정확한 분석을 도와드릴게요.", "궁금한 컬러나 스타일에 대해 언제든 물어보세요!"]
-            }
+    if parsed is not None:
+        data = parsed.model_dump()
+        # 대화 분석 결과로 톤 정보 설정
+        data["primary_tone"] = primary_tone
+        data["sub_tone"] = sub_tone
+    elif "{" in content:
+        # JSON 복구/재요청 모두 실패 시 fallback
+        data = {
+            "primary_tone": primary_tone,
+            "sub_tone": sub_tone,
+            "description": content.strip(),
+            "recommendations": ["더 자세한 정보를 위해 피부톤이나 선호하는 색깔에 대해 말씀해주세요.", "평소 어떤 스타일을 좋아하시는지 알려주시면 더 정확한 분석을 도와드릴게요.", "궁금한 컬러나 스타일에 대해 언제든 물어보세요!"]
+        }
     else:
         # JSON 형식이 전혀 없는 경우 fallback
         data = {
@@ -594,67 +559,204 @@ JSON 형식으로 응답해주세요:
             "recommendations": ["피부톤이나 혈관 색깔에 대해 알려주세요.", "평소 어떤 색깔 옷을 즐겨 입으시는지 말씀해주세요.", "메이크업이나 헤어 컬러 관련해서도 도움드릴 수 있어요."]
         }
     # 감정 이모티콘 분석 및 추가
-    user_emotion = detect_emotion(request.question)
+    user_emotion = detect_emotion(request.question, user_id=current_user.id)
     data["emotion"] = user_emotion
-    
-    # recommendations 필드 정리
-    recommendations = data.get("recommendations", [])
-    if isinstance(recommendations, dict):
-        recommendations = list(recommendations.values())
-    elif isinstance(recommendations, list):
-        # 중첩된 리스트를 평평하게 만들기
-        flattened_recommendations = []
-        for item in recommendations:
-            if isinstance(item, list):
-                flattened_recommendations.extend(item)
-            elif isinstance(item, str):
-                flattened_recommendations.append(item)
-        recommendations = flattened_recommendations
-    else:
-        recommendations = []
-    
-    data["recommendations"] = recommendations
-    ai_msg = models.ChatMessage(history_id=chat_history.id, role="ai", text=json.dumps(data, ensure_ascii=False))
-    db.add(ai_msg)
-    db.commit()
-    db.refresh(ai_msg)
+    return data
+
 
-    # AI 답변 저장 후, AI 피드백 자동 평가 실행 (채팅 종료 전에도 평가 가능하도록 예외 무시)
+@router.post("/analyze", response_model=ChatbotHistoryResponse)
+def analyze(
+    request: ChatbotRequest,
+    background_tasks: BackgroundTasks,
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if not idempotency_key:
+        return _analyze(request, background_tasks, current_user, db)
+
+    user_id = current_user.id
+    # 타임아웃 후 클라이언트가 재시도한 요청은 메시지를 중복 저장하거나 LLM을 다시 호출하지 않고 기존 응답 반환
+    stored = begin_idempotent_request(idempotency_key, "chatbot.analyze", user_id, request.model_dump())
+    if stored is not None:
+        return stored
     try:
-        generate_ai_feedbacks(history_id=chat_history.id, current_user=current_user, db=db)
-    except Exception as e:
-        # 예: 채팅 종료 전에는 평가 불가 등의 예외 발생 가능, 무시하고 진행
-        pass
-    msgs = db.query(models.ChatMessage).filter_by(history_id=chat_history.id).order_by(models.ChatMessage.id.asc()).all()
+        response = _analyze(request, background_tasks, current_user, db)
+    except BaseException:
+        abandon_idempotent_request(idempotency_key, "chatbot.analyze", user_id)
+        raise
+    complete_idempotent_request(idempotency_key, "chatbot.analyze", user_id, response)
+    return response
+
+
+def _flatten_recommendations(recommendations) -> list:
+    """recommendations 필드 정리 (dict → 값 목록, 중첩 리스트 평탄화, 그 외 형식은 빈 목록)"""
+    if isinstance(recommendations, dict):
+        return list(recommendations.values())
+    if not isinstance(recommendations, list):
+        return []
+    flattened_recommendations = []
+    for item in recommendations:
+        if isinstance(item, list):
+            flattened_recommendations.extend(item)
+        elif isinstance(item, str):
+            flattened_recommendations.append(item)
+    return flattened_recommendations
+
+
+def _load_recent_messages(db: Session, history_id: int, limit: int):
+    """
+    대화의 최근 limit개 메시지(오래된 순)와 전체 메시지 수를 한 번의 쿼리로 조회
+
+    COUNT(*) OVER ()는 LIMIT 적용 전에 계산되므로 전체 개수를 별도 쿼리 없이 얻을 수 있습니다.
+    """
+    rows = (
+        db.query(models.ChatMessage, func.count().over().label("total"))
+        .filter(models.ChatMessage.history_id == history_id)
+        .order_by(models.ChatMessage.id.desc())
+        .limit(limit)
+        .all()
+    )
+    total = rows[0][1] if rows else 0
+    return [msg for msg, _ in reversed(rows)], total
+
+
+def _build_chat_items(messages, first_index: int):
+    """
+    메시지 목록에서 (user → ai) 쌍을 응답 항목으로 변환
+
+    first_index는 messages[0]의 대화 내 위치이며, question_id는 대화 전체 기준 순번으로 계산합니다.
+    """
     items = []
-    qid = 1
-    for i in range(0,len(msgs)-1,2):
-        if msgs[i].role=="user" and msgs[i+1].role=="ai":
-            d = json.loads(msgs[i+1].text)
+    # 대화 전체에서 짝수 위치(user)부터 쌍을 이루도록 맞춤
+    for j in range(first_index % 2, len(messages) - 1, 2):
+        if messages[j].role == "user" and messages[j + 1].role == "ai":
+            d = json.loads(messages[j + 1].text)
             # 기존 데이터의 recommendations 필드도 정리
-            recommendations = d.get("recommendations", [])
-            if isinstance(recommendations, dict):
-                recommendations = list(recommendations.values())
-            elif isinstance(recommendations, list):
-                flattened_recommendations = []
-                for item in recommendations:
-                    if isinstance(item, list):
-                        flattened_recommendations.extend(item)
-                    elif isinstance(item, str):
-                        flattened_recommendations.append(item)
-                recommendations = flattened_recommendations
-            else:
-                recommendations = []
-            d["recommendations"] = recommendations
+            d["recommendations"] = _flatten_recommendations(d.get("recommendations", []))
             items.append(ChatItemModel(
-                question_id=qid,
-                question=msgs[i].text,
+                question_id=(first_index + j) // 2 + 1,
+                question=messages[j].text,
                 answer=d.get("description",""),
                 chat_res=ChatResModel.model_validate(d),
                 emotion=d.get("emotion", "wink")
             ))
-            qid += 1
-    return {"history_id": chat_history.id, "items": items}
+    return items
+
+
+_auto_feedback_lock = threading.Lock()
+_auto_feedback_running = set()
+
+
+def _generate_ai_feedbacks_in_background(history_id: int, user_id: int) -> None:
+    """응답 이후 AI 답변 자동 평가 (같은 대화의 평가가 이미 진행 중이면 다음 턴에 함께 평가)"""
+    with _auto_feedback_lock:
+        if history_id in _auto_feedback_running:
+            return
+        _auto_feedback_running.add(history_id)
+    db = SessionLocal()
+    try:
+        with no_deadline():
+            user = db.get(models.User, user_id)
+            if user:
+                generate_ai_feedbacks(history_id=history_id, current_user=user, db=db)
+    except Exception as e:
+        print(f"⚠️ AI 피드백 자동 평가 실패 (무시): {e}")
+        db.rollback()
+    finally:
+        db.close()
+        with _auto_feedback_lock:
+            _auto_feedback_running.discard(history_id)
+
+
+def _analyze(
+    request: ChatbotRequest,
+    background_tasks: BackgroundTasks,
+    current_user: models.User,
+    db: Session
+):
+    # 신규 세션 생성 또는 기존 세션 이어받기 (새 세션/메시지는 답변 생성 후 한 트랜잭션으로 저장)
+    if not request.history_id:
+        chat_history = models.ChatHistory(user_id=current_user.id)
+        recent_messages, total_messages = [], 0
+    else:
+        chat_history = db.query(models.ChatHistory).filter_by(id=request.history_id, user_id=current_user.id).first()
+        if not chat_history:
+            raise HTTPException(status_code=404, detail="해당 history_id 세션 없음")
+        if chat_history.ended_at:
+            raise HTTPException(status_code=400, detail="이미 종료된 세션입니다.")
+        # 대화 맥락과 응답에 필요한 최근 메시지만 조회 (세션 전체를 읽지 않음)
+        recent_messages, total_messages = _load_recent_messages(
+            db, chat_history.id, max(CHAT_RESPONSE_RECENT_ITEMS * 2, CONTEXT_MAX_MESSAGES)
+        )
+    user_msg = models.ChatMessage(history=chat_history, role="user", text=request.question)
+    # 닉네임 사용: current_user.nickname이 있으면, 없으면 '사용자'
+    user_display_name = getattr(current_user, "nickname", None)
+    if not user_display_name:
+        user_display_name = "사용자"
+    # 누적 요약 + 요약에 아직 반영되지 않은 모든 메시지로 맥락 구성 → 세션이 길어져도 프롬프트 크기 일정
+    # (요약 갱신은 최근 SUMMARY_RECENT_MESSAGES개를 남기고 SUMMARY_UPDATE_EVERY_MESSAGES개씩 반영하므로
+    #  요약 이후 메시지는 CONTEXT_MAX_MESSAGES 이내, 요약 갱신이 실패해 밀린 경우에만 오래된 메시지부터 제외)
+    unsummarized = total_messages - (chat_history.summary_message_count or 0)
+    conversation_history = build_conversation_context(
+        chat_history.summary,
+        (recent_messages[-unsummarized:] if unsummarized > 0 else []) + [user_msg],
+        user_label=user_display_name,
+        ai_label="전문가",
+        max_messages=CONTEXT_MAX_MESSAGES,
+    )
+    
+    # 거의 같은 질문이 FAQ 답변 은행에 있으면 상담 모델 호출 없이 검수된 답변 사용
+    # 첫 턴에만 조회 (후속 질문은 앞 대화에 따라 답이 달라지므로 다른 사용자를 위해 쓴 답변을 쓰지 않음)
+    # FAQ가 없으면 질문 임베딩은 RAG 검색에 재사용 (첫 턴에는 이전 대화 맥락이 없음)
+    faq, question_embedding = None, None
+    if total_messages == 0 and faq_available():
+        question_embedding = embed_faq_question(request.question, user_id=current_user.id)
+        if question_embedding is not None:
+            faq = match_faq(question_embedding, user_display_name)
+    if faq:
+        primary_tone, sub_tone = analyze_conversation_for_color_tone(conversation_history, request.question)
+        data = {
+            "primary_tone": primary_tone,
+            "sub_tone": sub_tone,
+            "description": faq["description"],
+            "recommendations": faq["recommendations"],
+            "emotion": faq["emotion"],
+        }
+        routing = {"model": None, "route": "faq", "faq_id": faq["faq_id"]}
+    else:
+        # 턴 특성(길이, 감정/검색 신호, 남은 시간)으로 모델 선택, 선택 결과는 AI 메시지의 routing 컬럼에 저장해 오프라인 품질 비교에 사용
+        routing = route_chat_model(request.question, remaining_seconds=deadline_remaining())
+        data = _generate_chat_answer(
+            request, current_user, user_display_name, conversation_history, routing, question_embedding
+        )
+
+    # recommendations 필드 정리
+    data["recommendations"] = _flatten_recommendations(data.get("recommendations", []))
+    # text에는 답변 본문만 저장 (자동 평가/관리자 조회/FAQ 생성에서 그대로 사용), 라우팅 정보는 별도 컬럼
+    ai_msg = models.ChatMessage(
+        history=chat_history,
+        role="ai",
+        text=json.dumps(data, ensure_ascii=False),
+        routing=json.dumps(routing, ensure_ascii=False),
+    )
+
+    # 세션(신규인 경우), 질문, 답변을 한 트랜잭션으로 저장 → 답변 생성 실패 시 반쯤 저장된 턴이 남지 않음
+    db.add_all([chat_history, user_msg, ai_msg])
+    db.flush()
+    history_id = chat_history.id
+    user_id = current_user.id
+
+    # 응답은 DB를 다시 읽지 않고 조회해 둔 최근 메시지 + 이번 턴으로 구성
+    # (commit 후에는 객체가 만료되어 속성 접근 시 다시 조회하므로 commit 전에 생성)
+    window = recent_messages + [user_msg, ai_msg]
+    items = _build_chat_items(window, total_messages - len(recent_messages))[-CHAT_RESPONSE_RECENT_ITEMS:]
+    db.commit()
+
+    # 응답 후 AI 답변 자동 평가와 오래된 대화의 누적 요약 반영 (몇 턴마다 한 번만 실제 갱신)
+    background_tasks.add_task(_generate_ai_feedbacks_in_background, history_id, user_id)
+    background_tasks.add_task(update_conversation_summary, history_id, user_id)
+    return {"history_id": history_id, "items": items}
 
 
 @router.post("/start")
@@ -707,53 +809,69 @@ def start_chat_session(
 @router.post("/end/{history_id}")
 async def end_chat_session(
     history_id: int,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(get_current_user_async),
 ):
-    chat = db.query(models.ChatHistory).filter_by(id=history_id, user_id=current_user.id).first()
-    if not chat:
-        raise HTTPException(status_code=404, detail="대화 세션 없음")
-    if chat.ended_at:
-        return {"message": "이미 종료됨", "ended_at": chat.ended_at}
-    
-    # 대화 종료 시간 설정
-    chat.ended_at = datetime.now(timezone.utc)
-    db.commit()
+    # 더블클릭/재시도로 동시에 들어온 종료 요청은 첫 요청의 분석 결과를 공유
+    user_id = current_user.id
+    key = make_flight_key("chatbot.end", user_id, history_id)
+    return await single_flight.do(key, lambda: _end_chat_session(history_id, user_id))
+
+
+async def _end_chat_session(history_id: int, user_id: int):
+    # 병합된 계산은 첫 요청이 취소돼도 계속 실행되므로 요청 단위 세션 대신 전용 세션 사용
+    async with AsyncSessionLocal() as db:
+        chat = await db.scalar(select(models.ChatHistory).filter_by(id=history_id, user_id=user_id))
+        if not chat:
+            raise HTTPException(status_code=404, detail="대화 세션 없음")
+        if chat.ended_at:
+            return {"message": "이미 종료됨", "ended_at": chat.ended_at}
     
-    # 챗봇 대화 분석 결과를 SurveyResult로 저장
-    try:
-        survey_result = await save_chatbot_analysis_result(
-            user_id=current_user.id,
-            chat_history_id=history_id,
-            db=db
+        # 대화 종료 시간 설정 - 다른 워커의 동시 종료 요청과 겹쳐도 한 번만 종료/집계되도록 열린 세션일 때만 갱신
+        ended = await db.execute(
+            update(models.ChatHistory)
+            .where(models.ChatHistory.id == history_id, models.ChatHistory.ended_at == None)
+            .values(ended_at=datetime.now(timezone.utc))
         )
+        if ended.rowcount != 1:
+            await db.rollback()
+            await db.refresh(chat)
+            return {"message": "이미 종료됨", "ended_at": chat.ended_at}
+        await db.execute(stats_delta(user_id, chat_sessions=1))
+        await db.commit()
+    
+        # 챗봇 대화 분석 결과를 SurveyResult로 저장
+        try:
+            survey_result = await save_chatbot_analysis_result(
+                user_id=user_id,
+                chat_history_id=history_id,
+                db=db
+            )
         
-        if survey_result:
-            return {
-                "message": "대화 종료 및 분석 결과 저장 완료", 
-                "ended_at": chat.ended_at,
-                "survey_result_id": survey_result.id,
-                "personal_color_type": survey_result.result_tone
-            }
-        else:
+            if survey_result:
+                return {
+                    "message": "대화 종료 및 분석 결과 저장 완료", 
+                    "ended_at": chat.ended_at,
+                    "survey_result_id": survey_result.id,
+                    "personal_color_type": survey_result.result_tone
+                }
+            else:
+                return {
+                    "message": "대화 종료됨 (분석 결과 저장 실패)", 
+                    "ended_at": chat.ended_at
+                }
+            
+        except Exception as e:
+            print(f"❌ 분석 결과 저장 중 오류: {e}")
             return {
-                "message": "대화 종료됨 (분석 결과 저장 실패)", 
+                "message": "대화 종료됨 (분석 결과 저장 중 오류 발생)", 
                 "ended_at": chat.ended_at
             }
-            
-    except Exception as e:
-        print(f"❌ 분석 결과 저장 중 오류: {e}")
-        return {
-            "message": "대화 종료됨 (분석 결과 저장 중 오류 발생)", 
-            "ended_at": chat.ended_at
-        }
 
 
 @router.post("/report/request")
 async def request_personal_color_report(
     request_data: dict,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: models.User = Depends(get_current_user_async),
 ):
     """
     🔥 기존 퍼스널 컬러 진단 보고서 생성 요청 🔥
@@ -769,74 +887,85 @@ async def request_personal_color_report(
     
     if not survey_result_id:
         raise HTTPException(status_code=400, detail="진단 결과 ID가 필요합니다")
+
+    # 동시에 들어온 동일 리포트 요청은 한 번만 생성하고 결과를 공유
+    user_id = current_user.id
+    key = make_flight_key("chatbot.report.request", user_id, survey_result_id, request_data)
+    return await single_flight.do(
+        key, lambda: _build_personal_color_report(survey_result_id, user_id)
+    )
+
+
+async def _build_personal_color_report(survey_result_id, user_id: int):
+    # 병합된 계산은 첫 요청이 취소돼도 계속 실행되므로 요청 단위 세션 대신 전용 세션 사용
+    with SessionLocal() as db:
+        # 사용자의 기존 진단 결과 조회 (읽기 전용)
+        survey_result = db.query(models.SurveyResult).filter_by(
+            id=survey_result_id, 
+            user_id=user_id, 
+            is_active=True
+        ).first()
     
-    # 사용자의 기존 진단 결과 조회 (읽기 전용)
-    survey_result = db.query(models.SurveyResult).filter_by(
-        id=survey_result_id, 
-        user_id=current_user.id, 
-        is_active=True
-    ).first()
-    
-    if not survey_result:
-        raise HTTPException(status_code=404, detail="진단 결과를 찾을 수 없습니다")
+        if not survey_result:
+            raise HTTPException(status_code=404, detail="진단 결과를 찾을 수 없습니다")
     
-    print(f"📊 기존 진단 결과 기반 리포트 생성: survey_result_id={survey_result_id}")
-    print(f"   - 결과 타입: {survey_result.result_tone}")
-    print(f"   - 생성일: {survey_result.created_at}")
-    print(f"   ❗ 새로운 진단 기록을 생성하지 않음 (리포트만 생성)")
+        print(f"📊 기존 진단 결과 기반 리포트 생성: survey_result_id={survey_result_id}")
+        print(f"   - 결과 타입: {survey_result.result_tone}")
+        print(f"   - 생성일: {survey_result.created_at}")
+        print(f"   ❗ 새로운 진단 기록을 생성하지 않음 (리포트만 생성)")
     
-    try:
-        from utils.report_generator import PersonalColorReportGenerator
+        try:
+            from utils.report_generator import PersonalColorReportGenerator
         
-        # 리포트 생성기 초기화
-        report_generator = PersonalColorReportGenerator()
+            # 리포트 생성기 초기화
+            report_generator = PersonalColorReportGenerator()
         
-        # 기존 진단 결과를 리포트 데이터로 변환 (읽기 전용)
-        survey_data = {
-            "result_tone": survey_result.result_tone,
-            "result_name": survey_result.result_name,
-            "confidence": survey_result.confidence,
-            "detailed_analysis": survey_result.detailed_analysis,
-            "color_palette": survey_result.color_palette,
-            "style_keywords": survey_result.style_keywords,
-            "makeup_tips": survey_result.makeup_tips
-        }
+            # 기존 진단 결과를 리포트 데이터로 변환 (읽기 전용)
+            survey_data = {
+                "result_tone": survey_result.result_tone,
+                "result_name": survey_result.result_name,
+                "confidence": survey_result.confidence,
+                "detailed_analysis": survey_result.detailed_analysis,
+                "color_palette": survey_result.color_palette,
+                "style_keywords": survey_result.style_keywords,
+                "makeup_tips": survey_result.makeup_tips
+            }
         
-        # 대화 히스토리 조회 (리포트에 포함할 대화 내용, 읽기 전용)
-        chat_history = []
-        if hasattr(survey_result, 'chat_history_id') and survey_result.chat_history_id:
-            messages = db.query(models.ChatMessage).filter_by(
-                history_id=survey_result.chat_history_id
-            ).order_by(models.ChatMessage.created_at.asc()).all()
+            # 대화 히스토리 조회 (리포트에 포함할 대화 내용, 읽기 전용)
+            chat_history = []
+            if hasattr(survey_result, 'chat_history_id') and survey_result.chat_history_id:
+                messages = db.query(models.ChatMessage).filter_by(
+                    history_id=survey_result.chat_history_id
+                ).order_by(models.ChatMessage.created_at.asc()).all()
             
-            chat_history = [
-                {
-                    "role": msg.role,
-                    "text": msg.text,
-                    "created_at": msg.created_at.isoformat()
-                }
-                for msg in messages
-            ]
+                chat_history = [
+                    {
+                        "role": msg.role,
+                        "text": msg.text,
+                        "created_at": msg.created_at.isoformat()
+                    }
+                    for msg in messages
+                ]
         
-        # 리포트 데이터 생성 (기존 데이터 시각화만, DB 변경 없음)
-        report_data = report_generator.generate_report_data(survey_data, chat_history)
+            # 리포트 데이터 생성 (기존 데이터 시각화만, DB 변경 없음, 이미지 렌더링은 스레드풀에서)
+            report_data = await run_in_threadpool(report_generator.generate_report_data, survey_data, chat_history)
         
-        # ⚠️ 중요: 여기서 db.add(), db.commit() 등의 DB 변경 작업 절대 금지!
-        print(f"✅ 리포트 생성 완료 (DB 변경 없음)")
+            # ⚠️ 중요: 여기서 db.add(), db.commit() 등의 DB 변경 작업 절대 금지!
+            print(f"✅ 리포트 생성 완료 (DB 변경 없음)")
         
-        return {
-            "status": "success",
-            "message": f"{survey_result.result_name or survey_result.result_tone.upper()} 타입 분석 리포트가 생성되었습니다",
-            "survey_result_id": survey_result_id,
-            "report_data": report_data,
-            "note": "기존 진단 데이터 기반 리포트 생성 (새로운 진단 기록 추가 없음)"
-        }
+            return {
+                "status": "success",
+                "message": f"{survey_result.result_name or survey_result.result_tone.upper()} 타입 분석 리포트가 생성되었습니다",
+                "survey_result_id": survey_result_id,
+                "report_data": report_data,
+                "note": "기존 진단 데이터 기반 리포트 생성 (새로운 진단 기록 추가 없음)"
+            }
         
-    except Exception as e:
-        print(f"❌ 리포트 생성 중 오류: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"리포트 생성 중 오류가 발생했습니다: {str(e)}")
+        except Exception as e:
+            print(f"❌ 리포트 생성 중 오류: {e}")
+            import traceback
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"리포트 생성 중 오류가 발생했습니다: {str(e)}")
 
 @router.get("/report/{survey_result_id}")
 async def get_personal_color_report(
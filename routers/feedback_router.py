@@ -1,55 +1,116 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session, aliased
 from routers.user_router import get_current_user
 import models
 import json
-from schemas import UserFeedbackRequest, UserFeedbackResponse
-from utils.shared import get_db, client
+from schemas import UserFeedbackRequest, UserFeedbackResponse, AutoFeedbackOutput
+from database import get_db, read_session
+from utils.shared import client
+from utils.structured_output import structured_completion
+from utils.prompts import build_feedback_messages
 
 router = APIRouter(prefix="/api/feedback", tags=["Feedback"])
 
+# 관리자 AI 피드백 목록을 한 번에 읽어 스트리밍할 묶음 크기
+AI_FEEDBACK_STREAM_BATCH = 500
+
+
+def _serialize_ai_feedback(fb, history_id, question, answer):
+    return {
+        "history_id": history_id,
+        "question": question,
+        "answer": answer,
+        "ai_feedback": {
+            "id": fb.id,
+            "message_id": fb.message_id,
+            "accuracy": fb.accuracy,
+            "consistency": fb.consistency,
+            "reliability": fb.reliability,
+            "personalization": fb.personalization,
+            "practicality": fb.practicality,
+            "total_score": fb.total_score,
+            "vector_db_quality": fb.vector_db_quality,
+            "detail_accuracy": fb.detail_accuracy,
+            "detail_consistency": fb.detail_consistency,
+            "detail_reliability": fb.detail_reliability,
+            "detail_personalization": fb.detail_personalization,
+            "detail_practicality": fb.detail_practicality
+        }
+    }
+
+
+def _query_ai_feedback_page(db: Session, after_id: Optional[int], size: int):
+    """
+    AI 피드백 + 답변 메시지 + 직전 사용자 질문을 하나의 조인 쿼리로 조회 (id 기준 keyset 페이지)
+
+    질문은 같은 history에서 답변보다 앞선 마지막 user 메시지를 상관 서브쿼리로 가져옵니다.
+    """
+    question = aliased(models.ChatMessage)
+    question_text = (
+        select(question.text)
+        .where(
+            question.history_id == models.ChatMessage.history_id,
+            question.role == "user",
+            question.id < models.ChatMessage.id
+        )
+        .order_by(question.id.desc())
+        .limit(1)
+        .correlate(models.ChatMessage)
+        .scalar_subquery()
+    )
+    query = (
+        db.query(
+            models.AIFeedback,
+            models.ChatMessage.history_id,
+            models.ChatMessage.text,
+            question_text.label("question")
+        )
+        .outerjoin(models.ChatMessage, models.ChatMessage.id == models.AIFeedback.message_id)
+    )
+    if after_id is not None:
+        query = query.filter(models.AIFeedback.id > after_id)
+    return query.order_by(models.AIFeedback.id.asc()).limit(size).all()
+
+
+def _stream_ai_feedbacks(after_id: Optional[int], limit: Optional[int]):
+    """{"ai_feedbacks": [...], "next_after_id": ...} JSON을 묶음 단위로 생성 (전체 목록을 메모리에 올리지 않음)"""
+    db = read_session()
+    try:
+        yield '{"ai_feedbacks": ['
+        sent = 0
+        last_id = after_id
+        has_more = False
+        while limit is None or sent < limit:
+            size = AI_FEEDBACK_STREAM_BATCH if limit is None else min(AI_FEEDBACK_STREAM_BATCH, limit - sent)
+            rows = _query_ai_feedback_page(db, last_id, size)
+            for fb, history_id, answer, question in rows:
+                item = _serialize_ai_feedback(fb, history_id, question, answer)
+                yield ("," if sent else "") + json.dumps(item, ensure_ascii=False, default=str)
+                sent += 1
+                last_id = fb.id
+            db.expunge_all()
+            if len(rows) < size:
+                break
+            has_more = True
+        # limit을 채운 경우에만 다음 페이지 시작점 전달
+        next_after_id = last_id if limit is not None and has_more and sent >= limit else None
+        yield '], "next_after_id": ' + json.dumps(next_after_id) + "}"
+    finally:
+        db.close()
+
+
 @router.get("/list/ai_feedbacks")
 def get_all_ai_feedbacks_admin(
+    after_id: Optional[int] = Query(None, ge=0, description="이전 페이지의 next_after_id (keyset 페이지네이션)"),
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="페이지 크기 (생략 시 전체를 스트리밍)"),
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
 ):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="관리자만 접근 가능합니다.")
-    ai_feedbacks = db.query(models.AIFeedback).all()
-    result = []
-    for fb in ai_feedbacks:
-        msg = db.query(models.ChatMessage).filter_by(id=fb.message_id).first()
-        history = db.query(models.ChatHistory).filter_by(id=msg.history_id).first() if msg else None
-        # 질문 메시지 찾기 (같은 history에서 msg.id보다 작은 user role)
-        question_msg = None
-        if history and msg:
-            question_msg = db.query(models.ChatMessage).filter(
-                models.ChatMessage.history_id == history.id,
-                models.ChatMessage.role == "user",
-                models.ChatMessage.id < msg.id
-            ).order_by(models.ChatMessage.id.desc()).first()
-        result.append({
-            "history_id": history.id if history else None,
-            "question": question_msg.text if question_msg else None,
-            "answer": msg.text if msg else None,
-            "ai_feedback": {
-                "id": fb.id,
-                "message_id": fb.message_id,
-                "accuracy": fb.accuracy,
-                "consistency": fb.consistency,
-                "reliability": fb.reliability,
-                "personalization": fb.personalization,
-                "practicality": fb.practicality,
-                "total_score": fb.total_score,
-                "vector_db_quality": fb.vector_db_quality,
-                "detail_accuracy": fb.detail_accuracy,
-                "detail_consistency": fb.detail_consistency,
-                "detail_reliability": fb.detail_reliability,
-                "detail_personalization": fb.detail_personalization,
-                "detail_practicality": fb.detail_practicality
-            }
-        })
-    return {"ai_feedbacks": result}
+    return StreamingResponse(_stream_ai_feedbacks(after_id, limit), media_type="application/json")
 
 
 def parse_chat_pair_items(history):
@@ -69,40 +130,20 @@ def parse_chat_pair_items(history):
 
 # llm_auto_feedback 함수는 반드시 파일 상단에 분리되어야 함
 def llm_auto_feedback(question, answer):
-    llm_prompt = f"""너는 퍼스널컬러 AI 진단 결과를 평가하는 AI 평가자야.
-아래 '질문'에 대해 '답변'이 얼마나 적절한지, 아래 항목에 따라 반드시 JSON 형태(아래 포맷)로 평가해줘.
-
-질문: {question}
-답변: {answer}
-
-{{
-    "accuracy": [0~100점],
-    "detail_accuracy": "정확도 상세평가 근거(2문장 이상)",
-    "consistency": [0~100점],
-    "detail_consistency": "일관성 상세평가 근거(2문장 이상)",
-    "reliability": [0~100점],
-    "detail_reliability": "신뢰도 상세평가 근거(2문장 이상)",
-    "personalization": [0~100점],
-    "detail_personalization": "개인화 상세평가 근거(2문장 이상)",
-    "practicality": [0~100점],
-    "detail_practicality": "실용성 상세평가 근거(2문장 이상)",
-    "total_score": [0~100점, 위 다섯 항목 종합점수],
-    "vector_db_quality": [0~100점, DB 응답의 정보 정밀도 및 활용도 점수]
-}}
-
-절대로 JSON 객체만, 예시대로 아래에 반환해줘!!
-"""
-    resp = client.chat.completions.create(
+    parsed, content = structured_completion(
+        client,
+        "feedback.auto_feedback",
+        AutoFeedbackOutput,
+        timeout=30.0,
+        budget="background",
         model="gpt-4o-mini",
-        messages=[{"role": "system", "content": "퍼스널컬러 평가 전문 AI"},{"role": "user", "content": llm_prompt}],
+        # 고정 평가 지시문을 앞에, 질문/답변을 뒤에 배치 (프롬프트 접두사 캐시 적중용)
+        messages=build_feedback_messages(question, answer),
         temperature=0.3,max_tokens=1200
     )
-    content = resp.choices[0].message.content
-    start, end = content.find("{"), content.rfind("}")
-    if start == -1 or end == -1:
+    if parsed is None:
         raise Exception("JSON 결과를 찾을 수 없음: " + content)
-    data = json.loads(content[start:end+1])
-    return data
+    return parsed.model_dump()
 
 @router.get("/ai_feedbacks/{history_id}")
 def get_all_ai_feedbacks(
@@ -1,34 +1,30 @@
-from fastapi import APIRouter, Depends, status, HTTPException
-from sqlalchemy.orm import Session
-from database import SessionLocal
+from fastapi import APIRouter, Depends, status, HTTPException, Header
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from database import AsyncSessionLocal, get_async_db
 import models, schemas
 import json
 from datetime import datetime, timezone
-from routers.user_router import get_current_user   # 인증 함수 import
-import os
-from openai import OpenAI
+from routers.user_router import get_current_user_async   # 인증 함수 import
 import re
 from typing import List, Dict, Any
 from math import sqrt
-from dotenv import load_dotenv
+from utils.llm_client import create_embeddings, get_openai_client
+from utils.shared import RAG_INDEX_EMBED_TIMEOUT_SECONDS
+from utils.structured_output import structured_completion
+from utils.prompts import build_survey_messages
+from utils.llm_limiter import LLMRateLimitedError
+from utils.deadline import DeadlineExceededError
+from utils.single_flight import single_flight, make_flight_key
+from utils.idempotency import begin_idempotent_request, complete_idempotent_request, abandon_idempotent_request
+from utils.user_stats import stats_delta
 
-# 환경 변수 로드
-load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise RuntimeError("환경변수 OPENAI_API_KEY가 설정되지 않았습니다.")
-
-client = OpenAI(api_key=OPENAI_API_KEY)
+client = get_openai_client()
 
 router = APIRouter(prefix="/api/survey")
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # ============ RAG 관련 유틸 함수 ============
 def chunk_text(text: str, chunk_size: int = 800, overlap: int = 100) -> List[str]:
     """텍스트를 청크로 분할"""
@@ -52,9 +48,9 @@ def cosine_similarity(a: List[float], b: List[float]) -> float:
     nb = sqrt(sum(x * x for x in b)) or 1e-8
     return dot / (na * nb)
 
-def embed_texts(texts: List[str], model: str = "text-embedding-3-small") -> List[List[float]]:
+def embed_texts(texts: List[str], model: str = "text-embedding-3-small", timeout: float = 10.0) -> List[List[float]]:
     """텍스트를 임베딩으로 변환"""
-    res = client.embeddings.create(model=model, input=texts)
+    res = create_embeddings(client, "survey.embed", model=model, input=texts, timeout=timeout)
     return [item.embedding for item in res.data]
 
 def top_k_chunks(query: str, index: Dict[str, Any], k: int = 3) -> List[str]:
@@ -70,7 +66,7 @@ def build_rag_index(filepath: str) -> Dict[str, Any]:
         with open(filepath, encoding="utf-8") as f:
             text = f.read()
         chunks = chunk_text(text, chunk_size=800, overlap=100)
-        embeddings = embed_texts(chunks)
+        embeddings = embed_texts(chunks, timeout=RAG_INDEX_EMBED_TIMEOUT_SECONDS)
         return {"chunks": chunks, "embeddings": embeddings}
     except FileNotFoundError:
         print(f"⚠️ RAG 파일을 찾을 수 없습니다: {filepath}")
@@ -85,7 +81,7 @@ except Exception as e:
     personal_color_index = {"chunks": [], "embeddings": []}
     beauty_trend_index = {"chunks": [], "embeddings": []}
 
-def analyze_personal_color_with_openai(answers: list[schemas.SurveyAnswerCreate]) -> dict:
+def analyze_personal_color_with_openai(answers: list[schemas.SurveyAnswerCreate], user_id: int | None = None) -> dict:
     """
     사용자의 답변을 OpenAI API로 분석하여 퍼스널 컬러 타입 결정
     RAG를 활용하여 컨텍스트 기반 분석 수행
@@ -116,87 +112,27 @@ def analyze_personal_color_with_openai(answers: list[schemas.SurveyAnswerCreate]
         trend_chunks = top_k_chunks(answers_text, beauty_trend_index, k=2)
         trend_context = "\n\n[최신 뷰티 트렌드]\n" + "\n".join(trend_chunks)
     
-    system_prompt = (
-        "당신은 전문적인 퍼스널 컬러 진단 컨설턴트입니다. "
-        "사용자의 답변을 기반으로 가장 적합한 퍼스널 컬러 타입을 정확하게 진단해주세요. "
-        "봄, 여름, 가을, 겨울 중 정확히 하나의 타입만 선택해야 하며, "
-        "진단 신뢰도와 종합 점수를 객관적으로 평가해주세요."
-    )
-    
-    user_prompt = f"""사용자의 퍼스널 컬러 테스트 답변:
-
-{answers_text}
-{rag_context}
-{trend_context}
-
-이 답변들을 기반으로 사용자의 퍼스널 컬러 타입을 분석하세요.
-
-반드시 다음 가이드라인을 따라주세요:
-- 메인 타입 1개와 추천 타입 2개로 총 3개의 타입을 제공해주세요
-- 각 타입의 description은 문학적이고 감성적으로 작성해주세요
-- name은 이모지와 함께 일관된 형식으로 작성해주세요 (예: '봄 웜톤 🌸')
-
-분석 결과는 다음 형식으로 JSON으로 반드시 응답해주세요:
-{{
-    "result_tone": "spring|summer|autumn|winter 중 정확히 하나",
-    "confidence": 0-100 사이의 숫자 (신뢰도 퍼센트, 진단의 확실성 정도),
-    "total_score": 0-100 사이의 숫자 (종합 점수, 타입 특성의 부합도),
-    "detailed_analysis": "사용자의 답변을 기반으로 한 자세한 분석 설명 (200-400자 정도)",
-    "top_types": [
-        {{
-            "type": "spring|summer|autumn|winter",
-            "name": "퍼스널 컬러 타입명 (반드시 '봄 웜톤 🌸' 형식)",
-            "description": "타입의 특성을 문학적이고 감성적으로 표현한 설명 (30-50자)",
-            "color_palette": ["#FF6F61", "#FFD1B3", "#FFE5B4", "#98FB98", "#40E0D0"],
-            "style_keywords": ["화사함", "발랄함", "생동감", "밝음", "따뜻함"],
-            "makeup_tips": ["코럴 블러셔", "피치 립", "골든 아이섀도우", "브라운 마스카라"],
-            "score": 0-100 (해당 타입과의 일치도)
-        }},
-        {{
-            "type": "두 번째로 적합한 타입",
-            "name": "두 번째 타입명 (동일한 형식)",
-            "description": "두 번째 타입의 감성적 설명",
-            "color_palette": ["색상 코드 5개"],
-            "style_keywords": ["키워드 5개"],
-            "makeup_tips": ["메이크업 팁 4개"],
-            "score": 첫 번째보다 10-20점 낮은 점수
-        }},
-        {{
-            "type": "세 번째로 적합한 타입",
-            "name": "세 번째 타입명 (동일한 형식)",
-            "description": "세 번째 타입의 감성적 설명",
-            "color_palette": ["색상 코드 5개"],
-            "style_keywords": ["키워드 5개"],
-            "makeup_tips": ["메이크업 팁 4개"],
-            "score": 두 번째보다 10-15점 낮은 점수
-        }}
-    ]
-}}
-
-응답은 반드시 JSON 형식만 포함해야 합니다. 다른 설명은 포함하지 마세요."""
+    # 고정 지시문을 앞에, 사용자 답변/검색 결과를 뒤에 배치 (프롬프트 접두사 캐시 적중용, utils/prompts.py)
+    messages = build_survey_messages(answers_text, rag_context, trend_context)
 
     try:
-        # OpenAI API 호출 (타임아웃 30초)
-        response = client.chat.completions.create(
+        # OpenAI API 호출 (타임아웃 30초, JSON 모드 + 스키마 검증, 잘린 JSON은 복구)
+        parsed, response_text = structured_completion(
+            client,
+            "survey.analyze",
+            schemas.SurveyAnalysisOutput,
+            timeout=30.0,  # 30초 타임아웃
+            user_id=user_id,
             model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
+            messages=messages,
             temperature=0.7,
-            max_tokens=1500,  # 토큰 수 증가
-            timeout=30.0  # 30초 타임아웃
+            max_tokens=1500  # 토큰 수 증가
         )
         
-        # 응답 파싱
-        response_text = response.choices[0].message.content.strip()
-        
-        # JSON 추출 (혹시 다른 텍스트가 포함될 경우 대비)
-        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-        if json_match:
-            response_text = json_match.group()
-        
-        result = json.loads(response_text)
+        # 응답 파싱 (복구/재요청 모두 실패하면 기본값 사용)
+        if parsed is None:
+            raise json.JSONDecodeError("설문 분석 응답 파싱 실패", response_text, 0)
+        result = parsed.model_dump()
         
         # 결과 검증 및 정규화
         if result.get("result_tone") not in ["spring", "summer", "autumn", "winter"]:
@@ -400,6 +336,9 @@ def analyze_personal_color_with_openai(answers: list[schemas.SurveyAnswerCreate]
         print(f"✅ OpenAI 분석 완료: {result}")
         return result
         
+    except (LLMRateLimitedError, DeadlineExceededError):
+        # 호출 한도 초과/마감 시간 초과는 기본값을 저장하지 않고 429/504로 응답
+        raise
     except json.JSONDecodeError as e:
         print(f"❌ JSON 파싱 오류: {e}")
         # JSON 파싱 실패 시 기본값 반환
@@ -463,12 +402,15 @@ def analyze_personal_color_with_openai(answers: list[schemas.SurveyAnswerCreate]
 @router.post("/submit", status_code=201)
 async def submit_survey(
     result: schemas.SurveyResultCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
+    current_user: models.User = Depends(get_current_user_async)
 ):
     """
     퍼스널 컬러 테스트 결과 제출
     
+    Idempotency-Key 헤더를 보내면 같은 키로 재시도한 요청은 다시 분석/저장하지 않고
+    처음 요청의 응답을 그대로 반환합니다. (처리 중이면 완료될 때까지 대기)
+    
     프로세스:
     1. 프론트엔드에서 사용자 답변 데이터만 받음
     2. OpenAI API에 답변 데이터를 prompt로 전송 (RAG 컨텍스트 포함)
@@ -511,85 +453,116 @@ async def submit_survey(
             detail="답변 데이터가 필요합니다."
         )
     
-    print(f"▶ 사용자 {current_user.username}({current_user.id})의 설문 제출")
-    print(f"▶ 받은 답변 수: {len(result.answers)}")
-    print(f"▶ 받은 데이터: {result}")
+    user_id = current_user.id
+    # 더블클릭/재시도로 동시에 들어온 동일 답변 제출은 한 번만 분석/저장하고 결과를 공유
+    key = make_flight_key("survey.submit", user_id, payload=result.model_dump())
+    if not idempotency_key:
+        return await single_flight.do(key, lambda: _submit_survey(result, user_id, current_user.username))
 
+    # 타임아웃 후 재시도: 이미 처리된 키면 저장된 응답 반환 (DB 조회/대기는 스레드풀에서)
+    stored = await run_in_threadpool(
+        begin_idempotent_request, idempotency_key, "survey.submit", user_id, result.model_dump()
+    )
+    if stored is not None:
+        return stored
     try:
-        # 1. OpenAI API 호출로 result_tone, confidence, total_score 받기
-        print("▶ OpenAI API로 퍼스널 컬러 분석 중...")
-        openai_result = analyze_personal_color_with_openai(result.answers)
-        result_tone = openai_result['result_tone']
-        confidence = openai_result['confidence']
-        total_score = openai_result['total_score']
-        
-        print(f"✅ 분석 완료 - tone: {result_tone}, confidence: {confidence}, score: {total_score}")
+        response = await single_flight.do(key, lambda: _submit_survey(result, user_id, current_user.username))
+    except BaseException:
+        await run_in_threadpool(abandon_idempotent_request, idempotency_key, "survey.submit", user_id)
+        raise
+    await run_in_threadpool(complete_idempotent_request, idempotency_key, "survey.submit", user_id, response)
+    return response
 
-        # 2. Survey Result 생성 (상세 분석 결과 포함)
-        survey_result = models.SurveyResult(
-            user_id=current_user.id,
-            result_tone=result_tone,
-            confidence=confidence,
-            total_score=total_score,
-            source_type="survey",  # 설문 분석 출처 표시
-            detailed_analysis=openai_result.get('detailed_analysis'),
-            result_name=openai_result.get('name'),
-            result_description=openai_result.get('description'),
-            color_palette=json.dumps(openai_result.get('color_palette', []), ensure_ascii=False),
-            style_keywords=json.dumps(openai_result.get('style_keywords', []), ensure_ascii=False),
-            makeup_tips=json.dumps(openai_result.get('makeup_tips', []), ensure_ascii=False),
-            top_types=json.dumps(openai_result.get('top_types', []), ensure_ascii=False),
-            created_at=datetime.now(timezone.utc)
-        )
-        db.add(survey_result)
-        db.flush()  # ID 생성을 위해 flush
-        
-        print(f"▶ SurveyResult 생성: ID {survey_result.id}")
+
+async def _submit_survey(result: schemas.SurveyResultCreate, user_id: int, username: str):
+    # 병합된 계산은 첫 요청이 취소돼도 계속 실행되므로 요청 단위 세션 대신 전용 세션 사용
+    async with AsyncSessionLocal() as db:
+        print(f"▶ 사용자 {username}({user_id})의 설문 제출")
+        print(f"▶ 받은 답변 수: {len(result.answers)}")
+        print(f"▶ 받은 데이터: {result}")
+
+        try:
+            # 1. OpenAI API 호출로 result_tone, confidence, total_score 받기
+            print("▶ OpenAI API로 퍼스널 컬러 분석 중...")
+            # 블로킹 API 호출은 스레드풀에서 실행 (대기 중 이벤트 루프가 다른 요청을 처리하도록)
+            openai_result = await run_in_threadpool(
+                analyze_personal_color_with_openai, result.answers, user_id=user_id
+            )
+            result_tone = openai_result['result_tone']
+            confidence = openai_result['confidence']
+            total_score = openai_result['total_score']
         
-        # 3. 모든 답변 저장
-        for ans in result.answers:
-            answer = models.SurveyAnswer(
-                survey_result_id=survey_result.id,
-                question_id=ans.question_id,
-                option_id=ans.option_id,
-                option_label=ans.option_label
+            print(f"✅ 분석 완료 - tone: {result_tone}, confidence: {confidence}, score: {total_score}")
+
+            # 2. Survey Result 생성 (상세 분석 결과 포함)
+            survey_result = models.SurveyResult(
+                user_id=user_id,
+                result_tone=result_tone,
+                confidence=confidence,
+                total_score=total_score,
+                source_type="survey",  # 설문 분석 출처 표시
+                detailed_analysis=openai_result.get('detailed_analysis'),
+                result_name=openai_result.get('name'),
+                result_description=openai_result.get('description'),
+                color_palette=json.dumps(openai_result.get('color_palette', []), ensure_ascii=False),
+                style_keywords=json.dumps(openai_result.get('style_keywords', []), ensure_ascii=False),
+                makeup_tips=json.dumps(openai_result.get('makeup_tips', []), ensure_ascii=False),
+                top_types=json.dumps(openai_result.get('top_types', []), ensure_ascii=False),
+                created_at=datetime.now(timezone.utc)
             )
-            db.add(answer)
+            db.add(survey_result)
+            await db.flush()  # ID 생성을 위해 flush
         
-        db.commit()
-        db.refresh(survey_result)
+            print(f"▶ SurveyResult 생성: ID {survey_result.id}")
         
-        print(f"✅ 설문 결과 저장 완료 - Survey ID: {survey_result.id}")
+            # 3. 모든 답변 저장
+            for ans in result.answers:
+                answer = models.SurveyAnswer(
+                    survey_result_id=survey_result.id,
+                    question_id=ans.question_id,
+                    option_id=ans.option_id,
+                    option_label=ans.option_label
+                )
+                db.add(answer)
+
+            # 마이페이지 통계 카운터도 같은 트랜잭션에서 증가
+            await db.execute(stats_delta(user_id, total_surveys=1, saved_results=1))
+            await db.commit()
         
-        return {
-            "message": "설문 결과 저장 완료", 
-            "survey_result_id": survey_result.id,
-            "result_tone": result_tone,
-            "confidence": confidence,
-            "total_score": total_score,
-            "detailed_analysis": openai_result.get('detailed_analysis', '분석 결과가 준비되지 않았습니다.'),
-            "top_types": openai_result.get('top_types', []),
-            "name": openai_result.get('name', '퍼스널 컬러'),
-            "description": openai_result.get('description', '당신만의 특별한 컬러'),
-            "color_palette": openai_result.get('color_palette', []),
-            "style_keywords": openai_result.get('style_keywords', []),
-            "makeup_tips": openai_result.get('makeup_tips', [])
-        }
+            print(f"✅ 설문 결과 저장 완료 - Survey ID: {survey_result.id}")
+        
+            return {
+                "message": "설문 결과 저장 완료", 
+                "survey_result_id": survey_result.id,
+                "result_tone": result_tone,
+                "confidence": confidence,
+                "total_score": total_score,
+                "detailed_analysis": openai_result.get('detailed_analysis', '분석 결과가 준비되지 않았습니다.'),
+                "top_types": openai_result.get('top_types', []),
+                "name": openai_result.get('name', '퍼스널 컬러'),
+                "description": openai_result.get('description', '당신만의 특별한 컬러'),
+                "color_palette": openai_result.get('color_palette', []),
+                "style_keywords": openai_result.get('style_keywords', []),
+                "makeup_tips": openai_result.get('makeup_tips', [])
+            }
     
-    except Exception as e:
-        print(f"❌ 설문 처리 중 오류 발생: {e}")
-        db.rollback()  # 롤백
+        except (LLMRateLimitedError, DeadlineExceededError):
+            await db.rollback()
+            raise
+        except Exception as e:
+            print(f"❌ 설문 처리 중 오류 발생: {e}")
+            await db.rollback()  # 롤백
         
-        # OpenAI API 오류 등 예외 상황에서도 기본 응답 제공
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="분석 서비스에 일시적인 문제가 발생했습니다. 잠시 후 다시 시도해주세요."
-        )
+            # OpenAI API 오류 등 예외 상황에서도 기본 응답 제공
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="분석 서비스에 일시적인 문제가 발생했습니다. 잠시 후 다시 시도해주세요."
+            )
 
 @router.get("/list", response_model=list[schemas.SurveyResult])
 async def get_my_survey_results(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async)
 ):
     """
     현재 사용자의 모든 설문 결과 조회 (최신순)
@@ -600,18 +573,24 @@ async def get_my_survey_results(
             detail="로그인이 필요합니다."
         )
 
-    results = db.query(models.SurveyResult).filter(
-        models.SurveyResult.user_id == current_user.id,
-        models.SurveyResult.is_active == True  # 활성화된 결과만
-    ).order_by(models.SurveyResult.created_at.desc()).all()
+    # 응답에 포함되는 answers는 지연 로딩할 수 없으므로 함께 조회
+    results = (await db.scalars(
+        select(models.SurveyResult)
+        .options(selectinload(models.SurveyResult.answers))
+        .where(
+            models.SurveyResult.user_id == current_user.id,
+            models.SurveyResult.is_active == True  # 활성화된 결과만
+        )
+        .order_by(models.SurveyResult.created_at.desc())
+    )).all()
     
     return results
 
 @router.get("/{survey_id}", response_model=schemas.SurveyResult)
 async def get_survey_detail(
     survey_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async)
 ):
     """
     특정 설문 결과 상세 조회
@@ -622,11 +601,15 @@ async def get_survey_detail(
             detail="로그인이 필요합니다."
         )
 
-    result = db.query(models.SurveyResult).filter(
-        models.SurveyResult.id == survey_id,
-        models.SurveyResult.user_id == current_user.id,
-        models.SurveyResult.is_active == True  # 활성화된 결과만
-    ).first()
+    result = await db.scalar(
+        select(models.SurveyResult)
+        .options(selectinload(models.SurveyResult.answers))
+        .where(
+            models.SurveyResult.id == survey_id,
+            models.SurveyResult.user_id == current_user.id,
+            models.SurveyResult.is_active == True  # 활성화된 결과만
+        )
+    )
     
     if not result:
         raise HTTPException(
@@ -639,8 +622,8 @@ async def get_survey_detail(
 @router.delete("/{survey_id}", status_code=200)
 async def delete_survey(
     survey_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async)
 ):
     """
     설문 결과 삭제 (본인이 작성한 것만) - 소프트 딜리트 방식
@@ -651,20 +634,26 @@ async def delete_survey(
             detail="로그인이 필요합니다."
         )
 
-    result = db.query(models.SurveyResult).filter(
-        models.SurveyResult.id == survey_id,
-        models.SurveyResult.user_id == current_user.id,
-        models.SurveyResult.is_active == True  # 이미 삭제된 것은 제외
-    ).first()
+    # 하드 딜리트 대신 소프트 딜리트
+    # 활성 상태일 때만 갱신하여 동시에 들어온 삭제 요청이 통계를 두 번 줄이지 않도록 함
+    deleted = await db.execute(
+        update(models.SurveyResult)
+        .where(
+            models.SurveyResult.id == survey_id,
+            models.SurveyResult.user_id == current_user.id,
+            models.SurveyResult.is_active == True  # 이미 삭제된 것은 제외
+        )
+        .values(is_active=False)
+    )
     
-    if not result:
+    if deleted.rowcount != 1:
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail="설문 결과를 찾을 수 없습니다."
         )
     
-    # 하드 딜리트 대신 소프트 딜리트
-    result.is_active = False
-    db.commit()
+    await db.execute(stats_delta(current_user.id, saved_results=-1))
+    await db.commit()
     
     return {"message": "설문 결과가 삭제되었습니다."}
@@ -1,14 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Form
+from fastapi import APIRouter, Depends, HTTPException, status, Form, Query
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from jose import jwt, JWTError
 from datetime import datetime, timedelta, timezone
 import os
+import json
+from types import SimpleNamespace
+from typing import Optional
 from dotenv import load_dotenv
 from schemas import UserRoleUpdateRequest, UserRoleUpdateResponse
 
 import models, schemas, hashing
-from database import SessionLocal
+from database import get_db, get_async_db, get_read_db, read_session
+from utils.auth_cache import get_cached_user, get_cached_user_async, cache_user, invalidate_user
+from utils.user_stats import STAT_COLUMNS, actual_stats_select, stats_overwrite
 
 # 환경변수 로드 및 시크릿키 세팅
 load_dotenv()
@@ -21,14 +29,6 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/users/login")
 
 router = APIRouter(prefix="/api/users")
 
-# DB 세션 의존성 주입
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/signup", status_code=201)
 def user_signup(user_create: schemas.UserCreate, db: Session = Depends(get_db)):
     # 닉네임 중복 확인
@@ -85,26 +85,65 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
         "user": user_obj
     }
 
-# JWT 토큰에서 현재 사용자 정보 가져오는 함수
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="토큰이 유효하지 않습니다.",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+
+def _token_subject(token: str) -> str:
+    """JWT 토큰에서 subject(닉네임) 추출, 유효하지 않으면 401"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         nickname: str = payload.get("sub")
-        if nickname is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
-    user = db.query(models.User).filter(
-        models.User.nickname == nickname, 
-        models.User.is_active == True # 탈퇴 회원 걸러내기
-    ).first()
+        raise _credentials_exception()
+    if nickname is None:
+        raise _credentials_exception()
+    return nickname
+
+
+def _active_user_query(nickname: str):
+    return select(models.User).where(
+        models.User.nickname == nickname,
+        models.User.is_active == True  # 탈퇴 회원 걸러내기
+    )
+
+
+# JWT 토큰에서 현재 사용자 정보 가져오는 함수
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    """
+    인증 사용자 (동기 세션 get_db를 쓰는 엔드포인트용)
+
+    엔드포인트와 같은 get_db 세션으로 조회하므로 요청당 커넥션은 하나입니다.
+    비동기 세션(get_async_db)을 쓰는 엔드포인트는 get_current_user_async를 사용하세요.
+    """
+    nickname = _token_subject(token)
+    # 최근 확인한 사용자는 DB 조회 없이 반환 (탈퇴/권한 변경 시 invalidate_user로 무효화)
+    user = get_cached_user(db, nickname)
     if user is None:
-        raise credentials_exception
+        found = db.scalar(_active_user_query(nickname))
+        if found is None:
+            raise _credentials_exception()
+        # 요청 세션과 분리된 사본 반환 → 수정하는 엔드포인트는 id로 필요한 컬럼만 UPDATE (사본을 merge하지 않음)
+        user = cache_user(nickname, found)
+    # 인증 조회의 읽기 트랜잭션을 끝내 커넥션을 풀에 돌려줌 (LLM 호출 등 DB를 쓰지 않는 동안 점유하지 않도록)
+    db.rollback()
+    return user
+
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    """인증 사용자 (비동기 세션 get_async_db를 쓰거나 전용 세션을 여는 async 엔드포인트용)"""
+    nickname = _token_subject(token)
+    user = await get_cached_user_async(db, nickname)
+    if user is None:
+        found = await db.scalar(_active_user_query(nickname))
+        if found is None:
+            raise _credentials_exception()
+        user = cache_user(nickname, found)
+    await db.rollback()
     return user
 
 @router.get("/list", response_model=list[schemas.User])
@@ -128,7 +167,12 @@ async def delete_user_account(
         )
     try:
         # 상태값 변경 (실제 삭제 대신)
-        current_user.is_active = False
+        # current_user는 최대 AUTH_CACHE_TTL_SECONDS 전의 캐시 사본이므로 merge하지 않고 해당 컬럼만 갱신
+        # (merge하면 그 사이 다른 워커에서 바뀐 권한 등이 사본의 예전 값으로 덮어써짐)
+        db.query(models.User).filter(models.User.id == current_user.id).update(
+            {models.User.is_active: False}, synchronize_session=False
+        )
+        invalidate_user(db, current_user.nickname)
         db.commit()
         return {
             "message": "회원탈퇴가 완료되었습니다.",
@@ -146,31 +190,27 @@ async def get_my_info(current_user: models.User = Depends(get_current_user)):
     return current_user
 
 @router.get("/me/stats")
-async def get_user_stats(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """사용자 통계 정보 조회 (진단 기록 수, 저장된 결과 수)"""
+async def get_user_stats(current_user: models.User = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    """
+    사용자 통계 정보 조회 (진단 기록 수, 저장된 결과 수, 채팅 세션 수)
+
+    user_stats 기본 키 조회 한 번으로 응답합니다. 카운터는 설문 저장/삭제, 대화 종료 시 같은 트랜잭션에서
+    갱신되며, 어긋난 값은 reconcile_user_stats.py로 보정합니다.
+    """
     try:
-        # 총 진단 기록 수 (SurveyResult 테이블에서 해당 사용자의 모든 기록 - 삭제된 것 포함)
-        total_surveys = db.query(models.SurveyResult).filter(
-            models.SurveyResult.user_id == current_user.id
-        ).count()
-        
-        # 저장된 결과 수 (현재 활성화된 결과들만)
-        saved_results = db.query(models.SurveyResult).filter(
-            models.SurveyResult.user_id == current_user.id,
-            models.SurveyResult.is_active == True
-        ).count()
-        
-        # 채팅 세션 수: '종료된' 세션만 카운트하도록 변경
-        # (요청: end API 호출 후 횟수가 늘어나도록 하기 위함)
-        chat_sessions = db.query(models.ChatHistory).filter(
-            models.ChatHistory.user_id == current_user.id,
-            models.ChatHistory.ended_at != None
-        ).count()
-        
+        stats = await db.get(models.UserStats, current_user.id)
+        if stats is None:
+            # 마이그레이션 이전 create_tables.py로 만든 DB 등 행이 없는 경우 실제 값으로 한 번 채움
+            rows = (await db.execute(actual_stats_select([current_user.id]))).all()
+            if rows:
+                await db.execute(stats_overwrite(rows))
+                await db.commit()
+            stats = rows[0] if rows else SimpleNamespace(**{name: 0 for name in STAT_COLUMNS})
+
         return {
-            "total_surveys": total_surveys,      # 총 진단 기록 수 (삭제된 것 포함)
-            "saved_results": saved_results,      # 현재 저장된 결과 수 (활성화된 것만)
-            "chat_sessions": chat_sessions       # 채팅 세션 수
+            "total_surveys": stats.total_surveys,      # 총 진단 기록 수 (삭제된 것 포함)
+            "saved_results": stats.saved_results,      # 현재 저장된 결과 수 (활성화된 것만)
+            "chat_sessions": stats.chat_sessions       # 종료된 채팅 세션 수
         }
     except Exception as e:
         raise HTTPException(
@@ -196,56 +236,195 @@ async def update_user_role(
     if user.role == req.role:
         return UserRoleUpdateResponse(success=False, message="이미 해당 권한입니다.", user_id=user_id, role=user.role)
     user.role = req.role
+    invalidate_user(db, user.nickname)
     db.commit()
     return UserRoleUpdateResponse(success=True, message="권한이 성공적으로 변경되었습니다.", user_id=user_id, role=user.role)
 
-# 전체 유저 챗봇 히스토리 및 유저 피드백 리스트
+# 관리자 채팅 내역 NDJSON 내보내기 시 서버 측 커서에서 한 번에 가져올 행 수
+CHAT_HISTORY_EXPORT_YIELD_PER = 1000
+
+
+def _pair_messages(messages):
+    """id 순으로 정렬된 메시지에서 (user → ai) 연속 쌍을 질문/답변으로 추출"""
+    qa_pairs = []
+    i = 0
+    while i < len(messages) - 1:
+        if messages[i].role == "user" and messages[i+1].role == "ai":
+            qa_pairs.append({
+                "question": messages[i].text,
+                "answer": messages[i+1].text,
+                "question_id": messages[i].id,
+                "answer_id": messages[i+1].id,
+            })
+            i += 2
+        else:
+            i += 1
+    return qa_pairs
+
+
+def _serialize_user_feedback(user_feedback):
+    if not user_feedback or user_feedback.id is None:
+        return None
+    return {
+        "id": user_feedback.id,
+        "user_id": user_feedback.user_id,
+        "feedback": user_feedback.feedback,
+        "created_at": user_feedback.created_at
+    }
+
+
+# 페이지 크기 없이 호출한 기존 클라이언트에 전체 목록을 만들 때 내부적으로 읽는 페이지 크기
+_CHAT_HISTORY_LEGACY_PAGE_SIZE = 500
+
+
+def _chat_history_page(db: Session, cursor: Optional[int], limit: int):
+    """chat_history.id가 cursor보다 큰 히스토리 limit개와 피드백/대화 쌍 → (items, next_cursor)"""
+    query = db.query(models.ChatHistory)
+    if cursor is not None:
+        query = query.filter(models.ChatHistory.id > cursor)
+    # 다음 페이지 존재 여부 확인을 위해 1건 더 조회
+    chat_histories = query.order_by(models.ChatHistory.id.asc()).limit(limit + 1).all()
+    has_more = len(chat_histories) > limit
+    chat_histories = chat_histories[:limit]
+    history_ids = [history.id for history in chat_histories]
+
+    # 페이지 단위로 피드백/메시지를 IN 쿼리로 일괄 조회
+    feedbacks = {}
+    messages_by_history = {history_id: [] for history_id in history_ids}
+    if history_ids:
+        for user_feedback in db.query(models.UserFeedback).filter(
+            models.UserFeedback.history_id.in_(history_ids)
+        ).order_by(models.UserFeedback.id.asc()):
+            feedbacks.setdefault(user_feedback.history_id, user_feedback)
+        for msg in db.query(models.ChatMessage).filter(
+            models.ChatMessage.history_id.in_(history_ids)
+        ).order_by(models.ChatMessage.history_id.asc(), models.ChatMessage.id.asc()):
+            messages_by_history[msg.history_id].append(msg)
+
+    items = [{
+        "chat_history_id": history.id,
+        "user_id": history.user_id,
+        "created_at": history.created_at,
+        "ended_at": history.ended_at,
+        "user_feedback": _serialize_user_feedback(feedbacks.get(history.id)),
+        "qa_pairs": _pair_messages(messages_by_history[history.id])
+    } for history in chat_histories]
+    return items, (history_ids[-1] if has_more else None)
+
+
+# 전체 유저 챗봇 히스토리 및 유저 피드백 리스트 (chat_history.id 기준 커서 페이지네이션)
 @router.get("/list/chat_history")
-async def get_all_users_chat_history(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_all_users_chat_history(
+    cursor: Optional[int] = Query(None, ge=0, description="이전 페이지의 next_cursor"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="지정하면 {items, next_cursor} 형식으로 페이지 단위 응답"),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    cursor/limit을 지정하면 {"items", "next_cursor"} 형식의 페이지를 반환합니다. (limit 기본값 100)
+
+    둘 다 생략하면 기존 클라이언트와 호환되도록 전체 목록을 리스트로 반환합니다.
+    (내부적으로는 같은 페이지 단위 일괄 조회 사용, 대량 내보내기는 /list/chat_history/export 권장)
+    """
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="관리자만 접근 가능합니다.")
-    chat_histories = db.query(models.ChatHistory).all()
-    result = []
-    for history in chat_histories:
-        user_feedback = db.query(models.UserFeedback).filter(models.UserFeedback.history_id == history.id).first()
-        feedback_data = None
-        if user_feedback:
-            feedback_data = {
-                "id": user_feedback.id,
-                "user_id": user_feedback.user_id,
-                "feedback": user_feedback.feedback,
-                "created_at": user_feedback.created_at
-            }
-
-        # 질문/답변 내역 추출
-        messages = db.query(models.ChatMessage).filter(models.ChatMessage.history_id == history.id).order_by(models.ChatMessage.id.asc()).all()
-        qa_pairs = []
-        i = 0
-        while i < len(messages) - 1:
-            if messages[i].role == "user" and messages[i+1].role == "ai":
-                qa_pairs.append({
-                    "question": messages[i].text,
-                    "answer": messages[i+1].text,
-                    "question_id": messages[i].id,
-                    "answer_id": messages[i+1].id,
-                })
-                i += 2
-            else:
-                i += 1
+    if cursor is None and limit is None:
+        histories, next_cursor = _chat_history_page(db, None, _CHAT_HISTORY_LEGACY_PAGE_SIZE)
+        while next_cursor is not None:
+            page, next_cursor = _chat_history_page(db, next_cursor, _CHAT_HISTORY_LEGACY_PAGE_SIZE)
+            histories.extend(page)
+        return histories
 
-        result.append({
-            "chat_history_id": history.id,
-            "user_id": history.user_id,
-            "created_at": history.created_at,
-            "ended_at": history.ended_at,
-            "user_feedback": feedback_data,
-            "qa_pairs": qa_pairs
-        })
-    return result
+    items, next_cursor = _chat_history_page(db, cursor, limit or 100)
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def _export_chat_histories(after_id: Optional[int]):
+    """
+    전체 채팅 내역을 히스토리당 한 줄(NDJSON)로 생성 (읽기 복제본 사용 가능 시 복제본에서 조회)
+
+    히스토리 ⟕ 첫 유저 피드백 ⟕ 메시지를 하나의 쿼리로 정렬해 서버 측 커서(yield_per)로 읽고,
+    히스토리가 바뀔 때마다 한 줄씩 내보내므로 메모리에는 현재 히스토리의 메시지만 유지합니다.
+    """
+    db = read_session()
+    try:
+        first_feedback_id = (
+            select(func.min(models.UserFeedback.id))
+            .where(models.UserFeedback.history_id == models.ChatHistory.id)
+            .correlate(models.ChatHistory)
+            .scalar_subquery()
+        )
+        query = (
+            db.query(
+                models.ChatHistory.id.label("history_id"),
+                models.ChatHistory.user_id,
+                models.ChatHistory.created_at,
+                models.ChatHistory.ended_at,
+                models.UserFeedback.id.label("feedback_id"),
+                models.UserFeedback.user_id.label("feedback_user_id"),
+                models.UserFeedback.feedback,
+                models.UserFeedback.created_at.label("feedback_created_at"),
+                models.ChatMessage.id.label("message_id"),
+                models.ChatMessage.role,
+                models.ChatMessage.text,
+            )
+            .outerjoin(models.UserFeedback, models.UserFeedback.id == first_feedback_id)
+            .outerjoin(models.ChatMessage, models.ChatMessage.history_id == models.ChatHistory.id)
+        )
+        if after_id is not None:
+            query = query.filter(models.ChatHistory.id > after_id)
+        rows = query.order_by(models.ChatHistory.id.asc(), models.ChatMessage.id.asc()).yield_per(
+            CHAT_HISTORY_EXPORT_YIELD_PER
+        )
+
+        current = None
+        messages = []
+        for row in rows:
+            if current is None or row.history_id != current.history_id:
+                if current is not None:
+                    yield _export_line(current, messages)
+                current = row
+                messages = []
+            if row.message_id is not None:
+                messages.append(SimpleNamespace(id=row.message_id, role=row.role, text=row.text))
+        if current is not None:
+            yield _export_line(current, messages)
+    finally:
+        db.close()
+
+
+def _export_line(row, messages) -> str:
+    user_feedback = SimpleNamespace(
+        id=row.feedback_id, user_id=row.feedback_user_id, feedback=row.feedback, created_at=row.feedback_created_at
+    )
+    item = {
+        "chat_history_id": row.history_id,
+        "user_id": row.user_id,
+        "created_at": row.created_at,
+        "ended_at": row.ended_at,
+        "user_feedback": _serialize_user_feedback(user_feedback),
+        "qa_pairs": _pair_messages(messages)
+    }
+    return json.dumps(item, ensure_ascii=False, default=str) + "\n"
+
+
+# 전체 유저 챗봇 히스토리 NDJSON 내보내기 (after_id로 중단 지점부터 이어받기 가능)
+@router.get("/list/chat_history/export")
+def export_all_users_chat_history(
+    after_id: Optional[int] = Query(None, ge=0, description="마지막으로 받은 chat_history_id"),
+    current_user: models.User = Depends(get_current_user),
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="관리자만 접근 가능합니다.")
+    return StreamingResponse(
+        _export_chat_histories(after_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="chat_history.ndjson"'}
+    )
 
 # 특정 유저 챗봇/분석 히스토리 리스트
 @router.get("/{user_id}/chat_history")
-async def get_user_chat_history(user_id: int, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_user_chat_history(user_id: int, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_read_db)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="관리자만 접근 가능합니다.")
     chat_histories = db.query(models.ChatHistory).filter(models.ChatHistory.user_id == user_id).all()
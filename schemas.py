@@ -3,6 +3,7 @@ from pydantic import BaseModel, Field, model_validator, field_validator
 from typing import List, Dict, Optional, Literal
 import re
 import json
+import math
 
 # --- 기존 User, Survey 관련 모델 생략 없이 포함 ---
 class UserCreate(BaseModel):
@@ -201,4 +202,108 @@ class UserFeedbackResponse(BaseModel):
     user_feedback_id: int
     history_id: int
     user_id: int
-    feedback: str
\ No newline at end of file
+    feedback: str
+
+# --- LLM 응답(JSON) 스키마: utils/structured_output.py에서 검증에 사용 ---
+def _flatten_str_list(v):
+    """dict/중첩 리스트/문자열로 온 목록 필드를 문자열 리스트로 정리"""
+    if v is None:
+        return []
+    if isinstance(v, str):
+        return [v]
+    if isinstance(v, dict):
+        v = list(v.values())
+    flattened = []
+    for item in v:
+        if isinstance(item, list):
+            flattened.extend(str(x) for x in item)
+        elif item is not None:
+            flattened.append(str(item))
+    return flattened
+
+
+def _clamp_score(v):
+    """"85", 85.0, "85점" 등을 0~100 정수로 정리 (숫자로 볼 수 없는 값은 0)"""
+    if isinstance(v, str):
+        match = re.search(r'-?\d+(\.\d+)?', v)
+        v = float(match.group()) if match else 0
+    try:
+        score = float(v or 0)
+    except (TypeError, ValueError):
+        # [85], {...} 등 - TypeError는 ValidationError로 바뀌지 않아 호출한 요청이 500으로 끝나므로 여기서 처리
+        return 0
+    if math.isnan(score):
+        return 0
+    return int(round(max(0.0, min(100.0, score))))
+
+
+class ChatTurnOutput(BaseModel):
+    """analyze 상담 답변"""
+    primary_tone: str = ""
+    sub_tone: str = ""
+    description: str = Field(min_length=1)
+    recommendations: List[str] = []
+
+    @field_validator('recommendations', mode='before')
+    @classmethod
+    def flatten_recommendations(cls, v):
+        return _flatten_str_list(v)
+
+
+class DiagnosisOutput(BaseModel):
+    """generate_complete_diagnosis_data 진단 결과"""
+    emotional_description: str = ""
+    color_palette: List[str] = []
+    style_keywords: List[str] = []
+    makeup_tips: List[str] = []
+    detailed_analysis: str = Field(min_length=1)
+
+    @field_validator('color_palette', 'style_keywords', 'makeup_tips', mode='before')
+    @classmethod
+    def flatten_lists(cls, v):
+        return _flatten_str_list(v)
+
+
+class SurveyAnalysisOutput(BaseModel):
+    """analyze_personal_color_with_openai 설문 분석 결과 (top_types 등 추가 필드는 그대로 유지)"""
+    model_config = {"extra": "allow"}
+
+    result_tone: str
+    confidence: int = 50
+    total_score: int = 50
+    detailed_analysis: str = ""
+    top_types: Optional[List[Dict]] = None
+
+    @field_validator('result_tone', mode='before')
+    @classmethod
+    def normalize_tone(cls, v):
+        return str(v or "").strip().lower()
+
+    @field_validator('confidence', 'total_score', mode='before')
+    @classmethod
+    def clamp_scores(cls, v):
+        return _clamp_score(v)
+
+
+class AutoFeedbackOutput(BaseModel):
+    """llm_auto_feedback 자동 평가 결과"""
+    accuracy: float
+    consistency: float
+    reliability: float
+    personalization: float
+    practicality: float
+    total_score: float
+    vector_db_quality: float = 0
+    detail_accuracy: str = ""
+    detail_consistency: str = ""
+    detail_reliability: str = ""
+    detail_personalization: str = ""
+    detail_practicality: str = ""
+
+    @field_validator(
+        'accuracy', 'consistency', 'reliability', 'personalization',
+        'practicality', 'total_score', 'vector_db_quality', mode='before'
+    )
+    @classmethod
+    def clamp_scores(cls, v):
+        return _clamp_score(v)
@@ -0,0 +1,60 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# 앱 모듈은 import 시점에 환경변수를 읽으므로 먼저 테스트용 SQLite DB를 지정
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+_DB_PATH = os.path.join(tempfile.mkdtemp(prefix="personal_color_test_"), "test.db")
+os.environ["DB_URL"] = f"sqlite:///{_DB_PATH}"
+os.environ["ASYNC_DB_URL"] = f"sqlite+aiosqlite:///{_DB_PATH}"
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("OPENAI_API_KEY", "test-openai-key")
+
+import models  # noqa: E402
+from database import Base, engine, SessionLocal  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """테스트마다 빈 테이블로 시작하는 동기 세션"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def count_queries():
+    """with count_queries() as queries: ... → 블록 안에서 실행된 SQL 문 목록"""
+    from contextlib import contextmanager
+    from sqlalchemy import event
+
+    @contextmanager
+    def _count():
+        statements = []
+
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", _record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", _record)
+
+    return _count
+
+
+def make_user(db, nickname="tester", role="user"):
+    user = models.User(
+        username=nickname, nickname=nickname, password="x", email=f"{nickname}@example.com", role=role
+    )
+    db.add(user)
+    db.commit()
+    return user
@@ -0,0 +1,46 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import models
+from routers.admin_router import get_admin_chat_histories
+from tests.conftest import make_user
+
+
+def _seed_histories(db, count, turns=3):
+    user = make_user(db, "chatter")
+    for _ in range(count):
+        history = models.ChatHistory(user_id=user.id)
+        db.add(history)
+        db.flush()
+        for turn in range(turns):
+            db.add(models.ChatMessage(history_id=history.id, role="user", text=f"질문 {turn}"))
+            ai = models.ChatMessage(history_id=history.id, role="ai", text=json.dumps({"description": f"답변 {turn}"}))
+            db.add(ai)
+            db.flush()
+            db.add(models.AIFeedback(message_id=ai.id, total_score=80))
+        db.add(models.UserFeedback(history_id=history.id, user_id=user.id, feedback="좋다"))
+    db.commit()
+
+
+@pytest.mark.parametrize("include_ai_feedback, expected", [(True, 5), (False, 4)])
+def test_chat_histories_query_count_does_not_grow_with_page_size(db, count_queries, include_ai_feedback, expected):
+    _seed_histories(db, count=12)
+    # 세션에 속하지 않은 인증 사용자 (get_current_user가 반환하는 detached 사본과 동일하게 DB 조회 없음)
+    admin = SimpleNamespace(id=0, role="admin")
+
+    counts = {}
+    for page_size in (1, 10):
+        db.expire_all()
+        with count_queries() as queries:
+            result = get_admin_chat_histories(
+                page=1, page_size=page_size, user_id=None, include_ai_feedback=include_ai_feedback,
+                current_user=admin, db=db,
+            )
+        assert len(result["items"]) == page_size
+        assert all(len(item["qa_pairs"]) == 3 for item in result["items"])
+        counts[page_size] = len(queries)
+
+    # count + histories + messages (+ ai_feedback) + user_feedback
+    assert counts == {1: expected, 10: expected}
@@ -0,0 +1,16 @@
+import models
+from tests.conftest import make_user
+from utils.auth_cache import cache_user, get_cached_user, invalidate_user
+
+
+def test_entry_recached_before_commit_is_dropped_on_commit(db):
+    user = make_user(db, "cached")
+    cache_user(user.nickname, user)
+
+    invalidate_user(db, user.nickname)
+    db.query(models.User).filter(models.User.id == user.id).update({models.User.role: "admin"})
+    # 커밋 전 동시 요청이 변경 전 행을 다시 캐시한 상황
+    cache_user(user.nickname, user)
+    db.commit()
+
+    assert get_cached_user(db, user.nickname) is None
@@ -0,0 +1,14 @@
+import pytest
+
+from build_faq_index import personalize_template
+
+
+@pytest.mark.parametrize("nickname, answer, expected", [
+    # 호칭만 자리표시자로 바꾸고 닉네임과 같은 일반 단어가 포함된 표현은 그대로 둠
+    ("하늘", {"description": "하늘님께는 하늘색이 잘 어울려요."}, {"description": "{nickname}님께는 하늘색이 잘 어울려요."}),
+    ("jenny", {"recommendations": ["jenny님 추천 립"]}, {"recommendations": ["{nickname}님 추천 립"]}),
+    # 호칭이 아닌 형태로 원래 사용자를 가리키면 재사용하지 않음
+    ("민지", {"description": "민지님, 민지 씨에게는 코랄이 좋아요."}, None),
+])
+def test_personalize_template_replaces_only_the_address_form(nickname, answer, expected):
+    assert personalize_template(answer, nickname) == expected
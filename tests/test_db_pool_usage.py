@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from jose import jwt
+from sqlalchemy import text
+
+import database
+from database import DBUsageMiddleware, async_engine, engine, get_async_db, get_db, get_db_pool_metrics
+from routers.user_router import ALGORITHM, SECRET_KEY, get_current_user, get_current_user_async
+from tests.conftest import make_user
+
+
+def _checked_out():
+    return {"sync": engine.pool.checkedout(), "async": async_engine.pool.checkedout()}
+
+
+def _probe_app(sessions):
+    """인증 + DB 의존성을 함께 쓰는 엔드포인트에서 요청 중 점유한 커넥션 수를 반환하는 앱"""
+    app = FastAPI()
+    app.add_middleware(DBUsageMiddleware)
+
+    @app.get("/probe")
+    def probe(user=Depends(get_current_user), db=Depends(get_db)):
+        db.execute(text("SELECT 1"))
+        return _checked_out()
+
+    @app.get("/probe-async")
+    async def probe_async(user=Depends(get_current_user_async), db=Depends(get_async_db)):
+        await db.execute(text("SELECT 1"))
+        return _checked_out()
+
+    # 원래 의존성을 감싸 요청마다 세션이 몇 번 만들어지는지 기록
+    def counting_get_db():
+        sessions.append("sync")
+        yield from database.get_db()
+
+    async def counting_get_async_db():
+        sessions.append("async")
+        async for session in database.get_async_db():
+            yield session
+
+    app.dependency_overrides[get_db] = counting_get_db
+    app.dependency_overrides[get_async_db] = counting_get_async_db
+    return app
+
+
+def _token(nickname):
+    data = {"sub": nickname, "exp": datetime.now(timezone.utc) + timedelta(minutes=5)}
+    return jwt.encode(data, SECRET_KEY, algorithm=ALGORITHM)
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("/probe", {"sync": 1, "async": 0}),
+    ("/probe-async", {"sync": 0, "async": 1}),
+])
+def test_auth_and_endpoint_share_one_connection(db, path, expected):
+    nickname = f"pool{path.replace('/', '_')}"
+    make_user(db, nickname)
+    sessions = []
+    client = TestClient(_probe_app(sessions))
+    headers = {"Authorization": f"Bearer {_token(nickname)}"}
+    before = get_db_pool_metrics()["per_request"]["multi_connection_requests"]
+
+    # 첫 요청은 인증 캐시 miss(DB 조회), 두 번째는 캐시 hit
+    for _ in range(2):
+        sessions.clear()
+        response = client.get(path, headers=headers)
+        assert response.status_code == 200
+        assert response.json() == expected
+        assert len(sessions) == 1
+
+    assert get_db_pool_metrics()["per_request"]["multi_connection_requests"] == before
@@ -0,0 +1,23 @@
+import json
+
+import pytest
+
+from mock_openai_server import synthetic_chat_completion
+from schemas import AutoFeedbackOutput, ChatTurnOutput, DiagnosisOutput, SurveyAnalysisOutput
+from utils.prompts import (
+    build_chat_messages, build_diagnosis_messages, build_feedback_messages, build_survey_messages,
+)
+
+# 평가 대상 답변은 채팅 응답 JSON이므로 primary_tone 등 다른 호출의 키워드를 포함
+_ANSWER = json.dumps({"primary_tone": "웜", "sub_tone": "봄", "description": "코랄이 잘 어울려요."}, ensure_ascii=False)
+
+
+@pytest.mark.parametrize("messages, schema", [
+    (build_feedback_messages("어떤 색이 어울려요?", _ANSWER), AutoFeedbackOutput),
+    (build_chat_messages("tester", "어떤 색이 어울려요?", ["청크"], ["트렌드"]), ChatTurnOutput),
+    (build_diagnosis_messages(f"user: 질문\nai: {_ANSWER}", "spring"), DiagnosisOutput),
+    (build_survey_messages("Q1: A", "청크", "트렌드"), SurveyAnalysisOutput),
+])
+def test_synthetic_response_matches_call_schema(messages, schema):
+    response = synthetic_chat_completion({"model": "mock", "messages": messages})
+    schema.model_validate_json(response["choices"][0]["message"]["content"])
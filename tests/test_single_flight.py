@@ -0,0 +1,30 @@
+import asyncio
+import gc
+
+from utils.single_flight import SingleFlight
+
+
+def test_failure_after_leader_cancelled_is_retrieved():
+    unretrieved = []
+
+    async def scenario():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: unretrieved.append(context))
+        flight = SingleFlight()
+        started = asyncio.Event()
+
+        async def fail_later():
+            started.set()
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        # 첫 요청만 기다리다 취소되고, 계산은 기다리는 요청 없이 실패
+        leader = asyncio.ensure_future(flight.do("key", fail_later))
+        await started.wait()
+        leader.cancel()
+        await asyncio.sleep(0.05)
+        gc.collect()
+        assert flight.snapshot()["in_flight"] == 0
+
+    asyncio.run(scenario())
+    gc.collect()
+    assert unretrieved == []
@@ -0,0 +1,32 @@
+from types import SimpleNamespace
+
+import models
+from routers.user_router import get_all_users_chat_history
+from tests.conftest import make_user
+
+ADMIN = SimpleNamespace(id=0, role="admin")
+
+
+def _seed(db, count):
+    user = make_user(db, "lister")
+    for _ in range(count):
+        db.add(models.ChatHistory(user_id=user.id))
+    db.commit()
+
+
+def test_without_paging_params_returns_full_list(db, monkeypatch):
+    _seed(db, 5)
+    # 내부 페이지 경계를 넘어도 전체 목록이 이어지는지 확인
+    monkeypatch.setattr("routers.user_router._CHAT_HISTORY_LEGACY_PAGE_SIZE", 2)
+    result = get_all_users_chat_history(cursor=None, limit=None, current_user=ADMIN, db=db)
+    assert isinstance(result, list)
+    assert [item["chat_history_id"] for item in result] == [1, 2, 3, 4, 5]
+
+
+def test_with_limit_returns_cursor_page(db):
+    _seed(db, 5)
+    first = get_all_users_chat_history(cursor=None, limit=3, current_user=ADMIN, db=db)
+    assert [item["chat_history_id"] for item in first["items"]] == [1, 2, 3]
+    second = get_all_users_chat_history(cursor=first["next_cursor"], limit=3, current_user=ADMIN, db=db)
+    assert [item["chat_history_id"] for item in second["items"]] == [4, 5]
+    assert second["next_cursor"] is None
@@ -0,0 +1,149 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import event, inspect as sa_inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+import models
+
+# 인증 사용자 캐시 설정 (환경변수로 조정 가능)
+AUTH_CACHE_ENABLED = os.getenv("AUTH_CACHE_ENABLED", "true").lower() == "true"
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+# 다른 워커의 무효화(버전 증가)를 확인하는 주기 - 최대 이 시간 동안 다른 워커에서 이전 권한이 보일 수 있음
+AUTH_VERSION_CHECK_SECONDS = float(os.getenv("AUTH_VERSION_CHECK_SECONDS", "5"))
+
+_AUTH_VERSION_ID = 1
+_USER_COLUMNS = tuple(attr.key for attr in sa_inspect(models.User).column_attrs)
+
+_lock = threading.Lock()
+# JWT subject(닉네임) → (User 컬럼 값, 캐시 시각), 오래 사용하지 않은 항목부터 제거
+_entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+_version: Dict[str, Any] = {"value": None, "checked_at": 0.0}
+_stats = {"hits": 0, "misses": 0, "invalidations": 0, "version_resets": 0}
+
+
+def _version_check_due() -> bool:
+    """AUTH_VERSION_CHECK_SECONDS가 지났으면 True (동시에 들어온 다른 요청은 확인을 건너뛰도록 먼저 기록)"""
+    now = time.monotonic()
+    with _lock:
+        if now - _version["checked_at"] < AUTH_VERSION_CHECK_SECONDS:
+            return False
+        _version["checked_at"] = now
+        return True
+
+
+def _version_query():
+    return select(models.AuthVersion.version).where(models.AuthVersion.id == _AUTH_VERSION_ID)
+
+
+def _apply_version(current: int) -> None:
+    """
+    다른 워커가 공유 버전을 올렸으면 로컬 캐시 전체 비우기
+
+    버전은 권한 변경/탈퇴와 같은 트랜잭션에서 증가하므로 변경이 커밋된 뒤에만 보입니다.
+    """
+    with _lock:
+        if _version["value"] is not None and current != _version["value"]:
+            _entries.clear()
+            _stats["version_resets"] += 1
+        _version["value"] = current
+
+
+def _to_detached_user(values: Dict[str, Any]) -> models.User:
+    """
+    캐시된 값으로 요청마다 새 User 객체 생성 (세션에 속하지 않은 detached 상태)
+
+    요청 간에 ORM 객체를 공유하지 않습니다. 값이 오래됐을 수 있으므로 수정이 필요하면 merge하지 말고
+    id로 필요한 컬럼만 UPDATE 하세요.
+    """
+    user = models.User(**values)
+    make_transient_to_detached(user)
+    return user
+
+
+def _lookup(subject: str) -> Optional[models.User]:
+    now = time.monotonic()
+    with _lock:
+        entry = _entries.get(subject)
+        if entry is None or now - entry[1] > AUTH_CACHE_TTL_SECONDS:
+            if entry is not None:
+                del _entries[subject]
+            _stats["misses"] += 1
+            return None
+        _entries.move_to_end(subject)
+        _stats["hits"] += 1
+        values = entry[0]
+    return _to_detached_user(values)
+
+
+def get_cached_user(db: Session, subject: str) -> Optional[models.User]:
+    """캐시된 인증 사용자 반환 (없거나 만료되면 None) - 동기 세션(get_db)을 쓰는 엔드포인트용"""
+    if not AUTH_CACHE_ENABLED:
+        return None
+    if _version_check_due():
+        _apply_version(db.scalar(_version_query()) or 0)
+    return _lookup(subject)
+
+
+async def get_cached_user_async(db: AsyncSession, subject: str) -> Optional[models.User]:
+    """get_cached_user의 비동기 세션(get_async_db)용"""
+    if not AUTH_CACHE_ENABLED:
+        return None
+    if _version_check_due():
+        _apply_version(await db.scalar(_version_query()) or 0)
+    return _lookup(subject)
+
+
+def cache_user(subject: str, user: models.User) -> models.User:
+    """DB에서 확인한 활성 사용자를 캐시에 저장하고 detached 사본 반환"""
+    values = {key: getattr(user, key) for key in _USER_COLUMNS}
+    if AUTH_CACHE_ENABLED:
+        with _lock:
+            _entries[subject] = (values, time.monotonic())
+            _entries.move_to_end(subject)
+            while len(_entries) > AUTH_CACHE_MAX_ENTRIES:
+                _entries.popitem(last=False)
+    return _to_detached_user(values)
+
+
+def _discard(subject: str) -> None:
+    with _lock:
+        _entries.pop(subject, None)
+
+
+def invalidate_user(db: Session, subject: str) -> None:
+    """
+    사용자의 캐시 항목을 지우고 공유 버전을 올려 다른 워커의 캐시도 비우게 함
+
+    호출한 쪽의 트랜잭션에서 버전을 올리므로 변경 내용과 함께 커밋해야 합니다.
+    커밋 전까지는 동시에 들어온 요청이 변경 전 행을 다시 캐시할 수 있으므로 커밋 직후에도 항목을 지웁니다.
+    """
+    with _lock:
+        _entries.pop(subject, None)
+        _stats["invalidations"] += 1
+    event.listen(db, "after_commit", lambda session: _discard(subject), once=True)
+
+    updated = db.query(models.AuthVersion).filter(
+        models.AuthVersion.id == _AUTH_VERSION_ID
+    ).update({models.AuthVersion.version: models.AuthVersion.version + 1}, synchronize_session=False)
+    if not updated:
+        db.add(models.AuthVersion(id=_AUTH_VERSION_ID, version=1))
+
+
+def get_auth_cache_metrics() -> Dict[str, Any]:
+    """인증 캐시 크기/적중률 및 무효화 횟수"""
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            "enabled": AUTH_CACHE_ENABLED,
+            "entries": len(_entries),
+            "ttl_seconds": AUTH_CACHE_TTL_SECONDS,
+            "version": _version["value"],
+            **_stats,
+            "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else None,
+        }
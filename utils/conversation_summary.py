@@ -0,0 +1,146 @@
+import os
+import json
+from typing import List, Optional
+
+import models
+from database import SessionLocal
+from utils.llm_client import chat_completion, get_openai_client
+from utils.deadline import no_deadline
+
+# 요약 설정 (환경변수로 조정 가능)
+# 최근 N개 메시지는 원문 그대로 프롬프트에 넣고, 그보다 오래된 메시지만 요약에 반영
+SUMMARY_RECENT_MESSAGES = int(os.getenv("SUMMARY_RECENT_MESSAGES", "6"))
+# 요약되지 않은 오래된 메시지가 N개 이상 쌓이면 요약 갱신 (기본 3턴)
+SUMMARY_UPDATE_EVERY_MESSAGES = int(os.getenv("SUMMARY_UPDATE_EVERY_MESSAGES", "6"))
+SUMMARY_MAX_CHARS = int(os.getenv("SUMMARY_MAX_CHARS", "500"))
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL") or os.getenv("DEFAULT_MODEL", "gpt-4.1-nano-2025-04-14")
+
+SUMMARY_INSTRUCTIONS = f"""아래의 기존 요약과 새 대화를 합쳐 퍼스널컬러 상담에 필요한 사실만 {SUMMARY_MAX_CHARS}자 이내로 요약해주세요.
+- 피부톤, 혈관/머리/눈동자 색, 선호/비선호 색상, 스타일 고민, 직업/상황 등 사용자에 대한 사실은 반드시 유지
+- 전문가가 추정한 톤과 이미 안내한 추천은 짧게 기록
+- 요약문만 출력"""
+
+client = get_openai_client()
+
+
+def format_message(msg: models.ChatMessage, user_label: str, ai_label: str) -> str:
+    """대화 메시지 1건을 프롬프트용 한 줄로 변환 (AI 메시지는 description만 사용)"""
+    if msg.role == "user":
+        return f"{user_label}: {msg.text}"
+    try:
+        ai_data = json.loads(msg.text)
+        return f"{ai_label}: {ai_data.get('description', msg.text)}"
+    except (json.JSONDecodeError, TypeError, AttributeError):
+        return f"{ai_label}: {msg.text}"
+
+
+def build_conversation_context(
+    summary: Optional[str],
+    messages: List[models.ChatMessage],
+    user_label: str = "User",
+    ai_label: str = "AI",
+    max_messages: Optional[int] = None,
+    max_chars: Optional[int] = None,
+) -> str:
+    """
+    누적 요약 + 요약 이후의 최근 메시지로 대화 맥락 구성
+
+    Args:
+        summary: ChatHistory.summary (없으면 생략)
+        messages: 요약에 아직 반영되지 않은 메시지들 (오래된 순)
+        max_messages: 최근 메시지 최대 개수
+        max_chars: 전체 길이 상한, 넘으면 가장 오래된 메시지부터 제외 (요약은 유지)
+
+    Returns:
+        프롬프트에 넣을 대화 맥락 문자열
+    """
+    if max_messages is not None:
+        messages = messages[-max_messages:] if max_messages > 0 else []
+
+    header = f"[이전 대화 요약]\n{summary}\n\n[최근 대화]\n" if summary else ""
+    lines = [format_message(m, user_label, ai_label) for m in messages]
+
+    if max_chars is not None:
+        budget = max_chars - len(header)
+        kept = []
+        for line in reversed(lines):
+            if budget - (len(line) + 1) < 0:
+                break
+            kept.append(line)
+            budget -= len(line) + 1
+        lines = list(reversed(kept))
+
+    return header + "".join(f"{line}\n" for line in lines)
+
+
+def _summarize(previous_summary: Optional[str], messages: List[models.ChatMessage], user_id: int) -> str:
+    conversation = "".join(f"{format_message(m, '사용자', '전문가')}\n" for m in messages)
+    # 고정 지시문을 앞에, 요약/대화를 뒤에 배치 (프롬프트 접두사 캐시 적중용)
+    prompt = f"""{SUMMARY_INSTRUCTIONS}
+
+기존 요약:
+{previous_summary or "(없음)"}
+
+새 대화:
+{conversation}"""
+    response = chat_completion(
+        client,
+        "chatbot.summary",
+        timeout=15.0,
+        budget="background",
+        user_id=user_id,
+        model=SUMMARY_MODEL,
+        messages=[
+            {"role": "system", "content": "당신은 상담 기록을 간결하게 요약하는 비서입니다."},
+            {"role": "user", "content": prompt},
+        ],
+        max_tokens=400,
+        temperature=0.2,
+    )
+    return response.choices[0].message.content.strip()[:SUMMARY_MAX_CHARS]
+
+
+def update_conversation_summary(history_id: int, user_id: int) -> None:
+    """
+    최근 SUMMARY_RECENT_MESSAGES개를 제외한 오래된 메시지가 충분히 쌓였으면 누적 요약 갱신
+
+    응답 이후 BackgroundTasks로 실행되므로 별도 DB 세션을 사용하며, 실패해도 대화에는 영향이 없습니다.
+    """
+    # 이미 응답을 보냈으므로 요청 마감 시간과 무관하게 실행
+    with no_deadline():
+        _update_conversation_summary(history_id, user_id)
+
+
+def _update_conversation_summary(history_id: int, user_id: int) -> None:
+    db = SessionLocal()
+    try:
+        history = db.query(models.ChatHistory).filter_by(id=history_id).first()
+        if not history:
+            return
+        summarized = history.summary_message_count or 0
+        messages = db.query(models.ChatMessage).filter(
+            models.ChatMessage.history_id == history_id
+        ).order_by(models.ChatMessage.id.asc()).offset(summarized).all()
+
+        pending = messages[:max(0, len(messages) - SUMMARY_RECENT_MESSAGES)]
+        if len(pending) < SUMMARY_UPDATE_EVERY_MESSAGES:
+            return
+
+        new_summary = _summarize(history.summary, pending, user_id)
+
+        # 동시에 다른 요약 갱신이 먼저 반영됐다면 덮어쓰지 않음
+        updated = db.query(models.ChatHistory).filter(
+            models.ChatHistory.id == history_id,
+            models.ChatHistory.summary_message_count == summarized
+        ).update({
+            models.ChatHistory.summary: new_summary,
+            models.ChatHistory.summary_message_count: summarized + len(pending),
+        }, synchronize_session=False)
+        db.commit()
+        if updated:
+            print(f"📝 대화 요약 갱신: history_id={history_id}, 요약 메시지 {summarized + len(pending)}개")
+    except Exception as e:
+        print(f"⚠️ 대화 요약 갱신 실패 (무시): {e}")
+        db.rollback()
+    finally:
+        db.close()
@@ -0,0 +1,218 @@
+import os
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Tuple
+
+from sqlalchemy import event
+
+# 요청 마감 시간 설정 (환경변수로 조정 가능)
+REQUEST_DEFAULT_TIMEOUT_SECONDS = float(os.getenv("REQUEST_DEFAULT_TIMEOUT_SECONDS", "30"))
+REQUEST_MAX_TIMEOUT_SECONDS = float(os.getenv("REQUEST_MAX_TIMEOUT_SECONDS", "120"))
+# 클라이언트가 자신의 타임아웃(초)을 알려주는 헤더
+REQUEST_TIMEOUT_HEADER = b"x-request-timeout"
+
+# 경로별 기본 마감 시간(초), 앞에서부터 처음 일치하는 접두사 사용 (None이면 마감 없음)
+ROUTE_TIMEOUTS: Tuple[Tuple[str, Optional[float]], ...] = (
+    ("/api/chatbot/analyze", float(os.getenv("REQUEST_TIMEOUT_ANALYZE_SECONDS", "25"))),
+    ("/api/survey/submit", float(os.getenv("REQUEST_TIMEOUT_SURVEY_SUBMIT_SECONDS", "40"))),
+    ("/api/chatbot/end", 60.0),
+    ("/api/chatbot/report", 60.0),
+    # 전체 목록을 스트리밍하는 관리자 조회/내보내기
+    ("/api/feedback/list/ai_feedbacks", None),
+    ("/api/users/list/chat_history/export", None),
+)
+
+
+class DeadlineExceededError(RuntimeError):
+    """요청 마감 시간이 지났거나 클라이언트 연결이 끊겨 남은 작업을 중단한 경우 (HTTP 504로 변환)"""
+
+
+class _Deadline:
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+        # 스레드풀에서 실행 중인 동기 코드도 확인할 수 있도록 threading.Event 사용
+        self.cancelled = threading.Event()
+
+
+_current: ContextVar[Optional[_Deadline]] = ContextVar("request_deadline", default=None)
+
+
+def remaining() -> Optional[float]:
+    """현재 요청의 남은 시간(초), 마감이 없으면 None (취소된 요청은 0)"""
+    d = _current.get()
+    if d is None:
+        return None
+    if d.cancelled.is_set():
+        return 0.0
+    return d.expires_at - time.monotonic()
+
+
+def has_time_for(seconds: float) -> bool:
+    """남은 시간 안에 seconds 만큼 걸리는 단계를 마칠 수 있는지 (마감이 없으면 항상 True)"""
+    left = remaining()
+    return left is None or left >= seconds
+
+
+def check_deadline(stage: str) -> None:
+    """마감이 지났거나 클라이언트가 연결을 끊었으면 DeadlineExceededError"""
+    d = _current.get()
+    if d is None:
+        return
+    if d.cancelled.is_set():
+        raise DeadlineExceededError(f"클라이언트 연결 종료로 중단: {stage}")
+    if time.monotonic() >= d.expires_at:
+        raise DeadlineExceededError(f"요청 마감 시간 초과: {stage}")
+
+
+def bounded_timeout(timeout: float, stage: str, minimum: float = 1.0) -> float:
+    """
+    하위 호출의 제한 시간을 남은 시간 이내로 줄임
+
+    Raises:
+        DeadlineExceededError: 남은 시간이 minimum보다 적어 호출해도 끝낼 수 없는 경우
+    """
+    check_deadline(stage)
+    left = remaining()
+    if left is None:
+        return timeout
+    if left < minimum:
+        raise DeadlineExceededError(f"남은 시간 부족({left:.1f}s)으로 생략: {stage}")
+    return min(timeout, left)
+
+
+@contextmanager
+def no_deadline():
+    """응답 이후 BackgroundTasks 등 요청 마감과 무관한 작업에서 마감 해제"""
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def detached_deadline():
+    """
+    현재 요청과 같은 마감 시각을 쓰되 이 요청의 연결 종료로는 취소되지 않는 마감으로 교체
+
+    여러 요청이 함께 기다리는 작업(single_flight)을 만들 때 사용합니다. 작업 Task는 생성 시점의 컨텍스트를
+    복사하므로, 첫 요청이 연결을 끊어도 작업과 함께 기다리던 다른 요청은 504로 끝나지 않습니다.
+    """
+    d = _current.get()
+    token = _current.set(_Deadline(max(0.0, d.expires_at - time.monotonic())) if d is not None else None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def _resolve_timeout(scope) -> Optional[float]:
+    for name, value in scope.get("headers", []):
+        if name == REQUEST_TIMEOUT_HEADER:
+            try:
+                return min(max(float(value.decode()), 0.1), REQUEST_MAX_TIMEOUT_SECONDS)
+            except ValueError:
+                break
+    path = scope.get("path", "")
+    for prefix, seconds in ROUTE_TIMEOUTS:
+        if path.startswith(prefix):
+            return seconds
+    return REQUEST_DEFAULT_TIMEOUT_SECONDS
+
+
+class DeadlineMiddleware:
+    """
+    요청마다 마감 시간을 설정하고, 클라이언트가 응답 전에 연결을 끊으면 처리를 취소하는 ASGI 미들웨어
+
+    - 마감 시간: X-Request-Timeout 헤더(초) → 경로별 기본값(ROUTE_TIMEOUTS) → REQUEST_DEFAULT_TIMEOUT_SECONDS
+    - 연결 종료 시 async 처리는 즉시 취소하고, 스레드풀의 동기 코드는 다음 LLM/DB 호출 시점에 중단
+    - 응답을 보낸 뒤의 BackgroundTasks는 취소하지 않음
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        seconds = _resolve_timeout(scope)
+        if seconds is None:
+            await self.app(scope, receive, send)
+            return
+
+        # 요청 본문을 먼저 모두 읽어 두고, 이후의 receive는 연결 종료 감시에 사용
+        body_messages = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body_messages.append(message)
+            if not message.get("more_body", False):
+                break
+
+        disconnected = asyncio.Event()
+        response_complete = False
+
+        async def replay_receive():
+            if body_messages:
+                return body_messages.pop(0)
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def tracking_send(message):
+            nonlocal response_complete
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+            await send(message)
+
+        async def watch_disconnect():
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                    return
+
+        deadline = _Deadline(seconds)
+        token = _current.set(deadline)
+        try:
+            app_task = asyncio.ensure_future(self.app(scope, replay_receive, tracking_send))
+            watcher = asyncio.ensure_future(watch_disconnect())
+            await asyncio.wait({app_task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if watcher.done() and not app_task.done() and not response_complete:
+                print(f"🔌 클라이언트 연결 종료 - 요청 처리 취소: {scope.get('path')}")
+                deadline.cancelled.set()
+                app_task.cancel()
+            watcher.cancel()
+            try:
+                await app_task
+            except asyncio.CancelledError:
+                if not deadline.cancelled.is_set():
+                    raise
+        finally:
+            _current.reset(token)
+
+
+def install_db_deadline(engine) -> None:
+    """
+    DB 조회도 요청 마감을 따르도록 엔진에 이벤트 등록
+
+    SELECT 실행 전에 마감을 확인하고, MySQL에서는 남은 시간을 MAX_EXECUTION_TIME 힌트로 전달합니다.
+    (쓰기/정리 쿼리는 중단하지 않음)
+    """
+    is_mysql = engine.dialect.name == "mysql"
+
+    @event.listens_for(engine, "before_cursor_execute", retval=True)
+    def _apply_deadline(conn, cursor, statement, parameters, context, executemany):
+        left = remaining()
+        if left is None or not statement.lstrip()[:6].upper() == "SELECT":
+            return statement, parameters
+        check_deadline("db.select")
+        if is_mysql:
+            ms = max(1, int(left * 1000))
+            statement = statement.lstrip()
+            statement = f"SELECT /*+ MAX_EXECUTION_TIME({ms}) */{statement[6:]}"
+        return statement, parameters
@@ -0,0 +1,131 @@
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import models
+from database import SessionLocal
+
+# 캐시 설정 (환경변수로 조정 가능)
+DIAGNOSIS_CACHE_TTL_HOURS = int(os.getenv("DIAGNOSIS_CACHE_TTL_HOURS", "168"))  # 기본 7일
+DIAGNOSIS_CACHE_MAX_ENTRIES = int(os.getenv("DIAGNOSIS_CACHE_MAX_ENTRIES", "5000"))
+
+_lock = threading.Lock()
+# 조회 오류(테이블 없음, DB 장애 등)는 미스와 따로 집계 - 오류가 계속 늘면 캐시가 동작하지 않는 상태
+_stats = {"hits": 0, "misses": 0, "lookup_errors": 0, "store_errors": 0}
+
+
+def _count(outcome: str) -> None:
+    with _lock:
+        _stats[outcome] += 1
+
+
+def _utcnow() -> datetime:
+    # DB의 DateTime 컬럼은 tz-naive로 저장되므로 UTC naive 값으로 비교
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def make_diagnosis_cache_key(conversation_text: str, season: str, model: str) -> str:
+    """
+    (잘린) 대화 텍스트 + 계절 + 모델로 캐시 키 생성
+
+    동일한 대화/계절/모델 조합이면 같은 진단 결과를 재사용할 수 있습니다.
+    """
+    fingerprint = "\x1f".join([model or "", season or "", conversation_text or ""])
+    return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+
+
+def get_cached_diagnosis(cache_key: str) -> Optional[dict]:
+    """
+    캐시된 진단 데이터 조회 (만료된 항목은 무시)
+
+    캐시 조회 실패는 진단 생성 자체를 막지 않도록 None을 반환합니다.
+    """
+    db = SessionLocal()
+    try:
+        entry = db.query(models.DiagnosisCache).filter(
+            models.DiagnosisCache.cache_key == cache_key,
+            models.DiagnosisCache.expires_at > _utcnow()
+        ).first()
+        if not entry:
+            _count("misses")
+            return None
+        entry.hit_count = (entry.hit_count or 0) + 1
+        entry.last_accessed_at = _utcnow()
+        db.commit()
+        data = json.loads(entry.payload)
+        _count("hits")
+        return data
+    except Exception as e:
+        _count("lookup_errors")
+        print(f"❌ 진단 캐시 조회 오류 (캐시 없이 진행): {e}")
+        db.rollback()
+        return None
+    finally:
+        db.close()
+
+
+def set_cached_diagnosis(cache_key: str, season: str, model: str, data: dict) -> None:
+    """
+    진단 데이터를 캐시에 저장하고 TTL/최대 개수 기준으로 오래된 항목 정리
+    """
+    db = SessionLocal()
+    try:
+        now = _utcnow()
+        payload = json.dumps(data, ensure_ascii=False)
+        expires_at = now + timedelta(hours=DIAGNOSIS_CACHE_TTL_HOURS)
+
+        entry = db.query(models.DiagnosisCache).filter_by(cache_key=cache_key).first()
+        if entry:
+            entry.payload = payload
+            entry.last_accessed_at = now
+            entry.expires_at = expires_at
+        else:
+            db.add(models.DiagnosisCache(
+                cache_key=cache_key,
+                season=season,
+                model=model,
+                payload=payload,
+                hit_count=0,
+                created_at=now,
+                last_accessed_at=now,
+                expires_at=expires_at
+            ))
+        db.commit()
+
+        _evict(db, now)
+    except Exception as e:
+        _count("store_errors")
+        print(f"❌ 진단 캐시 저장 오류 (무시하고 진행): {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def _evict(db, now: datetime) -> None:
+    """만료된 항목 삭제 후, 최대 개수를 넘으면 가장 오래 사용되지 않은 항목부터 삭제"""
+    db.query(models.DiagnosisCache).filter(
+        models.DiagnosisCache.expires_at <= now
+    ).delete(synchronize_session=False)
+
+    # 최대 개수 경계에 있는 항목의 last_accessed_at을 기준으로 그 이전 항목 삭제
+    cutoff = db.query(models.DiagnosisCache.last_accessed_at).order_by(
+        models.DiagnosisCache.last_accessed_at.desc()
+    ).offset(DIAGNOSIS_CACHE_MAX_ENTRIES).limit(1).scalar()
+    if cutoff is not None:
+        db.query(models.DiagnosisCache).filter(
+            models.DiagnosisCache.last_accessed_at <= cutoff
+        ).delete(synchronize_session=False)
+    db.commit()
+
+
+def get_diagnosis_cache_metrics() -> dict:
+    """진단 캐시 적중/미스 및 조회·저장 오류 횟수"""
+    with _lock:
+        lookups = _stats["hits"] + _stats["misses"]
+        return {
+            **_stats,
+            "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else None,
+        }
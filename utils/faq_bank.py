@@ -0,0 +1,175 @@
+import os
+import json
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from utils.llm_client import create_embeddings, get_openai_client
+
+# FAQ 답변 은행 설정 (환경변수로 조정 가능)
+FAQ_ENABLED = os.getenv("FAQ_ENABLED", "true").lower() == "true"
+FAQ_INDEX_PATH = os.getenv("FAQ_INDEX_PATH", "data/FAQ/faq_index.json")
+# 질문 임베딩과 FAQ 대표 벡터의 코사인 유사도가 이 값 이상일 때만 저장된 답변 사용
+FAQ_SIMILARITY_THRESHOLD = float(os.getenv("FAQ_SIMILARITY_THRESHOLD", "0.93"))
+FAQ_EMBEDDING_MODEL = "text-embedding-3-small"
+# 답변에 저장된 닉네임 자리표시자 (build_faq_index.py가 원래 사용자 닉네임을 치환해 둠)
+NICKNAME_PLACEHOLDER = "{nickname}"
+
+client = get_openai_client()
+
+class _IndexSnapshot(NamedTuple):
+    """로드된 FAQ 인덱스 (교체만 하고 수정하지 않음 - 호출마다 참조 하나를 잡고 사용)"""
+    mtime: Optional[float]
+    entries: Tuple[Dict[str, Any], ...]
+    matrix: Optional[np.ndarray]
+
+
+_lock = threading.Lock()
+_index = _IndexSnapshot(None, (), None)
+# 로드에 실패한 파일의 수정 시각 (같은 파일을 매 요청마다 다시 읽지 않도록 기록, 파일이 바뀌면 다시 시도)
+_failed_mtime: Optional[float] = None
+_stats: Dict[str, Any] = {"lookups": 0, "hits": 0, "misses": 0, "errors": 0, "load_errors": 0, "entry_hits": {}}
+
+
+def _read_index_file(mtime: float) -> _IndexSnapshot:
+    with open(FAQ_INDEX_PATH, encoding="utf-8") as f:
+        data = json.load(f)
+    entries = tuple(e for e in data.get("entries", []) if e.get("enabled", True))
+    matrix = None
+    if entries:
+        matrix = np.array([e["embedding"] for e in entries], dtype=np.float32)
+        if matrix.ndim != 2:
+            raise ValueError(f"임베딩 길이가 항목마다 다릅니다: shape={matrix.shape}")
+        matrix.flags.writeable = False
+    return _IndexSnapshot(mtime, entries, matrix)
+
+
+def _load_index() -> _IndexSnapshot:
+    """
+    FAQ 인덱스 반환 (오프라인 작업이 파일을 갱신하면 수정 시각을 보고 다시 로드)
+
+    파일을 읽지 못하면(쓰는 중이거나 형식 오류) 이전 인덱스를 계속 사용합니다.
+    """
+    global _index, _failed_mtime
+    try:
+        mtime = os.path.getmtime(FAQ_INDEX_PATH)
+    except OSError:
+        return _index
+
+    with _lock:
+        if mtime in (_index.mtime, _failed_mtime):
+            return _index
+        try:
+            snapshot = _read_index_file(mtime)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            _failed_mtime = mtime
+            _stats["load_errors"] += 1
+            print(f"⚠️ FAQ 인덱스 로드 실패 - 이전 인덱스 유지 ({len(_index.entries)}개 항목): {e}")
+            return _index
+        _index, _failed_mtime = snapshot, None
+        print(f"📚 FAQ 인덱스 로드: {len(snapshot.entries)}개 항목 ({FAQ_INDEX_PATH})")
+        return _index
+
+
+def _personalize(value: Any, nickname: str) -> Any:
+    if isinstance(value, str):
+        return value.replace(NICKNAME_PLACEHOLDER, nickname)
+    if isinstance(value, list):
+        return [_personalize(v, nickname) for v in value]
+    return value
+
+
+def faq_available() -> bool:
+    """FAQ 조회가 켜져 있고 사용할 항목이 있는지 (없으면 질문 임베딩을 만들 필요 없음)"""
+    return FAQ_ENABLED and _load_index().matrix is not None
+
+
+def embed_faq_question(question: str, user_id: Optional[int] = None) -> Optional[List[float]]:
+    """
+    FAQ 조회용 질문 임베딩 (같은 턴의 RAG 검색에서도 재사용), 실패하면 None
+
+    임베딩 실패 등 오류는 일반 LLM 경로로 진행하도록 None을 반환합니다.
+    """
+    try:
+        response = create_embeddings(
+            client, "faq.embed", timeout=5.0, user_id=user_id,
+            model=FAQ_EMBEDDING_MODEL, input=[question.strip()]
+        )
+        return response.data[0].embedding
+    except Exception as e:
+        print(f"⚠️ FAQ 조회 생략: {e}")
+        with _lock:
+            _stats["errors"] += 1
+        return None
+
+
+def match_faq(query_embedding: List[float], nickname: str) -> Optional[dict]:
+    """
+    질문 임베딩과 거의 같은 FAQ가 있으면 저장된 답변(닉네임 반영)을 반환, 없으면 None
+
+    채팅 LLM 호출 없이 행렬 곱으로 처리합니다. (질문 임베딩은 embed_faq_question)
+    FAQ 답변은 이전 대화 맥락 없이 만든 답변이므로 대화의 첫 질문에만 사용합니다.
+
+    Returns:
+        {"faq_id", "similarity", "primary_tone", "sub_tone", "description", "recommendations", "emotion"}
+    """
+    if not FAQ_ENABLED:
+        return None
+    # 다른 요청이 인덱스를 교체해도 이 호출은 같은 스냅샷의 행렬/항목을 사용
+    index = _load_index()
+    if index.matrix is None:
+        return None
+
+    query = np.array(query_embedding, dtype=np.float32)
+    query /= np.linalg.norm(query) or 1.0
+    if query.shape != (index.matrix.shape[1],):
+        # 인덱스를 만든 임베딩 모델과 현재 모델의 차원이 다른 경우 (build_faq_index.py 재실행 필요)
+        print(f"⚠️ FAQ 조회 생략: 임베딩 차원 불일치 (질문 {query.shape[0]}, 인덱스 {index.matrix.shape[1]})")
+        with _lock:
+            _stats["errors"] += 1
+        return None
+
+    similarities = index.matrix @ query
+    best = int(np.argmax(similarities))
+    similarity = float(similarities[best])
+
+    with _lock:
+        _stats["lookups"] += 1
+        if similarity < FAQ_SIMILARITY_THRESHOLD:
+            _stats["misses"] += 1
+            return None
+        entry = index.entries[best]
+        _stats["hits"] += 1
+        _stats["entry_hits"][entry["id"]] = _stats["entry_hits"].get(entry["id"], 0) + 1
+
+    print(f"📚 FAQ 답변 사용: #{entry['id']} (유사도 {similarity:.3f}) - {entry['question'][:30]}")
+    answer = _personalize(entry["answer"], nickname)
+    return {
+        "faq_id": entry["id"],
+        "similarity": round(similarity, 4),
+        "primary_tone": answer.get("primary_tone", ""),
+        "sub_tone": answer.get("sub_tone", ""),
+        "description": answer.get("description", ""),
+        "recommendations": answer.get("recommendations", []),
+        "emotion": answer.get("emotion", "wink"),
+    }
+
+
+def get_faq_metrics() -> Dict[str, Any]:
+    """FAQ 조회 수/적중률 및 항목별 적중 수"""
+    index = _load_index()
+    with _lock:
+        lookups = _stats["lookups"]
+        return {
+            "enabled": FAQ_ENABLED,
+            "entries": len(index.entries),
+            "threshold": FAQ_SIMILARITY_THRESHOLD,
+            "lookups": lookups,
+            "hits": _stats["hits"],
+            "misses": _stats["misses"],
+            "errors": _stats["errors"],
+            "load_errors": _stats["load_errors"],
+            "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else None,
+            "top_entries": sorted(_stats["entry_hits"].items(), key=lambda kv: kv[1], reverse=True)[:10],
+        }
@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.exc import IntegrityError
+
+import models
+from database import SessionLocal
+
+# 멱등성 키 설정 (환경변수로 조정 가능)
+IDEMPOTENCY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))  # 완료된 응답 보관 기간
+# 처리 중 상태로 남을 수 있는 최대 시간 (프로세스가 죽어 완료되지 못한 요청은 이후 재시도가 다시 처리)
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "120"))
+# 같은 키의 요청이 처리 중일 때 결과를 기다리는 최대 시간
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "30"))
+IDEMPOTENCY_POLL_INTERVAL_SECONDS = 0.2
+
+
+def _utcnow() -> datetime:
+    # DB의 DateTime 컬럼은 tz-naive로 저장되므로 UTC naive 값으로 비교
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _record_key(endpoint: str, user_id: int, idempotency_key: str) -> str:
+    return hashlib.sha256(f"{endpoint}\x1f{user_id}\x1f{idempotency_key}".encode("utf-8")).hexdigest()
+
+
+def _request_hash(payload: Any) -> str:
+    raw = json.dumps(jsonable_encoder(payload), ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def begin_idempotent_request(idempotency_key: str, endpoint: str, user_id: int, payload: Any) -> Optional[dict]:
+    """
+    Idempotency-Key 요청 처리 시작
+
+    - 처음 보는 키: 처리 중으로 등록하고 None 반환 → 호출자가 실제로 처리한 뒤 complete/abandon 호출
+    - 완료된 키: 저장된 응답 반환 (재계산 없음)
+    - 처리 중인 키: 완료될 때까지 기다렸다가 그 응답 반환
+
+    여러 워커 프로세스에서도 동작하도록 DB 유니크 키로 선점합니다. (블로킹 함수이므로 async 경로에서는 스레드풀에서 호출)
+
+    Raises:
+        HTTPException(422): 같은 키로 다른 요청 본문을 보낸 경우
+        HTTPException(409): 기다리는 동안 이전 요청이 끝나지 않은 경우
+    """
+    record_key = _record_key(endpoint, user_id, idempotency_key)
+    request_hash = _request_hash(payload)
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+    waited = False
+
+    while True:
+        db = SessionLocal()
+        try:
+            now = _utcnow()
+            record = db.query(models.IdempotencyRecord).filter_by(record_key=record_key).first()
+
+            if record and record.expires_at <= now:
+                # 만료된 응답이거나 완료되지 못한 채 남은 처리 중 상태 → 새 요청으로 취급
+                db.delete(record)
+                db.commit()
+                record = None
+
+            if record is None:
+                db.add(models.IdempotencyRecord(
+                    record_key=record_key,
+                    user_id=user_id,
+                    endpoint=endpoint,
+                    request_hash=request_hash,
+                    status="in_progress",
+                    created_at=now,
+                    expires_at=now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS),
+                ))
+                try:
+                    db.commit()
+                    return None
+                except IntegrityError:
+                    # 다른 요청이 먼저 선점함 → 다시 조회해서 대기
+                    db.rollback()
+                    continue
+
+            if record.request_hash != request_hash:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="같은 Idempotency-Key로 다른 요청이 전송되었습니다."
+                )
+
+            if record.status == "completed":
+                print(f"🔁 멱등성 키 재사용: {endpoint} user={user_id}{' (처리 완료 대기 후)' if waited else ''}")
+                return json.loads(record.response_body)
+        finally:
+            db.close()
+
+        # 처리 중인 요청의 완료 대기
+        if time.monotonic() >= deadline:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="같은 요청이 아직 처리 중입니다. 잠시 후 다시 시도해주세요.",
+                headers={"Retry-After": "1"},
+            )
+        waited = True
+        time.sleep(IDEMPOTENCY_POLL_INTERVAL_SECONDS)
+
+
+def complete_idempotent_request(idempotency_key: str, endpoint: str, user_id: int, response: Any) -> None:
+    """처리 완료된 응답 저장 (이후 같은 키의 재시도는 이 응답을 그대로 받음)"""
+    db = SessionLocal()
+    try:
+        now = _utcnow()
+        db.query(models.IdempotencyRecord).filter_by(
+            record_key=_record_key(endpoint, user_id, idempotency_key)
+        ).update({
+            models.IdempotencyRecord.status: "completed",
+            models.IdempotencyRecord.response_body: json.dumps(jsonable_encoder(response), ensure_ascii=False),
+            models.IdempotencyRecord.expires_at: now + timedelta(hours=IDEMPOTENCY_TTL_HOURS),
+        }, synchronize_session=False)
+        db.query(models.IdempotencyRecord).filter(
+            models.IdempotencyRecord.expires_at <= now
+        ).delete(synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        print(f"⚠️ 멱등성 응답 저장 실패 (무시): {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def abandon_idempotent_request(idempotency_key: str, endpoint: str, user_id: int) -> None:
+    """처리 실패 시 처리 중 상태 해제 (같은 키로 재시도하면 다시 처리)"""
+    db = SessionLocal()
+    try:
+        db.query(models.IdempotencyRecord).filter_by(
+            record_key=_record_key(endpoint, user_id, idempotency_key),
+            status="in_progress",
+        ).delete(synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        print(f"⚠️ 멱등성 키 해제 실패 (무시): {e}")
+        db.rollback()
+    finally:
+        db.close()
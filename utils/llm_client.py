@@ -0,0 +1,447 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Optional
+
+import httpx
+import openai
+from openai import OpenAI
+from dotenv import load_dotenv
+
+from utils.llm_metrics import record_llm_call
+from utils.llm_limiter import LLM_CONCURRENCY, llm_slot, try_acquire_llm_slot, LLMRateLimitedError
+from utils.deadline import bounded_timeout, remaining, DeadlineExceededError
+
+load_dotenv()
+
+# 호출 기본 설정 (환경변수로 조정 가능)
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "1"))
+# HTTP 커넥션 풀 설정 (프로세스당 하나의 풀을 모든 모듈이 공유)
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "50"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("LLM_KEEPALIVE_EXPIRY_SECONDS", "60"))
+# 부하 테스트 시 mock_openai_server.py 주소로 지정 (예: http://127.0.0.1:8010/v1), 미설정 시 실제 API
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+# 헤지 요청 지연 시간: 첫 요청이 이 시간 안에 끝나지 않으면 동일 요청을 한 번 더 보냄 (0이면 비활성)
+LLM_HEDGE_DELAY_SECONDS = float(os.getenv("LLM_HEDGE_DELAY_SECONDS", "0"))
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+
+class _ConnectionStats:
+    """HTTP 요청 수 대비 새 TCP/TLS 연결 수 집계 (커넥션 재사용률 확인용)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.tls_handshakes = 0
+        self.connect_failures = 0
+
+    def on_request(self, request: httpx.Request) -> None:
+        with self._lock:
+            self.requests += 1
+        # httpcore trace 확장으로 실제 연결 생성/핸드셰이크 이벤트 수집
+        request.extensions["trace"] = self._trace
+
+    def _trace(self, event_name: str, info: dict) -> None:
+        with self._lock:
+            if event_name == "connection.connect_tcp.complete":
+                self.new_connections += 1
+            elif event_name == "connection.start_tls.complete":
+                self.tls_handshakes += 1
+            elif event_name == "connection.connect_tcp.failed":
+                self.connect_failures += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            reused = max(0, self.requests - self.new_connections)
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "reused_connections": reused,
+                "reuse_ratio": round(reused / self.requests, 3) if self.requests else None,
+                "tls_handshakes": self.tls_handshakes,
+                "connect_failures": self.connect_failures,
+            }
+
+
+_connection_stats = _ConnectionStats()
+_client: Optional[OpenAI] = None
+_client_lock = threading.Lock()
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401 (httpx[http2] 설치 시에만 HTTP/2 사용)
+        return True
+    except ImportError:
+        return False
+
+
+def get_openai_client() -> OpenAI:
+    """
+    프로세스 전역에서 공유하는 OpenAI 클라이언트 반환
+
+    모든 라우터/유틸이 같은 HTTP 커넥션 풀(keep-alive, HTTP/2 가능 시 사용)을 재사용하도록
+    OpenAI(...)를 직접 생성하지 말고 이 함수를 사용하세요.
+    """
+    global _client
+    if _client is not None:
+        return _client
+    with _client_lock:
+        if _client is None:
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise RuntimeError("환경변수 OPENAI_API_KEY가 설정되지 않았습니다.")
+            http_client = httpx.Client(
+                http2=_http2_available(),
+                limits=httpx.Limits(
+                    max_connections=LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=LLM_KEEPALIVE_EXPIRY_SECONDS,
+                ),
+                timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS),
+                follow_redirects=True,
+                event_hooks={"request": [_connection_stats.on_request]},
+            )
+            if OPENAI_BASE_URL:
+                print(f"🧪 OpenAI base_url 변경: {OPENAI_BASE_URL}")
+            _client = OpenAI(
+                api_key=api_key,
+                base_url=OPENAI_BASE_URL,
+                http_client=http_client,
+                max_retries=LLM_MAX_RETRIES,
+                timeout=LLM_TIMEOUT_SECONDS,
+            )
+    return _client
+
+
+def get_connection_metrics() -> Dict[str, Any]:
+    """공유 HTTP 커넥션 풀 설정 및 재사용 통계"""
+    return {
+        "http2": _http2_available(),
+        "max_connections": LLM_MAX_CONNECTIONS,
+        "max_keepalive_connections": LLM_MAX_KEEPALIVE_CONNECTIONS,
+        "keepalive_expiry_seconds": LLM_KEEPALIVE_EXPIRY_SECONDS,
+        **_connection_stats.snapshot(),
+        "hedge": get_hedge_metrics(),
+    }
+
+
+def get_hedge_metrics() -> Dict[str, Any]:
+    """헤지 요청 지연 설정 및 보낸/생략한 헤지 요청 수"""
+    with _hedge_lock:
+        return {"delay_seconds": LLM_HEDGE_DELAY_SECONDS, "pool_size": _HEDGE_POOL_SIZE, **_hedge_stats}
+
+
+class LLMUnavailableError(RuntimeError):
+    """서킷 브레이커가 열려 있어 OpenAI 호출을 시도하지 않고 즉시 실패한 경우"""
+
+
+class CircuitBreaker:
+    """
+    연속 실패 횟수 기반 서킷 브레이커
+
+    - closed: 정상 호출
+    - open: reset_timeout 동안 호출 없이 즉시 실패
+    - half_open: 시험 호출 1건만 허용, 성공하면 closed / 실패하면 다시 open
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        # 메트릭
+        self._total_successes = 0
+        self._total_failures = 0
+        self._total_rejected = 0
+        self._open_count = 0
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    self._total_rejected += 1
+                    return False
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    self._total_rejected += 1
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._total_successes += 1
+            self._consecutive_failures = 0
+            self._trial_in_flight = False
+            self._state = self.CLOSED
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._total_failures += 1
+            self._consecutive_failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._open_count += 1
+                    print(f"🚨 LLM 서킷 브레이커 OPEN: {self.name} (연속 실패 {self._consecutive_failures}회)")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """브레이커 판정 대상이 아닌 오류(잘못된 요청 등)로 끝난 경우 시험 호출 슬롯만 반환"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._state
+            if state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                state = self.HALF_OPEN
+            return {
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "total_successes": self._total_successes,
+                "total_failures": self._total_failures,
+                "total_rejected": self._total_rejected,
+                "open_count": self._open_count,
+            }
+
+
+# API 종류별 브레이커 (chat / embeddings)
+_breakers = {
+    "chat": CircuitBreaker("chat", LLM_BREAKER_FAILURE_THRESHOLD, LLM_BREAKER_RESET_SECONDS),
+    "embeddings": CircuitBreaker("embeddings", LLM_BREAKER_FAILURE_THRESHOLD, LLM_BREAKER_RESET_SECONDS),
+}
+
+# 헤지 요청용 스레드 풀 - 호출 한도의 슬롯마다 첫 요청과 헤지 요청이 동시에 실행될 수 있으므로 2배 크기
+# (풀이 작으면 호출 한도보다 먼저 동시 호출 수를 제한하고, 대기한 요청은 제한 시간을 늦게 시작함)
+_HEDGE_POOL_SIZE = 2 * LLM_CONCURRENCY
+_hedge_executor = ThreadPoolExecutor(max_workers=_HEDGE_POOL_SIZE, thread_name_prefix="llm-hedge")
+# 보낸 헤지 요청 / 호출 한도에 여유가 없어 생략한 헤지 요청 수
+_hedge_lock = threading.Lock()
+_hedge_stats = {"sent": 0, "skipped": 0}
+
+
+def _count_hedge(outcome: str) -> None:
+    with _hedge_lock:
+        _hedge_stats[outcome] += 1
+
+
+def _is_breaker_failure(exc: Exception) -> bool:
+    """API 장애로 볼 수 있는 오류만 브레이커 실패로 집계 (400 등 요청 오류는 제외)"""
+    if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError, TimeoutError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code >= 500
+    return False
+
+
+def _run_until(fn: Callable[[float], Any], deadline: float) -> Any:
+    """풀에서 대기한 시간을 빼고 제출 시점 기준 마감 안에서 fn 실행"""
+    timeout = deadline - time.monotonic()
+    if timeout <= 0:
+        raise TimeoutError("LLM 헤지 풀에서 대기하는 동안 제한 시간 초과")
+    return fn(timeout)
+
+
+def _call_with_hedge(
+    fn: Callable[[float], Any], hedge_delay: float, timeout: float, budget: str, user_id: Optional[int]
+) -> Any:
+    """
+    첫 요청이 hedge_delay 안에 끝나지 않으면 두 번째 요청을 보내고 먼저 성공한 응답을 사용
+
+    두 번째 요청도 호출 한도(utils.llm_limiter)의 슬롯을 사용하며, 기다리지 않고 얻을 수 있을 때만 보냅니다.
+    첫 요청도 풀에서 실행합니다. (호출 스레드에서 실행하면 헤지 요청이 먼저 끝나도 첫 요청을 기다려야 함)
+    두 요청 모두 제출 시점 기준 마감을 공유하므로 풀에서 대기한 시간도 제한 시간에 포함됩니다.
+    """
+    deadline = time.monotonic() + timeout
+    first = _hedge_executor.submit(_run_until, fn, deadline)
+    done, _ = wait([first], timeout=hedge_delay)
+    if done:
+        return first.result()
+    if deadline - time.monotonic() < 1.0:
+        # 두 번째 요청이 첫 요청의 마감 안에 끝날 여유가 없으면 첫 요청만 기다림
+        return first.result()
+    release = try_acquire_llm_slot(budget, user_id)
+    if release is None:
+        # 호출 한도에 여유가 없으면 헤지하지 않음 (부하 중에 호출 수를 두 배로 늘리지 않도록)
+        _count_hedge("skipped")
+        return first.result()
+
+    _count_hedge("sent")
+    second = _hedge_executor.submit(_run_until, fn, deadline)
+    # 첫 요청이 먼저 끝나도 두 번째 요청은 계속 실행되므로 끝날 때 슬롯 반환
+    second.add_done_callback(lambda _: release())
+    pending = {first, second}
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def _client_for_deadline(client: OpenAI) -> OpenAI:
+    """
+    요청 마감이 있으면 SDK 자동 재시도를 끈 클라이언트 반환
+
+    제한 시간은 시도마다 적용되므로 재시도하면 남은 시간을 넘길 수 있습니다.
+    (스레드풀의 헤지 요청에서는 마감을 확인할 수 없으므로 호출 전에 결정)
+    """
+    if remaining() is None:
+        return client
+    return client.with_options(max_retries=0)
+
+
+def _usage_tokens(result: Any) -> tuple[int, int, int]:
+    """(prompt, completion, 프롬프트 접두사 캐시에서 재사용된 prompt) 토큰 수"""
+    usage = getattr(result, "usage", None)
+    if usage is None:
+        return 0, 0, 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0
+    return getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0, cached
+
+
+def _guarded_call(
+    kind: str,
+    call_site: str,
+    model: str,
+    fn: Callable[[float], Any],
+    timeout: float,
+    hedge: bool,
+    budget: str,
+    user_id: Optional[int],
+    max_wait: Optional[float],
+) -> Any:
+    breaker = _breakers[kind]
+    if not breaker.allow():
+        record_llm_call(call_site, model, 0.0, "rejected")
+        raise LLMUnavailableError(f"OpenAI {kind} 호출 차단됨 (서킷 브레이커 open): {call_site}")
+    started = time.perf_counter()
+    try:
+        with llm_slot(budget, user_id=user_id, max_wait=max_wait):
+            # 대기열에서 기다린 시간을 빼고 요청 마감 안에 끝나도록 제한 시간 조정
+            timeout = bounded_timeout(timeout, call_site)
+            if hedge and LLM_HEDGE_DELAY_SECONDS > 0:
+                result = _call_with_hedge(fn, LLM_HEDGE_DELAY_SECONDS, timeout, budget, user_id)
+            else:
+                result = fn(timeout)
+    except LLMRateLimitedError:
+        record_llm_call(call_site, model, (time.perf_counter() - started) * 1000, "throttled")
+        breaker.release()
+        raise
+    except DeadlineExceededError:
+        record_llm_call(call_site, model, (time.perf_counter() - started) * 1000, "deadline")
+        breaker.release()
+        raise
+    except Exception as e:
+        latency_ms = (time.perf_counter() - started) * 1000
+        record_llm_call(call_site, model, latency_ms, type(e).__name__)
+        if _is_breaker_failure(e):
+            breaker.record_failure()
+        else:
+            breaker.release()
+        raise
+    latency_ms = (time.perf_counter() - started) * 1000
+    breaker.record_success()
+    prompt_tokens, completion_tokens, cached_tokens = _usage_tokens(result)
+    record_llm_call(call_site, model, latency_ms, "ok", prompt_tokens, completion_tokens, cached_tokens)
+    return result
+
+
+def chat_completion(
+    client: OpenAI,
+    call_site: str,
+    *,
+    timeout: Optional[float] = None,
+    hedge: bool = False,
+    budget: str = "interactive",
+    user_id: Optional[int] = None,
+    max_wait: Optional[float] = None,
+    **kwargs,
+):
+    """
+    client.chat.completions.create 공용 래퍼
+
+    호출 한도(utils.llm_limiter), 제한 시간, 서킷 브레이커, 헤지 요청을 적용하고 호출 결과(지연 시간, 토큰, 결과)를
+    utils.llm_metrics에 기록합니다.
+
+    Args:
+        client: OpenAI 클라이언트
+        call_site: 호출 위치 식별자 (예: "chatbot.analyze")
+        timeout: 호출 제한 시간(초), 기본값 LLM_TIMEOUT_SECONDS (요청 마감까지 남은 시간을 넘지 않도록 줄어듦)
+        hedge: 지연 시 헤지 요청 허용 여부 (지연에 민감한 호출에만 사용)
+        budget: 호출 예산 ("interactive" / "background")
+        user_id: 사용자별 공정성 제한 대상 사용자 ID
+        max_wait: 호출 대기열 최대 대기 시간(초)
+        **kwargs: chat.completions.create 인자
+
+    Raises:
+        LLMUnavailableError: 서킷 브레이커가 열려 있는 경우
+        LLMRateLimitedError: 대기 시간이 max_wait를 넘을 것으로 예상되는 경우
+        DeadlineExceededError: 요청 마감 시간 안에 호출을 끝낼 수 없는 경우 (utils.deadline)
+    """
+    client = _client_for_deadline(client)
+    return _guarded_call(
+        "chat",
+        call_site,
+        kwargs.get("model", ""),
+        lambda t: client.chat.completions.create(timeout=t, **kwargs),
+        timeout or LLM_TIMEOUT_SECONDS,
+        hedge,
+        budget,
+        user_id,
+        max_wait,
+    )
+
+
+def create_embeddings(
+    client: OpenAI,
+    call_site: str,
+    *,
+    timeout: Optional[float] = None,
+    budget: str = "interactive",
+    user_id: Optional[int] = None,
+    max_wait: Optional[float] = None,
+    **kwargs,
+):
+    """
+    client.embeddings.create 공용 래퍼 (chat_completion과 동일한 제한 시간/브레이커/계측 적용)
+    """
+    client = _client_for_deadline(client)
+    return _guarded_call(
+        "embeddings",
+        call_site,
+        kwargs.get("model", ""),
+        lambda t: client.embeddings.create(timeout=t, **kwargs),
+        timeout or LLM_TIMEOUT_SECONDS,
+        False,
+        budget,
+        user_id,
+        max_wait,
+    )
+
+
+def get_breaker_metrics() -> Dict[str, Any]:
+    """API 종류별 서킷 브레이커 상태"""
+    return {kind: breaker.snapshot() for kind, breaker in _breakers.items()}
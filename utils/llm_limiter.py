@@ -0,0 +1,299 @@
+import os
+import math
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from utils.deadline import remaining
+
+# 호출 우선순위 클래스 (앞쪽일수록 우선)
+# - interactive: 사용자가 응답을 기다리는 호출 (analyze, submit_survey 등)
+# - background: 자동 평가(llm_auto_feedback), 대화 요약, 모델 평가 스크립트 등
+PRIORITY_CLASSES = ("interactive", "background")
+
+# 전체 API 한도 (모든 클래스가 공유, 환경변수로 조정 가능)
+LLM_RPS = float(os.getenv("LLM_RPS", "6"))
+LLM_BURST = int(os.getenv("LLM_BURST", "12"))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "20"))
+# 클래스별 최대 대기 시간
+LLM_INTERACTIVE_MAX_WAIT_SECONDS = float(os.getenv("LLM_INTERACTIVE_MAX_WAIT_SECONDS", "5"))
+LLM_BACKGROUND_MAX_WAIT_SECONDS = float(os.getenv("LLM_BACKGROUND_MAX_WAIT_SECONDS", "60"))
+# background 호출이 동시에 점유할 수 있는 최대 슬롯 수
+# (실행 중인 호출은 중단하지 않으므로, 새 interactive 요청이 바로 들어갈 여유를 남겨 둠)
+LLM_BACKGROUND_CONCURRENCY = int(os.getenv("LLM_BACKGROUND_CONCURRENCY", "4"))
+# 사용자 한 명이 동시에 점유할 수 있는 interactive 호출 수 (공정성)
+LLM_PER_USER_CONCURRENCY = int(os.getenv("LLM_PER_USER_CONCURRENCY", "2"))
+
+
+class LLMRateLimitedError(RuntimeError):
+    """대기 시간이 요청 제한 시간을 넘을 것으로 예상되어 호출을 거절한 경우 (HTTP 429로 변환)"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _ClassStats:
+    def __init__(self, name: str, max_wait: float, concurrency: int):
+        self.name = name
+        self.max_wait = max_wait
+        self.concurrency = concurrency
+        self.queue: deque = deque()
+        self.max_queue_depth = 0
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "queue_depth": len(self.queue),
+            "max_queue_depth": self.max_queue_depth,
+            "in_flight": self.in_flight,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait_seconds / self.admitted * 1000, 1) if self.admitted else None,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 1),
+        }
+
+
+class PriorityScheduler:
+    """
+    우선순위 클래스별 대기열을 가진 LLM 호출 스케줄러
+
+    전체 토큰 버킷(초당 호출 수)과 동시 호출 슬롯을 모든 클래스가 공유하며,
+    자리가 나면 대기 중인 interactive 요청에 먼저 배정하고 남는 여유만 background에 배정합니다.
+    이미 실행 중인 호출은 중단하지 않고 요청 경계(다음 배정 시점)에서만 우선순위가 적용됩니다.
+    같은 클래스 안에서는 도착 순서(FIFO)대로 처리합니다.
+    """
+
+    def __init__(self, rate: float, burst: int, concurrency: int, classes: Dict[str, _ClassStats]):
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.classes = classes
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._in_flight = 0
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _class_has_room(self, c: _ClassStats) -> bool:
+        return self._in_flight < self.concurrency and c.in_flight < c.concurrency
+
+    def _is_next(self, name: str, ticket: object) -> bool:
+        """ticket이 자기 클래스 대기열 맨 앞이고, 실행 가능한 상위 클래스 대기 요청이 없는지"""
+        for cls_name in PRIORITY_CLASSES:
+            c = self.classes[cls_name]
+            if cls_name == name:
+                return c.queue[0] is ticket
+            if c.queue and self._class_has_room(c):
+                return False
+        return False
+
+    def _estimated_wait(self, name: str, position: int) -> float:
+        """앞선 대기 요청(상위 클래스 + 같은 클래스 앞쪽)이 모두 토큰을 받을 때까지의 예상 시간"""
+        ahead = position
+        for cls_name in PRIORITY_CLASSES:
+            if cls_name == name:
+                break
+            ahead += len(self.classes[cls_name].queue)
+        return max(0.0, (ahead + 1 - self._tokens) / self.rate)
+
+    def acquire(self, name: str, max_wait: float) -> float:
+        """실행 슬롯 1개를 배정받을 때까지 대기하고 대기 시간(초)을 반환"""
+        c = self.classes[name]
+        started = time.monotonic()
+        deadline = started + max_wait
+        ticket = object()
+        with self._cond:
+            self._refill(started)
+            # 토큰 버킷 기준 예상 대기 시간이 max_wait를 넘으면 줄을 세우지 않고 바로 거절
+            estimated = self._estimated_wait(name, len(c.queue))
+            if estimated > max_wait:
+                c.rejected += 1
+                raise LLMRateLimitedError("LLM 호출 한도 초과", retry_after=max(1, math.ceil(estimated)))
+
+            c.queue.append(ticket)
+            c.max_queue_depth = max(c.max_queue_depth, len(c.queue))
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if self._is_next(name, ticket) and self._class_has_room(c) and self._tokens >= 1:
+                        c.queue.popleft()
+                        self._tokens -= 1
+                        self._in_flight += 1
+                        c.in_flight += 1
+                        c.admitted += 1
+                        waited = now - started
+                        c.total_wait_seconds += waited
+                        c.max_wait_seconds = max(c.max_wait_seconds, waited)
+                        # 다음 순서 요청이 조건을 다시 확인하도록 깨움
+                        self._cond.notify_all()
+                        return waited
+
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        c.rejected += 1
+                        raise LLMRateLimitedError("LLM 동시 호출 한도 초과", retry_after=1)
+                    # 토큰 부족이면 충전 시점에, 슬롯 부족이면 release 알림 시점에 다시 확인
+                    timeout = remaining if self._tokens >= 1 else min(remaining, (1 - self._tokens) / self.rate)
+                    self._cond.wait(timeout)
+            except BaseException:
+                if ticket in c.queue:
+                    c.queue.remove(ticket)
+                    self._cond.notify_all()
+                raise
+
+    def try_acquire(self, name: str) -> bool:
+        """기다리지 않고 바로 배정할 수 있을 때만 실행 슬롯 1개 배정 (대기 중인 요청을 앞지르지 않음)"""
+        c = self.classes[name]
+        with self._cond:
+            self._refill(time.monotonic())
+            ahead = PRIORITY_CLASSES[:PRIORITY_CLASSES.index(name) + 1]
+            if any(self.classes[n].queue for n in ahead) or not self._class_has_room(c) or self._tokens < 1:
+                return False
+            self._tokens -= 1
+            self._in_flight += 1
+            c.in_flight += 1
+            c.admitted += 1
+            return True
+
+    def release(self, name: str) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self.classes[name].in_flight -= 1
+            self._cond.notify_all()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                "rps": self.rate,
+                "burst": self.burst,
+                "concurrency": self.concurrency,
+                "in_flight": self._in_flight,
+                "tokens": round(self._tokens, 2),
+                "classes": {name: self.classes[name].snapshot() for name in PRIORITY_CLASSES},
+            }
+
+
+_scheduler = PriorityScheduler(
+    LLM_RPS, LLM_BURST, LLM_CONCURRENCY,
+    {
+        "interactive": _ClassStats("interactive", LLM_INTERACTIVE_MAX_WAIT_SECONDS, LLM_CONCURRENCY),
+        "background": _ClassStats("background", LLM_BACKGROUND_MAX_WAIT_SECONDS, LLM_BACKGROUND_CONCURRENCY),
+    },
+)
+
+# 사용자별 동시 호출 수
+_user_in_flight: Dict[int, int] = {}
+_user_cond = threading.Condition()
+
+
+def _acquire_user_slot(user_id: int, deadline: float) -> None:
+    with _user_cond:
+        while _user_in_flight.get(user_id, 0) >= LLM_PER_USER_CONCURRENCY:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LLMRateLimitedError("사용자별 LLM 동시 호출 한도 초과", retry_after=1)
+            _user_cond.wait(remaining)
+        _user_in_flight[user_id] = _user_in_flight.get(user_id, 0) + 1
+
+
+def _try_acquire_user_slot(user_id: int) -> bool:
+    with _user_cond:
+        if _user_in_flight.get(user_id, 0) >= LLM_PER_USER_CONCURRENCY:
+            return False
+        _user_in_flight[user_id] = _user_in_flight.get(user_id, 0) + 1
+        return True
+
+
+def _release_user_slot(user_id: int) -> None:
+    with _user_cond:
+        count = _user_in_flight.get(user_id, 0) - 1
+        if count > 0:
+            _user_in_flight[user_id] = count
+        else:
+            _user_in_flight.pop(user_id, None)
+        _user_cond.notify_all()
+
+
+@contextmanager
+def llm_slot(budget: str = "interactive", user_id: Optional[int] = None, max_wait: Optional[float] = None):
+    """
+    LLM 호출 1건의 실행 권한 획득 (사용자별 동시 호출 → 우선순위 스케줄러 순)
+
+    Args:
+        budget: 우선순위 클래스 ("interactive" 또는 "background")
+        user_id: 사용자별 공정성 제한을 적용할 사용자 ID (None이면 미적용, background 호출은 항상 미적용)
+        max_wait: 최대 대기 시간(초), 기본값은 클래스별 설정값
+
+    Raises:
+        LLMRateLimitedError: 예상 대기 시간이 max_wait를 넘는 경우
+    """
+    # background 호출은 스케줄러 대기열에서 오래(최대 LLM_BACKGROUND_MAX_WAIT_SECONDS) 기다릴 수 있으므로
+    # 사용자별 슬롯을 잡지 않음 → 같은 사용자의 interactive 호출을 막지 않고, 총량은 LLM_BACKGROUND_CONCURRENCY로 제한
+    if budget == "background":
+        user_id = None
+    c = _scheduler.classes[budget]
+    max_wait = c.max_wait if max_wait is None else max_wait
+    # 요청 마감까지 남은 시간보다 오래 기다리지 않음
+    left = remaining()
+    if left is not None:
+        max_wait = max(0.0, min(max_wait, left))
+    deadline = time.monotonic() + max_wait
+
+    if user_id is not None:
+        _acquire_user_slot(user_id, deadline)
+    try:
+        _scheduler.acquire(budget, max(0.0, deadline - time.monotonic()))
+        try:
+            yield
+        finally:
+            _scheduler.release(budget)
+    finally:
+        if user_id is not None:
+            _release_user_slot(user_id)
+
+
+def try_acquire_llm_slot(budget: str = "interactive", user_id: Optional[int] = None) -> Optional[Callable[[], None]]:
+    """
+    기다리지 않고 바로 얻을 수 있을 때만 LLM 호출 슬롯 획득 (헤지 요청처럼 생략해도 되는 추가 호출용)
+
+    Returns:
+        슬롯을 반환하는 함수 (호출이 끝나면 한 번 호출), 여유가 없으면 None
+    """
+    if budget == "background":
+        user_id = None
+    if user_id is not None and not _try_acquire_user_slot(user_id):
+        return None
+    if not _scheduler.try_acquire(budget):
+        if user_id is not None:
+            _release_user_slot(user_id)
+        return None
+
+    def release() -> None:
+        _scheduler.release(budget)
+        if user_id is not None:
+            _release_user_slot(user_id)
+
+    return release
+
+
+def get_limiter_metrics() -> Dict[str, Any]:
+    """우선순위 클래스별 대기열 길이/대기 시간/거절 현황"""
+    with _user_cond:
+        active_users = len(_user_in_flight)
+    return {
+        "scheduler": _scheduler.snapshot(),
+        "active_users": active_users,
+    }
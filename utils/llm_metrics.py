@@ -0,0 +1,111 @@
+import os
+import math
+import time
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+# 최근 호출 기록 보관 개수 (프로세스 메모리 내 링 버퍼)
+LLM_METRICS_BUFFER_SIZE = int(os.getenv("LLM_METRICS_BUFFER_SIZE", "5000"))
+
+# 모델별 토큰 단가 (USD / 1M tokens, input, output) - 비용 추정용
+MODEL_PRICES = {
+    "ft:gpt-4.1-nano": (0.20, 0.80),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4o-mini": (0.15, 0.60),
+    "text-embedding-3-small": (0.02, 0.0),
+}
+
+_records: deque = deque(maxlen=LLM_METRICS_BUFFER_SIZE)
+_lock = threading.Lock()
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """모델 단가표 기준 호출 비용(USD) 추정, 단가를 모르는 모델은 None"""
+    for prefix, (input_price, output_price) in MODEL_PRICES.items():
+        if model and model.startswith(prefix):
+            return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+    return None
+
+
+def record_llm_call(
+    call_site: str,
+    model: str,
+    latency_ms: float,
+    outcome: str,
+    prompt_tokens: int = 0,
+    completion_tokens: int = 0,
+    cached_tokens: int = 0,
+) -> None:
+    """LLM 호출 1건 기록 (cached_tokens: prompt_tokens 중 프롬프트 접두사 캐시에서 재사용된 토큰 수)"""
+    with _lock:
+        _records.append({
+            "ts": time.time(),
+            "call_site": call_site,
+            "model": model,
+            "latency_ms": latency_ms,
+            "outcome": outcome,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached_tokens": cached_tokens,
+            "cost_usd": estimate_cost(model, prompt_tokens, completion_tokens),
+        })
+
+
+def _percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    # nearest-rank 방식
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return round(sorted_values[rank - 1], 1)
+
+
+def summarize_llm_calls(window_seconds: Optional[float] = None) -> Dict[str, Any]:
+    """
+    호출 위치별 지연 시간(p50/p95/p99), 토큰(캐시 재사용 비율 포함), 비용, 결과 집계
+
+    Args:
+        window_seconds: 최근 N초 이내 기록만 집계 (None이면 버퍼 전체)
+    """
+    with _lock:
+        records = list(_records)
+    if window_seconds:
+        since = time.time() - window_seconds
+        records = [r for r in records if r["ts"] >= since]
+
+    by_site: Dict[str, List[dict]] = {}
+    for r in records:
+        by_site.setdefault(r["call_site"], []).append(r)
+
+    summary = {}
+    for call_site, rows in sorted(by_site.items()):
+        latencies = sorted(r["latency_ms"] for r in rows)
+        outcomes: Dict[str, int] = {}
+        for r in rows:
+            outcomes[r["outcome"]] = outcomes.get(r["outcome"], 0) + 1
+        costs = [r["cost_usd"] for r in rows if r["cost_usd"] is not None]
+        prompt_tokens = sum(r["prompt_tokens"] for r in rows)
+        cached_tokens = sum(r["cached_tokens"] for r in rows)
+        summary[call_site] = {
+            "count": len(rows),
+            "models": sorted({r["model"] for r in rows if r["model"]}),
+            "outcomes": outcomes,
+            "latency_ms": {
+                "p50": _percentile(latencies, 50),
+                "p95": _percentile(latencies, 95),
+                "p99": _percentile(latencies, 99),
+                "max": round(latencies[-1], 1) if latencies else None,
+            },
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": sum(r["completion_tokens"] for r in rows),
+            "cached_tokens": cached_tokens,
+            "cached_token_ratio": round(cached_tokens / prompt_tokens, 4) if prompt_tokens else None,
+            "cost_usd": round(sum(costs), 6),
+        }
+
+    return {
+        "buffer_size": LLM_METRICS_BUFFER_SIZE,
+        "recorded_calls": len(records),
+        "call_sites": summary,
+    }
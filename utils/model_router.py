@@ -0,0 +1,104 @@
+import os
+import re
+import threading
+from typing import Any, Dict, Optional
+
+# 모델 라우팅 설정 (환경변수로 조정 가능)
+MODEL_ROUTING_ENABLED = os.getenv("MODEL_ROUTING_ENABLED", "true").lower() == "true"
+EMOTION_MODEL_ID = os.getenv("EMOTION_MODEL_ID")
+DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "gpt-4.1-nano-2025-04-14")
+# 짧은 맞장구/인사 등 단순한 턴에 쓰는 작고 빠른 모델
+# 미설정이거나 DEFAULT_MODEL과 같으면 빠른 모델 라우트를 쓰지 않음 (같은 모델로 보내면서 fast로 집계되지 않도록)
+FAST_MODEL = os.getenv("FAST_MODEL") or DEFAULT_MODEL
+FAST_ROUTE_ENABLED = FAST_MODEL != DEFAULT_MODEL
+# 이 길이(자) 이하이고 감정/검색 신호가 없는 질문은 단순한 턴으로 취급
+ROUTER_SHORT_MESSAGE_CHARS = int(os.getenv("ROUTER_SHORT_MESSAGE_CHARS", "15"))
+# 이 길이(자) 이상인 질문은 복잡한 턴으로 취급
+ROUTER_LONG_MESSAGE_CHARS = int(os.getenv("ROUTER_LONG_MESSAGE_CHARS", "120"))
+# 남은 응답 시간이 이보다 적으면 품질보다 속도를 우선해 빠른 모델 사용
+ROUTER_FAST_DEADLINE_SECONDS = float(os.getenv("ROUTER_FAST_DEADLINE_SECONDS", "8"))
+
+# 맞장구/인사/감사 등 (전체 문장이 이런 표현으로만 이루어지면 단순한 턴)
+_ACK_PATTERN = re.compile(
+    r"^\s*(?:(?:네+|넵|예|응+|ㅇㅇ|ㅇㅋ|오케이|ok|okay|알겠어요?|알겠습니다|그렇구나|그렇군요|좋아요?|좋네요|"
+    r"감사해요|감사합니다|고마워요?|고맙습니다|ㄱㅅ|안녕하세요?|안녕|하이|ㅎㅇ|ㅋ+|ㅎ+|와+|오+|대박)[\s.!~?ㅎㅋ^]*)+$",
+    re.IGNORECASE,
+)
+# 공감이 필요한 감정 신호 → 감정 대화에 맞춰 학습한 fine-tuned 모델
+_EMOTION_KEYWORDS = (
+    "고민", "걱정", "스트레스", "속상", "우울", "힘들", "슬프", "불안", "자신감", "콤플렉스",
+    "싫어", "짜증", "화나", "무서", "외로", "ㅠ", "ㅜ",
+)
+# 퍼스널컬러 지식/트렌드 검색(RAG)이 필요한 신호
+_RETRIEVAL_KEYWORDS = (
+    "톤", "컬러", "색", "팔레트", "웜", "쿨", "봄", "여름", "가을", "겨울", "피부", "혈관",
+    "립", "블러셔", "섀도", "파운데이션", "메이크업", "화장", "헤어", "염색", "코디", "옷", "스타일",
+    "트렌드", "유행", "액세서리", "안경", "렌즈",
+)
+
+_lock = threading.Lock()
+_route_counts: Dict[str, int] = {}
+
+
+def extract_turn_features(question: str, remaining_seconds: Optional[float] = None) -> Dict[str, Any]:
+    """LLM 호출 없이 계산하는 턴 특성 (길이, 맞장구 여부, 감정 신호, 검색 필요 여부, 남은 시간)"""
+    text = question.strip()
+    return {
+        "length": len(text),
+        "is_ack": bool(_ACK_PATTERN.match(text)),
+        "emotion_cue": any(k in text for k in _EMOTION_KEYWORDS),
+        "needs_retrieval": any(k in text for k in _RETRIEVAL_KEYWORDS),
+        "remaining_seconds": round(remaining_seconds, 2) if remaining_seconds is not None else None,
+    }
+
+
+def route_chat_model(question: str, remaining_seconds: Optional[float] = None) -> Dict[str, Any]:
+    """
+    이번 턴에 사용할 상담 모델 선택
+
+    - fast: 맞장구/짧은 인사 등 단순한 턴, 또는 남은 응답 시간이 부족한 경우 (FAST_MODEL이 따로 설정된 경우만)
+    - emotion: 감정 신호가 있거나 긴 질문 → fine-tuned 감정 모델 (미설정 시 DEFAULT_MODEL)
+    - default: 그 외 일반 질문 → DEFAULT_MODEL
+
+    Returns:
+        {"model", "route", "features"} - AI 메시지에 함께 저장해 오프라인 품질 비교에 사용
+    """
+    features = extract_turn_features(question, remaining_seconds)
+
+    if not MODEL_ROUTING_ENABLED:
+        route = "emotion" if EMOTION_MODEL_ID else "default"
+    elif FAST_ROUTE_ENABLED and remaining_seconds is not None and remaining_seconds < ROUTER_FAST_DEADLINE_SECONDS:
+        route = "fast"
+    elif features["emotion_cue"] or features["length"] >= ROUTER_LONG_MESSAGE_CHARS:
+        route = "emotion"
+    elif FAST_ROUTE_ENABLED and (
+        features["is_ack"] or (features["length"] <= ROUTER_SHORT_MESSAGE_CHARS and not features["needs_retrieval"])
+    ):
+        route = "fast"
+    else:
+        route = "default"
+
+    model = {
+        "fast": FAST_MODEL,
+        "emotion": EMOTION_MODEL_ID or DEFAULT_MODEL,
+        "default": DEFAULT_MODEL,
+    }[route]
+
+    with _lock:
+        _route_counts[route] = _route_counts.get(route, 0) + 1
+    print(f"🧭 모델 라우팅: {route} → {model[:30]} {features}")
+    return {"model": model, "route": route, "features": features}
+
+
+def get_routing_metrics() -> Dict[str, Any]:
+    """라우트별 선택 횟수"""
+    with _lock:
+        counts = dict(_route_counts)
+    total = sum(counts.values())
+    return {
+        "enabled": MODEL_ROUTING_ENABLED,
+        "fast_route_enabled": FAST_ROUTE_ENABLED,
+        "models": {"fast": FAST_MODEL, "emotion": EMOTION_MODEL_ID or DEFAULT_MODEL, "default": DEFAULT_MODEL},
+        "counts": counts,
+        "ratios": {route: round(count / total, 4) for route, count in counts.items()} if total else {},
+    }
@@ -2,10 +2,14 @@ import json
 import io
 import base64
 import os
+import threading
 from datetime import datetime
 from PIL import Image, ImageDraw, ImageFont
 from typing import Dict, List, Any
 
+# matplotlib.pyplot은 전역 상태를 쓰므로 스레드풀에서 동시에 그리지 않도록 직렬화
+_pyplot_lock = threading.Lock()
+
 class PersonalColorReportGenerator:
     def __init__(self):
         self.color_palettes = {
@@ -37,6 +41,10 @@ class PersonalColorReportGenerator:
 
     def generate_color_palette_image(self, season: str) -> str:
         """퍼스널컬러 팔레트 이미지 생성"""
+        with _pyplot_lock:
+            return self._render_color_palette_image(season)
+
+    def _render_color_palette_image(self, season: str) -> str:
         # matplotlib import (이 함수에서만 사용)
         import matplotlib.pyplot as plt
         import matplotlib.font_manager as fm
@@ -1,23 +1,14 @@
 import os
-from dotenv import load_dotenv
 from openai import OpenAI
-from database import SessionLocal
+from utils.llm_client import create_embeddings, get_openai_client
 
-load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise RuntimeError("환경변수 OPENAI_API_KEY가 설정되지 않았습니다.")
-client = OpenAI(api_key=OPENAI_API_KEY)
+client = get_openai_client()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# 앱 시작 시 RAG 문서 전체를 임베딩할 때의 제한 시간 (질문 임베딩은 10초)
+RAG_INDEX_EMBED_TIMEOUT_SECONDS = float(os.getenv("RAG_INDEX_EMBED_TIMEOUT_SECONDS", "120"))
 
 # Utility functions for text chunking and embedding
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from math import sqrt
 
 def chunk_text(text: str, chunk_size: int = 800, overlap: int = 100) -> List[str]:
@@ -67,7 +58,9 @@ def cosine_similarity(a: List[float], b: List[float]) -> float:
     norm_b = sqrt(sum(y * y for y in b)) or 1e-8
     return dot_product / (norm_a * norm_b)
 
-def embed_texts(client: OpenAI, texts: List[str], model: str = "text-embedding-3-small") -> List[List[float]]:
+def embed_texts(
+    client: OpenAI, texts: List[str], model: str = "text-embedding-3-small", timeout: float = 10.0
+) -> List[List[float]]:
     """
     텍스트 리스트를 임베딩 벡터로 변환
     
@@ -75,14 +68,17 @@ def embed_texts(client: OpenAI, texts: List[str], model: str = "text-embedding-3
         client: OpenAI 클라이언트
         texts: 임베딩할 텍스트 리스트
         model: 사용할 임베딩 모델
+        timeout: 호출 제한 시간 (초)
         
     Returns:
         임베딩 벡터 리스트
     """
-    response = client.embeddings.create(model=model, input=texts)
+    response = create_embeddings(client, "rag.embed", model=model, input=texts, timeout=timeout)
     return [item.embedding for item in response.data]
 
-def top_k_chunks(query: str, index: Dict[str, Any], client: OpenAI, k: int = 3) -> List[str]:
+def top_k_chunks(
+    query: str, index: Dict[str, Any], client: OpenAI, k: int = 3, query_embedding: Optional[List[float]] = None
+) -> List[str]:
     """
     쿼리와 가장 유사한 상위 k개 청크 검색
     
@@ -91,11 +87,13 @@ def top_k_chunks(query: str, index: Dict[str, Any], client: OpenAI, k: int = 3)
         index: RAG 인덱스 (chunks, embeddings 포함)
         client: OpenAI 클라이언트
         k: 반환할 청크 개수
+        query_embedding: 이미 계산한 쿼리 임베딩 (여러 인덱스 검색 시 임베딩 호출을 한 번만 하도록 재사용)
         
     Returns:
         상위 k개 유사한 청크 리스트
     """
-    query_embedding = embed_texts(client, [query])[0]
+    if query_embedding is None:
+        query_embedding = embed_texts(client, [query])[0]
     similarities = [
         (cosine_similarity(query_embedding, embedding), i)
         for i, embedding in enumerate(index["embeddings"])
@@ -118,7 +116,7 @@ def build_rag_index(client: OpenAI, filepath: str) -> Dict[str, Any]:
         text = f.read()
     
     chunks = chunk_text(text, chunk_size=800, overlap=100)
-    embeddings = embed_texts(client, chunks)
+    embeddings = embed_texts(client, chunks, timeout=RAG_INDEX_EMBED_TIMEOUT_SECONDS)
     
     return {
         "chunks": chunks,
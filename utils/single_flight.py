@@ -0,0 +1,67 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict
+
+from utils.deadline import detached_deadline
+
+
+def make_flight_key(endpoint: str, user_id: int, resource_id: Any = None, payload: Any = None) -> str:
+    """(엔드포인트, 사용자, 리소스 ID, 요청 본문 해시)로 중복 요청 식별 키 생성"""
+    payload_hash = ""
+    if payload is not None:
+        raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+        payload_hash = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    return f"{endpoint}:{user_id}:{resource_id}:{payload_hash}"
+
+
+class SingleFlight:
+    """
+    동일 키의 동시 요청을 하나의 계산으로 합치는 요청 병합기 (프로세스 내)
+
+    먼저 도착한 요청이 계산을 실행하고, 실행 중에 들어온 중복 요청은
+    새로 계산하지 않고 같은 결과(또는 같은 예외)를 기다려 공유합니다.
+
+    fn은 첫 요청이 취소된 뒤에도 계속 실행될 수 있으므로 요청 단위 의존성(db 세션, current_user)을
+    사용하지 말고 ID 같은 값만 받아 필요한 세션을 직접 열어야 합니다.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            print(f"🔗 중복 요청 병합: {key}")
+            return await asyncio.shield(task)
+
+        self.executed += 1
+        # 첫 요청이 취소되더라도 기다리는 중복 요청들의 계산은 계속되도록 별도 Task로 실행
+        # (첫 요청의 마감 시각은 따르되, 첫 요청의 연결 종료 취소는 물려받지 않음)
+        with detached_deadline():
+            task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._release(key, t))
+        return await asyncio.shield(task)
+
+    def _release(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 기다리던 요청이 모두 취소된 뒤 실패해도 "Task exception was never retrieved"가 남지 않도록 예외 확인
+        if not task.cancelled() and task.exception() is not None:
+            print(f"⚠️ 병합된 계산 실패: {key} ({type(task.exception()).__name__}: {task.exception()})")
+
+    def snapshot(self) -> Dict[str, int]:
+        """진행 중인 계산 수와 실행/병합된 요청 수 (관리자 메트릭)"""
+        return {
+            "in_flight": len(self._inflight),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+        }
+
+
+# 애플리케이션 전역 인스턴스
+single_flight = SingleFlight()
@@ -0,0 +1,172 @@
+import re
+import json
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Type, TypeVar
+
+from openai import OpenAI
+from pydantic import BaseModel, ValidationError
+
+from utils.llm_client import chat_completion
+from utils.deadline import DeadlineExceededError
+
+T = TypeVar("T", bound=BaseModel)
+
+_FENCE_PATTERN = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+_TRAILING_COMMA_PATTERN = re.compile(r",\s*([}\]])")
+
+_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = {}
+
+
+def _count(call_site: str, outcome: str) -> None:
+    with _lock:
+        site = _stats.setdefault(call_site, {"ok": 0, "repaired": 0, "invalid": 0, "failed": 0, "retried": 0})
+        site[outcome] += 1
+
+
+def _scan_json(text: str) -> Tuple[Optional[str], List[str]]:
+    """
+    첫 '{'부터 문자 단위로 읽으며 JSON 객체 범위를 찾는 스트리밍 스캐너
+
+    Returns:
+        (완결된 객체 문자열 또는 None, 잘린 경우 시도해 볼 복구 후보 목록)
+    """
+    start = text.find("{")
+    if start == -1:
+        return None, []
+
+    stack: List[str] = []
+    in_string = False
+    escaped = False
+    # 잘라도 되는 지점(값이 끝난 직후의 쉼표 위치)과 그때의 열린 괄호 상태
+    safe_points: List[Tuple[int, Tuple[str, ...]]] = []
+
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if not stack or stack[-1] != ch:
+                break
+            stack.pop()
+            if not stack:
+                return text[start:i + 1], []
+        elif ch == ",":
+            safe_points.append((i, tuple(stack)))
+
+    # 출력이 중간에 끊긴 경우 (max_tokens 등): 열린 문자열/괄호를 닫는 후보 생성
+    body = text[start:].rstrip()
+    candidates = []
+    if in_string:
+        # 문자열 값 중간에서 끊김 → 닫아서 잘린 값 그대로 사용
+        closed = body[:-1] if escaped else body
+        candidates.append(closed + '"' + "".join(reversed(stack)))
+    else:
+        candidates.append(re.sub(r"[,:]\s*$", "", body) + "".join(reversed(stack)))
+    # 마지막으로 완결된 항목까지만 남기고 닫기 (키만 있고 값이 없는 경우 등)
+    for pos, snapshot in reversed(safe_points[-3:]):
+        candidates.append(text[start:pos] + "".join(reversed(snapshot)))
+    return None, candidates
+
+
+def extract_json(text: str) -> Tuple[Optional[Any], bool]:
+    """
+    LLM 응답 텍스트에서 JSON 객체 추출 (코드 블록, 앞뒤 설명, 후행 쉼표, 잘린 출력 복구)
+
+    Returns:
+        (파싱된 값 또는 None, 복구가 필요했는지 여부)
+    """
+    if not text:
+        return None, False
+    stripped = _FENCE_PATTERN.sub("", text.strip())
+    try:
+        return json.loads(stripped), False
+    except json.JSONDecodeError:
+        pass
+
+    complete, candidates = _scan_json(stripped)
+    for candidate in ([complete] if complete else []) + candidates:
+        for attempt in (candidate, _TRAILING_COMMA_PATTERN.sub(r"\1", candidate)):
+            try:
+                return json.loads(attempt), True
+            except json.JSONDecodeError:
+                continue
+    return None, False
+
+
+def parse_structured(text: str, schema: Type[T], call_site: str) -> Optional[T]:
+    """응답 텍스트를 JSON으로 추출/복구한 뒤 Pydantic 스키마로 검증, 실패 시 None (호출 위치별로 집계)"""
+    data, repaired = extract_json(text)
+    if not isinstance(data, dict):
+        _count(call_site, "failed")
+        print(f"⚠️ [{call_site}] JSON 추출 실패: {(text or '')[:100]}")
+        return None
+    try:
+        parsed = schema.model_validate(data)
+    except ValidationError as e:
+        _count(call_site, "invalid")
+        print(f"⚠️ [{call_site}] 응답 스키마 검증 실패: {e.errors()[:3]}")
+        return None
+    _count(call_site, "repaired" if repaired else "ok")
+    if repaired:
+        print(f"🩹 [{call_site}] 잘리거나 깨진 JSON 응답 복구")
+    return parsed
+
+
+def structured_completion(
+    client: OpenAI,
+    call_site: str,
+    schema: Type[T],
+    *,
+    retries: int = 1,
+    **kwargs,
+) -> Tuple[Optional[T], str]:
+    """
+    JSON 모드로 chat_completion을 호출하고 스키마로 검증된 결과 반환
+
+    복구할 수 없는 응답일 때만 retries 횟수만큼 다시 호출합니다.
+    재시도 중 요청 마감이 지나면 재시도하지 않고 실패로 처리합니다.
+
+    Args:
+        client: OpenAI 클라이언트
+        call_site: 호출 위치 식별자 (chat_completion 및 파싱 집계에 사용)
+        schema: 검증할 Pydantic 모델 (schemas.py)
+        retries: 파싱 실패 시 재시도 횟수
+        **kwargs: chat_completion 인자 (프롬프트에 'JSON' 단어가 포함되어야 함)
+
+    Returns:
+        (검증된 모델 또는 None, 마지막 응답 원문) - None이면 호출자가 기본값으로 대체
+    """
+    kwargs.setdefault("response_format", {"type": "json_object"})
+    content = ""
+    for attempt in range(retries + 1):
+        if attempt:
+            _count(call_site, "retried")
+            print(f"🔁 [{call_site}] 구조화 응답 재요청 ({attempt}/{retries})")
+        try:
+            response = chat_completion(client, call_site, **kwargs)
+        except DeadlineExceededError:
+            if attempt == 0:
+                raise
+            break
+        content = response.choices[0].message.content or ""
+        parsed = parse_structured(content, schema, call_site)
+        if parsed is not None:
+            return parsed, content
+    return None, content
+
+
+def get_parse_metrics() -> Dict[str, Any]:
+    """호출 위치별 구조화 응답 파싱 결과 (ok / repaired / invalid / failed / retried)"""
+    with _lock:
+        return {site: dict(counts) for site, counts in sorted(_stats.items())}
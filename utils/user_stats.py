@@ -0,0 +1,78 @@
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import case, func, select
+from sqlalchemy.dialects.mysql import insert
+
+import models
+
+STAT_COLUMNS = ("total_surveys", "saved_results", "chat_sessions")
+
+
+def stats_delta(user_id: int, total_surveys: int = 0, saved_results: int = 0, chat_sessions: int = 0):
+    """
+    user_stats 카운터를 증감하는 INSERT ... ON DUPLICATE KEY UPDATE 문
+
+    호출한 쪽의 세션에서 실행하고 원본 변경과 함께 커밋해야 합니다. (동기/비동기 세션 모두 사용 가능)
+    설문 저장/삭제, 대화 종료마다 실행되므로 기본 키 한 행만 갱신하고 원본 테이블을 세지 않습니다.
+    행이 없으면 증감값으로 새로 만듭니다. 마이그레이션은 그 시점의 사용자 행을 실제 값으로 채우므로,
+    마이그레이션과 코드 배포 사이에 생긴 변경은 배포 직후 reconcile_user_stats.py를 한 번 실행해 보정해야 합니다.
+    """
+    deltas = {"total_surveys": total_surveys, "saved_results": saved_results, "chat_sessions": chat_sessions}
+    now = datetime.now(timezone.utc)
+    stmt = insert(models.UserStats).values(
+        user_id=user_id, updated_at=now, **{name: max(delta, 0) for name, delta in deltas.items()}
+    )
+    updates = {
+        name: func.greatest(getattr(models.UserStats, name) + delta, 0)
+        for name, delta in deltas.items() if delta
+    }
+    return stmt.on_duplicate_key_update(updated_at=stmt.inserted.updated_at, **updates)
+
+
+def actual_stats_select(user_ids: Optional[Iterable[int]] = None):
+    """
+    survey_result / chat_history에서 직접 센 사용자별 실제 값
+    (user_id, total_surveys, saved_results, chat_sessions), user_ids가 없으면 전체 사용자
+    """
+    surveys = select(
+        models.SurveyResult.user_id.label("user_id"),
+        func.count().label("total_surveys"),
+        func.sum(case((models.SurveyResult.is_active == True, 1), else_=0)).label("saved_results"),
+    ).group_by(models.SurveyResult.user_id)
+    chats = select(
+        models.ChatHistory.user_id.label("user_id"),
+        func.count().label("chat_sessions"),
+    ).where(models.ChatHistory.ended_at != None).group_by(models.ChatHistory.user_id)
+    users = select(models.User.id)
+
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        surveys = surveys.where(models.SurveyResult.user_id.in_(user_ids))
+        chats = chats.where(models.ChatHistory.user_id.in_(user_ids))
+        users = users.where(models.User.id.in_(user_ids))
+    surveys, chats = surveys.subquery(), chats.subquery()
+
+    return (
+        users.add_columns(
+            func.coalesce(surveys.c.total_surveys, 0).label("total_surveys"),
+            func.coalesce(surveys.c.saved_results, 0).label("saved_results"),
+            func.coalesce(chats.c.chat_sessions, 0).label("chat_sessions"),
+        )
+        .outerjoin(surveys, surveys.c.user_id == models.User.id)
+        .outerjoin(chats, chats.c.user_id == models.User.id)
+        .order_by(models.User.id)
+    )
+
+
+def stats_overwrite(rows):
+    """실제 값으로 user_stats 행을 만들거나 덮어쓰는 문 (조회 시 행이 없을 때와 정합성 보정 작업에서 사용)"""
+    now = datetime.now(timezone.utc)
+    stmt = insert(models.UserStats).values([
+        {"user_id": row.id, "updated_at": now, **{name: int(getattr(row, name)) for name in STAT_COLUMNS}}
+        for row in rows
+    ])
+    return stmt.on_duplicate_key_update(
+        updated_at=stmt.inserted.updated_at,
+        **{name: getattr(stmt.inserted, name) for name in STAT_COLUMNS},
+    )